@@ -0,0 +1,82 @@
+"""
+Vectorized aspect detection over arrays of charts.
+
+Longitudes are arrays shaped (charts, planets) - or (planets,) for a single
+chart or a sky shared by every chart - and all separations and orb tests are
+evaluated with NumPy broadcasting. Hits come back as a structured array with
+one row per (chart, planet a, planet b, aspect), in the same order the
+nested Python loops produced them: chart, then a, then b, then aspect.
+"""
+
+import numpy as np
+
+HIT_DTYPE = np.dtype([
+    ("chart", np.int32),
+    ("a", np.int16),
+    ("b", np.int16),
+    ("aspect", np.int16),
+    ("orb", np.float64),
+])
+
+DEFAULT_CHUNK = 4096
+
+
+class AspectTable:
+    """Aspect angles and orbs in a fixed order, from an ASPECTS-style dict
+    ({name: {"angle": ..., "orb": ...}}) or a {name: orb} override."""
+
+    def __init__(self, aspects, orbs=None):
+        self.names = list(orbs if orbs is not None else aspects)
+        self.angles = np.array([aspects[n]["angle"] for n in self.names], dtype=np.float64)
+        self.orbs = np.array([orbs[n] if orbs is not None else aspects[n]["orb"] for n in self.names],
+                             dtype=np.float64)
+
+
+def separations(a, b):
+    """Shortest angular distance between every a[..., i] and b[..., j],
+    shaped (..., len(a), len(b))."""
+    diff = np.abs(a[..., :, None] - b[..., None, :])
+    return np.where(diff > 180, 360 - diff, diff)
+
+
+def _as_charts(lons):
+    lons = np.asarray(lons, dtype=np.float64)
+    return lons[None, :] if lons.ndim == 1 else lons
+
+
+def find_aspects(a, b, table, unique_pairs=False, chunk=DEFAULT_CHUNK):
+    """All aspects between planets in a and planets in b.
+
+    a and b are (charts, planets) arrays; either may be 1-D to share one set
+    of longitudes across every chart. With unique_pairs (a and b being the
+    same chart) only pairs with index a < b are reported.
+    """
+    a, b = _as_charts(a), _as_charts(b)
+    n_charts = max(a.shape[0], b.shape[0])
+    mask = np.triu(np.ones((a.shape[1], b.shape[1]), dtype=bool), k=1) if unique_pairs else None
+
+    parts = []
+    for start in range(0, n_charts, chunk):
+        stop = min(start + chunk, n_charts)
+        a_chunk = a if a.shape[0] == 1 else a[start:stop]
+        b_chunk = b if b.shape[0] == 1 else b[start:stop]
+        orb = np.abs(separations(a_chunk, b_chunk)[..., None] - table.angles)
+        hit = orb <= table.orbs
+        if mask is not None:
+            hit &= mask[None, :, :, None]
+        if hit.shape[0] != stop - start:
+            hit = np.broadcast_to(hit, (stop - start,) + hit.shape[1:])
+            orb = np.broadcast_to(orb, hit.shape)
+        c, i, j, k = np.nonzero(hit)
+        part = np.empty(len(c), dtype=HIT_DTYPE)
+        part["chart"] = c + start
+        part["a"] = i
+        part["b"] = j
+        part["aspect"] = k
+        part["orb"] = orb[c, i, j, k]
+        parts.append(part)
+    return np.concatenate(parts) if parts else np.empty(0, dtype=HIT_DTYPE)
+
+
+def strengths(hits, table):
+    return 1 - hits["orb"] / table.orbs[hits["aspect"]]
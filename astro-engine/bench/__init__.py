@@ -0,0 +1,13 @@
+"""
+Benchmarks and load tests for the astro engine.
+
+Run from astro-engine/:
+
+    python -m bench micro -o micro.json
+    python -m bench load --endpoint /calculate --concurrency 8 --duration 30 -o load.json
+    python -m bench compare baseline.json micro.json --threshold 10
+    python -m bench stub-geocoder --port 8090   # local Nominatim for NOMINATIM_URL
+
+Every run uses a seeded corpus (bench.corpus) and the stub geocoder, so
+results are reproducible offline and comparable between commits.
+"""
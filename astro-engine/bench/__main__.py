@@ -0,0 +1,65 @@
+import argparse
+import sys
+
+from bench import corpus as bench_corpus
+from bench import results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Astro engine benchmarks.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def corpus_args(p):
+        p.add_argument("--size", type=int, default=bench_corpus.DEFAULT_SIZE, help="Corpus size")
+        p.add_argument("--seed", type=int, default=bench_corpus.DEFAULT_SEED, help="Corpus seed")
+        p.add_argument("-o", "--output", help="Write JSON results here instead of stdout")
+
+    micro = sub.add_parser("micro", help="Per-function micro-benchmarks")
+    corpus_args(micro)
+    micro.add_argument("--repeat", type=int, default=3, help="Passes over the corpus")
+    micro.add_argument("--only", nargs="*", help="Benchmark names to run")
+
+    load = sub.add_parser("load", help="In-process ASGI load test")
+    corpus_args(load)
+    load.add_argument("--endpoint", default="/calculate", help="Endpoint path, query string allowed")
+    load.add_argument("--concurrency", type=int, default=8)
+    load.add_argument("--duration", type=float, help="Seconds to run (default: one pass over the corpus)")
+    load.add_argument("--requests", type=int, help="Total requests to issue")
+    load.add_argument("--warmup", type=int, default=20, help="Untimed requests before measuring")
+    load.add_argument("--geocode-latency-ms", type=float, default=0.0, help="Simulated geocoder latency")
+
+    stub = sub.add_parser("stub-geocoder", help="Serve STUB_PLACES as a local Nominatim")
+    stub.add_argument("--host", default="127.0.0.1")
+    stub.add_argument("--port", type=int, default=8090)
+    stub.add_argument("--latency-ms", type=float, default=0.0, help="Delay before each answer")
+
+    cmp = sub.add_parser("compare", help="Compare two result files")
+    cmp.add_argument("baseline")
+    cmp.add_argument("candidate")
+    cmp.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+
+    args = parser.parse_args(argv)
+    if args.command == "micro":
+        from bench import micro as bench_micro
+
+        results.write(bench_micro.run(args.size, args.seed, args.repeat, args.only), args.output)
+    elif args.command == "load":
+        from bench import load as bench_load
+
+        results.write(bench_load.run(args.endpoint, args.size, args.seed, args.concurrency, args.duration,
+                                     args.requests, args.warmup, args.geocode_latency_ms), args.output)
+    elif args.command == "stub-geocoder":
+        from bench import stub_geocoder
+
+        stub_geocoder.serve(args.host, args.port, args.latency_ms)
+    else:
+        from bench.compare import compare
+
+        lines, regressions = compare(results.load(args.baseline), results.load(args.candidate), args.threshold)
+        print("\n".join(lines))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
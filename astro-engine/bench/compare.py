@@ -0,0 +1,55 @@
+"""
+Compare two result files and flag regressions.
+
+Latency percentiles regress when they grow and throughput when it shrinks
+by more than the threshold (percent). RSS is reported but never fails the
+comparison, since it depends on the machine as much as on the code.
+"""
+
+LATENCY_KEYS = ("p50", "p95", "p99")
+
+
+def _change(base, new):
+    if not base:
+        return None
+    return (new - base) / base * 100
+
+
+def _rows(baseline, candidate):
+    """(name, metric, base, new, change %, higher_is_better)."""
+    rows = []
+    for name, base in baseline.get("micro", {}).items():
+        new = candidate.get("micro", {}).get(name)
+        if new is None:
+            continue
+        for key in LATENCY_KEYS:
+            rows.append((name, f"{key}_{base.get('unit', 'us')}", base[key], new[key], _change(base[key], new[key]), False))
+        rows.append((name, "ops_per_sec", base["ops_per_sec"], new["ops_per_sec"],
+                     _change(base["ops_per_sec"], new["ops_per_sec"]), True))
+    base_load, new_load = baseline.get("load"), candidate.get("load")
+    if base_load and new_load:
+        name = base_load["endpoint"]
+        for key in LATENCY_KEYS:
+            b, n = base_load["latency_ms"][key], new_load["latency_ms"][key]
+            rows.append((name, f"{key}_ms", b, n, _change(b, n), False))
+        rows.append((name, "rps", base_load["rps"], new_load["rps"], _change(base_load["rps"], new_load["rps"]), True))
+        b, n = base_load["rss_mb"]["peak"], new_load["rss_mb"]["peak"]
+        rows.append((name, "rss_peak_mb", b, n, _change(b, n), None))
+    return rows
+
+
+def compare(baseline, candidate, threshold=10.0):
+    """Printable report lines and the list of regressed (name, metric)."""
+    lines = [f"baseline {baseline['meta'].get('commit')}  candidate {candidate['meta'].get('commit')}",
+             f"{'benchmark':<34}{'metric':<14}{'baseline':>12}{'candidate':>12}{'change':>10}"]
+    regressions = []
+    for name, metric, base, new, change, higher_is_better in _rows(baseline, candidate):
+        flag = ""
+        if change is not None and higher_is_better is not None:
+            worse = -change if higher_is_better else change
+            if worse > threshold:
+                flag = "  REGRESSION"
+                regressions.append((name, metric))
+        shown = f"{change:+.1f}%" if change is not None else "n/a"
+        lines.append(f"{name:<34}{metric:<14}{base:>12}{new:>12}{shown:>10}{flag}")
+    return lines, regressions
@@ -0,0 +1,91 @@
+"""
+Seeded birth-data corpora and the offline stub geocoder.
+
+Corpus places are made-up names ("Bench City 07") so they never resolve
+through COMMON_PLACES or the gazetteer; install_stub_geocoder() answers
+them from STUB_PLACES in place of Nominatim, optionally with a fixed
+latency to mimic the network round trip.
+"""
+
+import random
+import time
+
+# (latitude, longitude, timezone) of real cities, under stub names.
+STUB_LOCATIONS = [
+    (28.6139, 77.2090, "Asia/Kolkata"),
+    (19.0760, 72.8777, "Asia/Kolkata"),
+    (12.9716, 77.5946, "Asia/Kolkata"),
+    (40.7128, -74.0060, "America/New_York"),
+    (34.0522, -118.2437, "America/Los_Angeles"),
+    (41.8781, -87.6298, "America/Chicago"),
+    (51.5074, -0.1278, "Europe/London"),
+    (48.8566, 2.3522, "Europe/Paris"),
+    (52.5200, 13.4050, "Europe/Berlin"),
+    (55.7558, 37.6173, "Europe/Moscow"),
+    (35.6762, 139.6503, "Asia/Tokyo"),
+    (-33.8688, 151.2093, "Australia/Sydney"),
+    (-23.5505, -46.6333, "America/Sao_Paulo"),
+    (6.5244, 3.3792, "Africa/Lagos"),
+    (25.2048, 55.2708, "Asia/Dubai"),
+    (1.3521, 103.8198, "Asia/Singapore"),
+    (64.1466, -21.9426, "Atlantic/Reykjavik"),
+    (-36.8485, 174.7633, "Pacific/Auckland"),
+    (19.4326, -99.1332, "America/Mexico_City"),
+    (30.0444, 31.2357, "Africa/Cairo"),
+]
+STUB_PLACES = {
+    f"bench city {i:02d}": {"latitude": lat, "longitude": lon, "timezone": tz, "address": f"Bench City {i:02d}"}
+    for i, (lat, lon, tz) in enumerate(STUB_LOCATIONS)
+}
+
+DEFAULT_SIZE = 500
+DEFAULT_SEED = 1234
+
+
+def make_corpus(size=DEFAULT_SIZE, seed=DEFAULT_SEED, places=None):
+    """size /calculate payloads drawn deterministically from seed."""
+    rng = random.Random(seed)
+    places = places or [loc["address"] for loc in STUB_PLACES.values()]
+    corpus = []
+    for _ in range(size):
+        corpus.append({
+            "year": rng.randint(1940, 2010),
+            "month": rng.randint(1, 12),
+            "day": rng.randint(1, 28),
+            "hour": rng.randint(0, 23),
+            "minute": rng.randint(0, 59),
+            "second": 0,
+            "place": rng.choice(places),
+        })
+    return corpus
+
+
+def as_tuple(birth):
+    return (birth["year"], birth["month"], birth["day"], birth["hour"], birth["minute"],
+            birth["second"], birth["place"])
+
+
+def install_stub_geocoder(latency_ms=0.0):
+    """Route geocoding's Nominatim fallback to STUB_PLACES, with an
+    in-memory cache so runs leave no geocode.db behind. Also used as a
+    worker initializer, so it must stay importable by reference."""
+    import geocoding
+
+    def lookup(place_name):
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+        try:
+            return STUB_PLACES[place_name.lower().strip()]
+        except KeyError:
+            raise ValueError(f"Cannot find location: {place_name}")
+
+    geocoding._nominatim_lookup = lookup
+    geocoding.NOMINATIM_FALLBACK = True
+    geocoding.geocode_cache = geocoding.GeocodeCache(db_path="")
+
+
+def init_bench_worker(latency_ms=0.0):
+    from executor import init_worker
+
+    init_worker()
+    install_stub_geocoder(latency_ms)
@@ -0,0 +1,116 @@
+"""
+End-to-end load generator driving the ASGI app in-process.
+
+Requests go straight through server.app's ASGI interface (no sockets, no
+HTTP client dependency) with the app's lifespan running, so they exercise
+routing, validation, the transit snapshot, the CalculationExecutor pool
+and response encoding. The API process and the workers (through the
+executor initializer) get the stub geocoder, so no request ever reaches
+Nominatim.
+"""
+
+import asyncio
+import itertools
+import json
+import time
+
+from bench import corpus as bench_corpus
+from bench import results
+
+
+async def asgi_request(app, method, path, body=None, headers=()):
+    """One request against an ASGI app; returns (status, headers, body)."""
+    path, _, query = path.partition("?")
+    payload = json.dumps(body).encode() if body is not None else b""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode()),
+                    *[(k.lower().encode(), v.encode()) for k, v in headers]],
+        "client": ("127.0.0.1", 0), "server": ("bench", 80),
+    }
+    sent = False
+    status, response_headers, chunks = None, [], []
+
+    async def receive():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status, response_headers
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers = message.get("headers", [])
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, response_headers, b"".join(chunks)
+
+
+async def _drive(app, requests, concurrency, duration, total):
+    latencies, statuses = [], {}
+    feed = itertools.cycle(requests)
+    deadline = time.perf_counter() + duration if duration else None
+    issued = 0
+
+    async def client():
+        nonlocal issued
+        while (deadline is None or time.perf_counter() < deadline) and (total is None or issued < total):
+            issued += 1
+            method, path, body = next(feed)
+            start = time.perf_counter()
+            status, _, _ = await asgi_request(app, method, path, body)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    return latencies, statuses, time.perf_counter() - start
+
+
+async def _run(endpoint, births, concurrency, duration, total, warmup, geocode_latency_ms):
+    import server
+
+    server.executor.initializer = bench_corpus.init_bench_worker
+    server.executor.initargs = (geocode_latency_ms,)
+    # The API process resolves places too (server.geocoder).
+    bench_corpus.install_stub_geocoder(geocode_latency_ms)
+    if endpoint == "/calculate/batch":
+        requests = [("POST", endpoint, {"items": births[i:i + 50]}) for i in range(0, len(births), 50)]
+    else:
+        requests = [("POST", endpoint, b) for b in births]
+
+    async with server.lifespan(server.app):
+        if warmup:
+            await _drive(server.app, requests, concurrency, None, warmup)
+        latencies, statuses, elapsed = await _drive(server.app, requests, concurrency, duration, total)
+        pool = server.executor._pool
+        worker_pids = list(pool._processes) if pool is not None else []
+        rss = results.rss_mb(worker_pids)
+
+    ok = sum(n for s, n in statuses.items() if 200 <= s < 300)
+    return {
+        "endpoint": endpoint, "concurrency": concurrency,
+        "executor": {"mode": server.executor.mode, "workers": server.executor.workers},
+        "requests": len(latencies), "ok": ok, "statuses": {str(s): n for s, n in sorted(statuses.items())},
+        "elapsed_s": round(elapsed, 3), "rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": results.summarize(latencies), "rss_mb": rss,
+    }
+
+
+def run(endpoint="/calculate", size=bench_corpus.DEFAULT_SIZE, seed=bench_corpus.DEFAULT_SEED,
+        concurrency=8, duration=None, total=None, warmup=20, geocode_latency_ms=0.0):
+    """Load one endpoint for duration seconds or total requests (one pass
+    over the corpus when neither is given)."""
+    births = bench_corpus.make_corpus(size, seed)
+    if duration is None and total is None:
+        total = size
+    load = asyncio.run(_run(endpoint, births, concurrency, duration, total, warmup, geocode_latency_ms))
+    return {"meta": results.metadata(kind="load", corpus_size=size, seed=seed,
+                                     geocode_latency_ms=geocode_latency_ms),
+            "load": load}
@@ -0,0 +1,103 @@
+"""
+Per-function micro-benchmarks.
+
+Each benchmark calls one engine function once per corpus item, for
+--repeat passes after an untimed warm-up pass, timing every call
+individually. Runs in-process with the stub geocoder; results are in
+microseconds per call.
+"""
+
+import time
+from datetime import datetime, time as dt_time
+
+from bench import corpus as bench_corpus
+from bench import results
+
+
+def _prepare(births):
+    import chart_model
+    import geocoding
+    import natal_chart
+    import transits
+    from executor import init_worker
+
+    init_worker()
+    bench_corpus.install_stub_geocoder()
+    locs = [geocoding.geocode_place(b["place"]) for b in births]
+    jds = [natal_chart.to_julian_day(*bench_corpus.as_tuple(b)[:6], loc["timezone"]) for b, loc in zip(births, locs)]
+    charts = [chart_model.calculate_chart(*bench_corpus.as_tuple(b), loc=loc, jd=jd)
+              for b, loc, jd in zip(births, locs, jds)]
+    current = transits.get_current_planetary_positions()
+    return locs, jds, charts, current
+
+
+def benchmarks(births):
+    """[(name, fn, [args per item], reset)] where reset() runs untimed
+    before every call."""
+    import birth_time_sweep
+    import chart_model
+    import geocoding
+    import natal_chart
+    import dasha
+    import profiles
+    import tasks
+    import transits
+    from chart_cache import chart_cache
+
+    locs, jds, charts, current = _prepare(births)
+    tuples = [bench_corpus.as_tuple(b) for b in births]
+    moons = [(c.sid_lon("Moon"), datetime(*t[:5])) for c, t in zip(charts, tuples)]
+    full = [tasks.full_calculation(*t, loc=loc, jd=jd, current=current) for t, loc, jd in zip(tuples, locs, jds)]
+
+    return [
+        ("geocode_place", geocoding.geocode_place, [(b["place"],) for b in births], None),
+        ("to_julian_day", natal_chart.to_julian_day,
+         [(*t[:6], loc["timezone"]) for t, loc in zip(tuples, locs)], None),
+        ("compute_chart_body", chart_model.compute_chart_body,
+         [(jd, loc["latitude"], loc["longitude"]) for jd, loc in zip(jds, locs)], None),
+        ("calculate_natal_chart_cold", lambda t, loc, jd: chart_model.calculate_natal_chart(*t, loc=loc, jd=jd),
+         list(zip(tuples, locs, jds)), chart_cache.clear),
+        ("calculate_natal_chart_cached", lambda t, loc, jd: chart_model.calculate_natal_chart(*t, loc=loc, jd=jd),
+         list(zip(tuples, locs, jds)), None),
+        ("calculate_chart_cached", lambda t, loc, jd: chart_model.calculate_chart(*t, loc=loc, jd=jd),
+         list(zip(tuples, locs, jds)), None),
+        ("chart_to_dict", lambda c: c.to_dict(), [(c,) for c in charts], None),
+        ("calculate_dasha", dasha.calculate_dasha, moons, None),
+        ("find_active_transits", transits.find_active_transits, [(c, current) for c in charts], None),
+        ("get_current_planetary_positions", transits.get_current_planetary_positions, [()] * len(births), None),
+        ("full_calculation", lambda t, loc, jd: tasks.full_calculation(*t, loc=loc, jd=jd, current=current),
+         list(zip(tuples, locs, jds)), None),
+        ("full_calculation_summary",
+         lambda t, loc, jd: tasks.full_calculation(*t, loc=loc, jd=jd, current=current, profile="summary"),
+         list(zip(tuples, locs, jds)), None),
+        ("dumps_full", profiles.dumps, [(r,) for r in full], None),
+        ("birth_time_sweep_day",
+         lambda t, loc: birth_time_sweep.sweep(*t[:3], dt_time(0, 0), dt_time(23, 59), 1, t[6], loc=loc),
+         list(zip(tuples, locs)), None),
+    ]
+
+
+def run(size=bench_corpus.DEFAULT_SIZE, seed=bench_corpus.DEFAULT_SEED, repeat=3, only=None):
+    births = bench_corpus.make_corpus(size, seed)
+    out = {}
+    for name, fn, calls, reset in benchmarks(births):
+        if only and name not in only:
+            continue
+        for args in calls:
+            # Untimed pass: primes caches and lazy imports.
+            fn(*args)
+        samples = []
+        for _ in range(repeat):
+            for args in calls:
+                if reset is not None:
+                    reset()
+                start = time.perf_counter()
+                fn(*args)
+                samples.append(time.perf_counter() - start)
+        summary = results.summarize(samples, scale=1e6)
+        summary["unit"] = "us"
+        summary["ops_per_sec"] = round(len(samples) / sum(samples), 1)
+        out[name] = summary
+    return {"meta": results.metadata(kind="micro", corpus_size=size, seed=seed, repeat=repeat,
+                                     rss_mb=results.rss_mb()),
+            "micro": out}
@@ -0,0 +1,71 @@
+"""Latency summaries, memory readings and the result file format."""
+
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+
+RESULT_VERSION = 1
+
+
+def summarize(seconds, scale=1e3):
+    """p50/p95/p99/mean/max of a list of durations in seconds, in ms by
+    default."""
+    if not seconds:
+        return {"n": 0}
+    values = np.asarray(seconds, dtype=np.float64) * scale
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"n": len(values), "p50": round(p50, 4), "p95": round(p95, 4), "p99": round(p99, 4),
+            "mean": round(values.mean(), 4), "max": round(values.max(), 4)}
+
+
+def _statm_rss_mb(pid="self"):
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def rss_mb(worker_pids=()):
+    """Current and peak RSS of this process plus current RSS of workers."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    if sys.platform == "darwin":
+        peak /= 1024
+    workers = [_statm_rss_mb(pid) for pid in worker_pids]
+    return {"current": round(_statm_rss_mb() or peak, 1), "peak": round(peak, 1),
+            "workers": round(sum(w for w in workers if w is not None), 1)}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def metadata(**extra):
+    return {"version": RESULT_VERSION, "commit": _git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(), "platform": platform.platform(),
+            "cpus": os.cpu_count(), **extra}
+
+
+def write(result, path=None):
+    text = json.dumps(result, indent=2)
+    if path:
+        with open(path, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
@@ -0,0 +1,50 @@
+"""
+Local stand-in for Nominatim's /search, answering from STUB_PLACES.
+
+    python -m bench stub-geocoder --port 8090 --latency-ms 200
+    NOMINATIM_URL=http://127.0.0.1:8090/search uvicorn server:app
+
+Unknown places get an empty result list, as Nominatim does. Every request
+is logged to stderr, so duplicate upstream calls are easy to spot.
+"""
+
+import json
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bench.corpus import STUB_PLACES
+
+
+def make_handler(latency_ms=0.0):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urllib.parse.urlsplit(self.path)
+            if url.path != "/search":
+                self.send_error(404)
+                return
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+            query = urllib.parse.parse_qs(url.query).get("q", [""])[0]
+            place = STUB_PLACES.get(" ".join(query.lower().split()))
+            found = [] if place is None else [{"lat": str(place["latitude"]), "lon": str(place["longitude"]),
+                                                "display_name": place["address"]}]
+            body = json.dumps(found).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def serve(host="127.0.0.1", port=8090, latency_ms=0.0):
+    server = ThreadingHTTPServer((host, port), make_handler(latency_ms))
+    print(f"Stub geocoder on http://{host}:{port}/search", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
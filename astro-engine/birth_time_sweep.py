@@ -0,0 +1,171 @@
+"""
+Birth-time sweeps: how one date and place's chart changes over a range of
+birth times, for users who do not know their time of birth ("possible
+rising signs") and for rectification.
+
+A chart per grid minute would redo the geocoding, the timezone conversion
+and every planet for each point. A sweep resolves the place and converts
+the first and last local times once, then:
+
+  - places the planets once: positions and speeds at knots every
+    KNOT_HOURS are Hermite-interpolated onto the whole grid, which keeps
+    the Moon within ~0.00001 deg of Swiss Ephemeris;
+  - interpolates the sidereal time and obliquity across the grid, so the
+    cusps and ascendant of each point come from ephemeris.houses_armc in
+    one pass instead of a full houses() call each;
+  - assigns the house of every planet at every point in one NumPy pass.
+
+Consecutive grid points with the same rising sign, Moon nakshatra and
+house placements (western and Vedic, as in the chart response) are merged
+into intervals, so every change is located to within one step.
+"""
+
+import numpy as np
+
+import ephemeris
+import metrics
+from chart_model import PLANET_INDEX, PLANET_NAMES, RAHU
+from ephemeris import DEFAULT_OPTIONS
+from ephemeris_table import hermite, wrap180
+from geocoding import geocode_place
+from natal_chart import NAKSHATRAS, PLANETS, SIGNS, longitude_to_sign_data, to_julian_day
+
+KNOT_HOURS = 6
+SIDEREAL_RATE = 360.98564736629  # degrees of sidereal time per solar day
+MINUTES_PER_DAY = 24 * 60
+
+_NAK_SPAN = 360 / 27
+
+
+def check_range(start, end, step_minutes):
+    """start and end are datetime.time values on the same date."""
+    if (end.hour, end.minute) < (start.hour, start.minute):
+        raise ValueError("Sweep end must not be before its start")
+    if not 1 <= step_minutes <= MINUTES_PER_DAY:
+        raise ValueError(f"Sweep step must be 1-{MINUTES_PER_DAY} minutes")
+
+
+def _clock(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _grid(year, month, day, start, end, step_minutes, tz_str):
+    """Local minutes after midnight of each grid point and their julian days."""
+    first = start.hour * 60 + start.minute
+    minutes = np.arange(first, end.hour * 60 + end.minute + 1, step_minutes)
+    jd_first = to_julian_day(year, month, day, *divmod(int(minutes[0]), 60), 0, tz_str)
+    jd_last = to_julian_day(year, month, day, *divmod(int(minutes[-1]), 60), 0, tz_str)
+    if abs(jd_last - jd_first - (minutes[-1] - first) / MINUTES_PER_DAY) < 1e-7:
+        return minutes, jd_first + (minutes - first) / MINUTES_PER_DAY
+    # The UTC offset changes inside the range (a DST switch): convert each point.
+    return minutes, np.array([to_julian_day(year, month, day, *divmod(int(m), 60), 0, tz_str) for m in minutes])
+
+
+def _knots(jds):
+    """Knots covering jds, KNOT_HOURS apart, and each jd's interval index
+    and fraction."""
+    step = KNOT_HOURS / 24
+    jd0 = jds.min()
+    knots = jd0 + step * np.arange(int((jds.max() - jd0) / step) + 2)
+    i = np.minimum(((jds - jd0) / step).astype(np.int64), len(knots) - 2)
+    return knots, i, (jds - knots[i]) / step
+
+
+def _planets(jds, knots, i, t, opts):
+    """Tropical and sidereal longitudes, shaped (len(jds), len(PLANET_NAMES))."""
+    rows = [ephemeris.positions(jd, ephemeris.planet_ids(PLANETS, opts)) for jd in knots]
+    lon = np.array([[xx[0] for xx in row] for row in rows])
+    speed = np.array([[xx[3] for xx in row] for row in rows]) * (KNOT_HOURS / 24)
+    tropical = hermite(lon[i], speed[i], lon[i + 1], speed[i + 1], t[:, None])
+    # Ketu is placed from Rahu's longitude as published (4 decimals).
+    ketu = (np.round(tropical[:, RAHU], 4) + 180) % 360
+    tropical = np.column_stack([tropical, ketu])
+
+    ayanamsa = np.interp(jds, knots, [ephemeris.ayanamsa(jd, opts.ayanamsa) for jd in knots])
+    return tropical, (tropical - ayanamsa[:, None]) % 360
+
+
+def _houses(jds, knots, lat, lon, system):
+    """Western cusps (len(jds), 12) and ascendants."""
+    # Sidereal time is unwrapped across the knots before interpolating.
+    sidereal = [ephemeris.sidereal_time(jd) for jd in knots]
+    advance = SIDEREAL_RATE * KNOT_HOURS / 24
+    unwrapped = np.cumsum([sidereal[0]] + [advance + wrap180(b - a - advance)
+                                           for a, b in zip(sidereal, sidereal[1:])])
+    armc = (np.interp(jds, knots, unwrapped) + lon) % 360
+    obliquity = np.interp(jds, knots, [ephemeris.obliquity(jd) for jd in knots])
+    houses = ephemeris.houses_armc(armc.tolist(), lat, obliquity.tolist(), system)
+    return np.array([cusps[:12] for cusps, _ in houses]), np.array([ascmc[0] for _, ascmc in houses])
+
+
+def _house_of(lons, cusps):
+    """find_house for every point and planet: measured from the first cusp,
+    the house number is the count of cusps at or before the longitude."""
+    first = cusps[:, :1]
+    return (((lons - first) % 360)[:, :, None] >= ((cusps - first) % 360)[:, None, :]).sum(axis=2)
+
+
+def _runs(values):
+    """(first, last) index pairs of the runs of equal rows in values."""
+    starts = [0] + (np.flatnonzero(np.any(values[1:] != values[:-1], axis=1)) + 1).tolist()
+    return list(zip(starts, [s - 1 for s in starts[1:]] + [len(values) - 1]))
+
+
+def _spans(minutes, values, names, label):
+    """[{label, start, end}] for the runs of equal values."""
+    return [{label: names[values[first]], "start": _clock(int(minutes[first])), "end": _clock(int(minutes[last]))}
+            for first, last in _runs(values[:, None])]
+
+
+def sweep(year, month, day, start, end, step_minutes, place_name, loc=None, opts=DEFAULT_OPTIONS) -> dict:
+    """Intervals of birth time between start and end (datetime.time, every
+    step_minutes) over which the chart's rising sign, Moon nakshatra and
+    house placements stay the same. Batch callers pass an already geocoded
+    loc; opts is an ephemeris.Options as for calculate_chart."""
+    check_range(start, end, step_minutes)
+    if loc is None:
+        loc = geocode_place(place_name)
+    lat, lon = loc["latitude"], loc["longitude"]
+
+    with metrics.stage("julian_day"):
+        minutes, jds = _grid(year, month, day, start, end, step_minutes, loc["timezone"])
+    knots, i, t = _knots(jds)
+    with metrics.stage("planets"):
+        tropical, sidereal = _planets(jds, knots, i, t, opts)
+    with metrics.stage("houses"):
+        cusps, asc = _houses(jds, knots, lat, lon, opts.house_system)
+        rising = (asc // 30).astype(np.int64) % 12
+        moon = np.floor(sidereal[:, PLANET_INDEX["Moon"]] / _NAK_SPAN).astype(np.int64) % 27
+        house_western = _house_of(tropical, cusps)
+        # Whole-sign houses counted from the rising sign, as in the chart.
+        house_vedic = ((sidereal // 30).astype(np.int64) - rising[:, None]) % 12 + 1
+
+    fields = {"rising_sign": rising[:, None], "moon_nakshatra": moon[:, None],
+              "houses": house_western, "houses_vedic": house_vedic}
+    intervals = []
+    for n, (first, last) in enumerate(_runs(np.column_stack(list(fields.values())))):
+        intervals.append({
+            "start": _clock(int(minutes[first])), "end": _clock(int(minutes[last])),
+            "rising_sign": SIGNS[rising[first]],
+            "ascendant": {"from": longitude_to_sign_data(asc[first])["formatted"],
+                          "to": longitude_to_sign_data(asc[last])["formatted"]},
+            "moon_nakshatra": NAKSHATRAS[moon[first]]["name"],
+            "houses": dict(zip(PLANET_NAMES, house_western[first].tolist())),
+            "houses_vedic": dict(zip(PLANET_NAMES, house_vedic[first].tolist())),
+            "changed": [] if n == 0 else [name for name, column in fields.items()
+                                          if np.any(column[first] != column[first - 1])],
+        })
+
+    birth_data = {
+        "date": f"{year}-{month:02d}-{day:02d}", "start": _clock(int(minutes[0])), "end": _clock(int(minutes[-1])),
+        "step_minutes": step_minutes, "points": len(jds),
+        "place": place_name, "latitude": lat, "longitude": lon, "timezone": loc["timezone"],
+    }
+    if opts != DEFAULT_OPTIONS:
+        birth_data["options"] = opts._asdict()
+    return {
+        "birth_data": birth_data,
+        "rising_signs": _spans(minutes, rising, SIGNS, "sign"),
+        "moon_nakshatras": _spans(minutes, moon, [nak["name"] for nak in NAKSHATRAS], "nakshatra"),
+        "intervals": intervals,
+    }
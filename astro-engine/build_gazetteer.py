@@ -0,0 +1,192 @@
+"""
+Build the gazetteer index read by gazetteer.py from GeoNames dumps.
+
+    python build_gazetteer.py cities15000.txt \\
+        --countries countryInfo.txt --admin1 admin1CodesASCII.txt \\
+        -o data/gazetteer.bin
+    python build_gazetteer.py --download [--dataset cities1000]
+
+Inputs are the tab-separated files published at
+https://download.geonames.org/export/dump/. Every city row already carries
+its IANA timezone, so no polygon lookup is needed at build or query time.
+--download fetches the three files (from GEONAMES_URL) into a temporary
+directory first; the deploy build runs it (see railway.json), so the index
+ships with every release.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import urllib.request
+import zipfile
+
+from gazetteer import (
+    COORD_SCALE, HEADER, KEY, MAGIC, PLACE, TZ, VERSION, GAZETTEER_PATH, normalize,
+)
+
+csv.field_size_limit(sys.maxsize)
+
+GEONAMES_URL = os.environ.get("GEONAMES_URL", "https://download.geonames.org/export/dump/")
+DEFAULT_DATASET = "cities1000"
+
+
+def read_countries(path):
+    countries = {}
+    if not path:
+        return countries
+    with open(path, encoding="utf-8") as f:
+        for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+            if not row or row[0].startswith("#") or len(row) < 5:
+                continue
+            countries[row[0]] = row[4]
+    return countries
+
+
+def read_admin1(path):
+    admin1 = {}
+    if not path:
+        return admin1
+    with open(path, encoding="utf-8") as f:
+        for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+            if len(row) >= 2:
+                admin1[row[0]] = row[1]
+    return admin1
+
+
+def read_cities(path, countries, admin1, min_population, alternate_names):
+    with open(path, encoding="utf-8") as f:
+        for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+            if len(row) < 18 or not row[17]:
+                continue
+            population = int(row[14] or 0)
+            if population < min_population:
+                continue
+            cc = row[8] or "XX"
+            names = {row[1], row[2]}
+            if alternate_names and row[3]:
+                names.update(row[3].split(","))
+            keys = {normalize(n) for n in names}
+            keys = {k for k in keys if k and k.isascii()}
+            if not keys:
+                continue
+            yield {
+                "name": row[1],
+                "admin1": admin1.get(f"{cc}.{row[10]}", ""),
+                "admin1_code": row[10] if not row[10].isdigit() else "",
+                "country": countries.get(cc, cc),
+                "country_code": cc,
+                "latitude": float(row[4]),
+                "longitude": float(row[5]),
+                "population": min(population, 2 ** 32 - 1),
+                "timezone": row[17],
+                "keys": keys,
+            }
+
+
+def download(dataset, directory):
+    """Fetch a GeoNames cities dataset with its country and admin1 tables
+    into directory; returns (cities, countries, admin1) paths."""
+    paths = []
+    for name in (f"{dataset}.zip", "countryInfo.txt", "admin1CodesASCII.txt"):
+        path = os.path.join(directory, name)
+        print(f"Downloading {GEONAMES_URL}{name}", file=sys.stderr)
+        urllib.request.urlretrieve(GEONAMES_URL + name, path)
+        paths.append(path)
+    with zipfile.ZipFile(paths[0]) as archive:
+        paths[0] = archive.extract(f"{dataset}.txt", directory)
+    return paths
+
+
+class _Strings:
+    def __init__(self):
+        self.blob = bytearray()
+        self.offsets = {}
+
+    def add(self, text):
+        encoded = text.encode("utf-8")
+        if encoded not in self.offsets:
+            self.offsets[encoded] = len(self.blob)
+            self.blob += encoded
+        return self.offsets[encoded], len(encoded)
+
+
+def build(places, output):
+    strings = _Strings()
+    tz_index = {}
+    place_records = bytearray()
+    keys = []
+
+    for idx, p in enumerate(places):
+        tz_idx = tz_index.setdefault(p["timezone"], len(tz_index))
+        name = strings.add(p["name"])
+        admin = strings.add(p["admin1"])
+        admin_code = strings.add(p["admin1_code"])
+        country = strings.add(p["country"])
+        place_records += PLACE.pack(
+            round(p["latitude"] * COORD_SCALE), round(p["longitude"] * COORD_SCALE),
+            p["population"], tz_idx, p["country_code"].encode("ascii")[:2],
+            *name, *admin, *admin_code, *country,
+        )
+        for key in p["keys"]:
+            keys.append((key.encode("utf-8"), idx))
+
+    keys.sort()
+    key_records = bytearray()
+    for key, idx in keys:
+        off, length = strings.add(key.decode("utf-8"))
+        key_records += KEY.pack(off, idx, length)
+
+    tz_records = bytearray()
+    for tz_name in sorted(tz_index, key=tz_index.get):
+        tz_records += TZ.pack(*strings.add(tz_name))
+
+    n_places = len(place_records) // PLACE.size
+    keys_off = HEADER.size
+    places_off = keys_off + len(key_records)
+    tz_off = places_off + len(place_records)
+    strings_off = tz_off + len(tz_records)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    tmp = output + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(keys), n_places, len(tz_index),
+                            keys_off, places_off, tz_off, strings_off))
+        f.write(key_records)
+        f.write(place_records)
+        f.write(tz_records)
+        f.write(strings.blob)
+    os.replace(tmp, output)
+    return n_places, len(keys)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cities", nargs="?", help="GeoNames cities file (e.g. cities15000.txt)")
+    parser.add_argument("--download", action="store_true",
+                        help="Fetch the GeoNames files instead of reading local ones")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET,
+                        help=f"GeoNames cities dataset to download (default {DEFAULT_DATASET})")
+    parser.add_argument("--countries", help="GeoNames countryInfo.txt for country names")
+    parser.add_argument("--admin1", help="GeoNames admin1CodesASCII.txt for region names")
+    parser.add_argument("--min-population", type=int, default=0)
+    parser.add_argument("--no-alternate-names", action="store_true",
+                        help="Index only the primary and ASCII names")
+    parser.add_argument("-o", "--output", default=GAZETTEER_PATH)
+    args = parser.parse_args(argv)
+    if (args.cities is None) == (not args.download):
+        parser.error("give either a cities file or --download")
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.download:
+            args.cities, args.countries, args.admin1 = download(args.dataset, directory)
+        places = read_cities(args.cities, read_countries(args.countries), read_admin1(args.admin1),
+                             args.min_population, not args.no_alternate_names)
+        n_places, n_keys = build(places, args.output)
+    size = os.path.getsize(args.output)
+    print(f"Wrote {n_places} places / {n_keys} keys to {args.output} ({size / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Content-addressed cache for natal chart calculations.
+
+A chart body is a pure function of (julian day, latitude, longitude,
+ephemeris.Options - ayanamsa, house system, node type), so those inputs - plus CHART_CACHE_VERSION,
+which must be bumped whenever the chart calculation changes - form the key.
+Bodies live in a bounded in-process LRU and, when CHART_CACHE_DB is set, in
+a local SQLite file shared by all worker processes.
+
+Cached bodies (chart_model.ChartModel) are shared between callers and
+must be treated as read-only.
+"""
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import metrics
+
+CHART_CACHE_VERSION = 3
+CHART_CACHE_SIZE = int(os.environ.get("CHART_CACHE_SIZE", 2048))
+CHART_CACHE_DB = os.environ.get("CHART_CACHE_DB", "")
+
+
+def chart_key(jd, lat, lon, opts):
+    raw = f"v{CHART_CACHE_VERSION}|{jd:.6f}|{lat:.6f}|{lon:.6f}|{'|'.join(opts)}"
+    return hashlib.sha1(raw.encode("ascii")).hexdigest()
+
+
+class ChartCache:
+    def __init__(self, size=CHART_CACHE_SIZE, db_path=CHART_CACHE_DB):
+        self.size = size
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self.store_hits = 0
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_pid = None
+
+    def _conn(self):
+        # Connections must not cross a fork, so each worker process opens its own.
+        if not self.db_path:
+            return None
+        if self._db is None or self._db_pid != os.getpid():
+            db = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("CREATE TABLE IF NOT EXISTS charts "
+                       "(key TEXT PRIMARY KEY, version INTEGER NOT NULL, body BLOB NOT NULL)")
+            db.execute("DELETE FROM charts WHERE version != ?", (CHART_CACHE_VERSION,))
+            db.commit()
+            self._db, self._db_pid = db, os.getpid()
+        return self._db
+
+    def _remember(self, key, body):
+        self._lru[key] = body
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.size:
+            self._lru.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            body = self._lru.get(key)
+            if body is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                metrics.count("chart_cache_hit")
+                return body
+            db = self._conn()
+            if db is not None:
+                row = db.execute("SELECT body FROM charts WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    body = pickle.loads(row[0])
+                    self._remember(key, body)
+                    self.hits += 1
+                    self.store_hits += 1
+                    metrics.count("chart_cache_store_hit")
+                    return body
+            self.misses += 1
+            metrics.count("chart_cache_miss")
+            return None
+
+    def put(self, key, body):
+        with self._lock:
+            self._remember(key, body)
+            db = self._conn()
+            if db is not None:
+                db.execute("INSERT OR REPLACE INTO charts (key, version, body) VALUES (?, ?, ?)",
+                           (key, CHART_CACHE_VERSION, pickle.dumps(body, pickle.HIGHEST_PROTOCOL)))
+                db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            self.hits = self.misses = self.store_hits = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "version": CHART_CACHE_VERSION,
+            "entries": len(self._lru),
+            "size": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "store_hits": self.store_hits,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "persistent": bool(self.db_path),
+        }
+
+
+chart_cache = ChartCache()
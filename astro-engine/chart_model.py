@@ -0,0 +1,301 @@
+"""
+Compact natal chart model and its JSON serializer.
+
+compute_chart_body() keeps what Swiss Ephemeris returns as flat tuples on a
+slotted ChartModel - raw tropical and sidereal longitudes, speeds and
+latitudes in PLANET_NAMES order, western house cusps (Placidus unless the
+request's ephemeris.Options says otherwise), ascendant and midheaven -
+together with the sign, nakshatra and house indices derived from them and
+the natal aspect hits. That is what the chart cache holds and what the
+engines (transits, compatibility, horoscope seeds, year scans) read.
+
+The nested response shape is built only at the edge: to_dict() for the
+whole chart, section() for one top-level section, so a profile that asks
+for big_three never materializes the planets. Serialization rounds exactly
+as the dict-building code did, and aspects use the rounded longitudes, so
+responses are unchanged. Built sections are memoized on the model (and on
+its with_birth copies) but never pickled, so a cached chart is serialized
+once per process while the persistent store only holds the tuples.
+
+Models and the sections they return are shared through the cache and must
+be treated as read-only.
+"""
+
+import ephemeris
+import metrics
+from aspect_engine import find_aspects
+from chart_cache import chart_cache, chart_key
+from ephemeris import DEFAULT_OPTIONS
+from geocoding import geocode_place
+from natal_chart import (ASPECTS, NATAL_ASPECTS, PLANETS, SIGN_ELEMENTS, SIGN_MODALITIES, SIGNS, find_house,
+                         get_dignity, get_nakshatra, longitude_to_sign_data, to_julian_day)
+
+PLANET_NAMES = list(PLANETS.values()) + ["Ketu"]
+PLANET_INDEX = {name: i for i, name in enumerate(PLANET_NAMES)}
+RAHU = PLANET_INDEX["Rahu"]
+
+SECTIONS = ["big_three", "planets", "houses", "ascendant", "midheaven",
+            "aspects", "stelliums", "elements", "modalities"]
+
+ELEMENT_WEIGHTS = {"Sun": 3, "Moon": 3, "Mercury": 2, "Venus": 2, "Mars": 2,
+                   "Jupiter": 1, "Saturn": 1, "Uranus": 1, "Neptune": 1, "Pluto": 1}
+ASCENDANT_WEIGHT = 3
+
+_NAK_SPAN = 360 / 27
+# Plain floats: rounding NumPy scalars is several times slower.
+_ASPECT_ORBS = [float(ASPECTS[name]["orb"]) for name in NATAL_ASPECTS.names]
+
+
+class ChartModel:
+    """One natal chart as tuples indexed like PLANET_NAMES. Longitudes are
+    raw; lon() and sid_lon() give the 4-decimal values the JSON carries."""
+
+    __slots__ = ("birth_data", "jd", "latitude", "longitude", "ayanamsa",
+                 "tropical", "sidereal", "speed", "planet_latitude", "retrograde",
+                 "cusps", "asc", "mc", "signs", "sidereal_signs", "nakshatras",
+                 "house_western", "house_vedic", "aspects", "_sections")
+
+    def __init__(self, jd, latitude, longitude, ayanamsa, tropical, sidereal, speed, planet_latitude,
+                 retrograde, cusps, asc, mc, house_western, house_vedic, birth_data=None):
+        self.birth_data = birth_data
+        self.jd = jd
+        self.latitude = latitude
+        self.longitude = longitude
+        self.ayanamsa = ayanamsa
+        self.tropical = tuple(tropical)
+        self.sidereal = tuple(sidereal)
+        self.speed = tuple(speed)
+        self.planet_latitude = tuple(planet_latitude)
+        self.retrograde = tuple(retrograde)
+        self.cusps = tuple(cusps)
+        self.asc = asc
+        self.mc = mc
+        self.house_western = tuple(house_western)
+        self.house_vedic = tuple(house_vedic)
+        self.signs = tuple(int(lon / 30) % 12 for lon in self.tropical)
+        self.sidereal_signs = tuple(int(lon / 30) % 12 for lon in self.sidereal)
+        self.nakshatras = tuple(int(lon / _NAK_SPAN) % 27 for lon in self.sidereal)
+        self.aspects = self._find_aspects()
+        self._sections = {}
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in ChartModel.__slots__ if name != "_sections"}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._sections = {}
+
+    def _find_aspects(self):
+        """(i, j, aspect index, orb) by descending rounded strength, ties in
+        planet order."""
+        lons = self.lons()
+        hits = [(i, j, k, orb) for _, i, j, k, orb in
+                find_aspects(lons, lons, NATAL_ASPECTS, unique_pairs=True).tolist()]
+        hits.sort(key=lambda h: round(1 - h[3] / _ASPECT_ORBS[h[2]], 3), reverse=True)
+        return tuple(hits)
+
+    def with_birth(self, birth_data):
+        """A copy carrying birth_data; the tuples are shared."""
+        model = ChartModel.__new__(ChartModel)
+        for name in ChartModel.__slots__:
+            setattr(model, name, getattr(self, name))
+        model.birth_data = birth_data
+        return model
+
+    def lon(self, name):
+        return round(self.tropical[PLANET_INDEX[name]], 4)
+
+    def sid_lon(self, name):
+        return round(self.sidereal[PLANET_INDEX[name]], 4)
+
+    def lons(self, names=None):
+        return [round(self.tropical[PLANET_INDEX[n]], 4) for n in names] if names else \
+            [round(lon, 4) for lon in self.tropical]
+
+    def cusp_longitudes(self):
+        return [round(c, 4) for c in self.cusps]
+
+    def sign(self, name):
+        return SIGNS[self.signs[PLANET_INDEX[name]]]
+
+    # --- serialization -------------------------------------------------
+
+    def _planet(self, i):
+        name = PLANET_NAMES[i]
+        return {
+            "tropical": longitude_to_sign_data(self.tropical[i]),
+            "sidereal": longitude_to_sign_data(self.sidereal[i]),
+            "nakshatra": get_nakshatra(self.sidereal[i]),
+            "dignity": get_dignity(name, SIGNS[self.signs[i]]),
+            "house_western": self.house_western[i],
+            "house_vedic": self.house_vedic[i],
+            "retrograde": self.retrograde[i],
+            "speed_deg_per_day": round(self.speed[i], 6),
+            "latitude": round(self.planet_latitude[i], 4),
+        }
+
+    def _big_three(self):
+        sun, moon = PLANET_INDEX["Sun"], PLANET_INDEX["Moon"]
+        moon_nak = get_nakshatra(self.sidereal[moon])
+        asc = longitude_to_sign_data(self.asc)
+        return {
+            "sun": {"sign": SIGNS[self.signs[sun]], "house": self.house_western[sun],
+                    "degree": longitude_to_sign_data(self.tropical[sun])["formatted"]},
+            "moon": {"sign": SIGNS[self.signs[moon]], "house": self.house_western[moon],
+                     "degree": longitude_to_sign_data(self.tropical[moon])["formatted"],
+                     "nakshatra": moon_nak["name"], "nakshatra_pada": moon_nak["pada"]},
+            "rising": {"sign": asc["sign"], "degree": asc["formatted"]},
+        }
+
+    def _aspects(self):
+        out = []
+        for i, j, k, orb in self.aspects:
+            name = NATAL_ASPECTS.names[k]
+            data = ASPECTS[name]
+            out.append({
+                "planet1": PLANET_NAMES[i], "planet2": PLANET_NAMES[j],
+                "aspect": name, "nature": data["nature"], "harmony": data["harmony"],
+                "orb": round(orb, 2), "strength": round(1 - (orb / data["orb"]), 3),
+            })
+        return out
+
+    def _stelliums(self):
+        groups = {}
+        for name, sign in zip(PLANET_NAMES, self.signs):
+            groups.setdefault(SIGNS[sign], []).append(name)
+        return [{"sign": s, "planets": p, "count": len(p)} for s, p in groups.items() if len(p) >= 3]
+
+    def _balance(self, table, counts):
+        for name, sign in zip(PLANET_NAMES, self.signs):
+            counts[table[SIGNS[sign]]] += ELEMENT_WEIGHTS.get(name, 0)
+        counts[table[SIGNS[int(self.asc / 30) % 12]]] += ASCENDANT_WEIGHT
+        return {"counts": counts, "dominant": max(counts, key=counts.get)}
+
+    def section(self, name):
+        """One top-level section of the chart response."""
+        if name == "birth_data":
+            return self.birth_data
+        value = self._sections.get(name)
+        if value is None:
+            value = self._sections[name] = self._build(name)
+        return value
+
+    def _build(self, name):
+        if name == "big_three":
+            return self._big_three()
+        if name == "planets":
+            return {n: self._planet(i) for i, n in enumerate(PLANET_NAMES)}
+        if name == "houses":
+            return {i + 1: {"cusp_longitude": round(c, 4), "sign": longitude_to_sign_data(c)}
+                    for i, c in enumerate(self.cusps)}
+        if name == "ascendant":
+            return longitude_to_sign_data(self.asc)
+        if name == "midheaven":
+            return longitude_to_sign_data(self.mc)
+        if name == "aspects":
+            return self._aspects()
+        if name == "stelliums":
+            return self._stelliums()
+        if name == "elements":
+            return self._balance(SIGN_ELEMENTS, {"Fire": 0, "Earth": 0, "Air": 0, "Water": 0})
+        if name == "modalities":
+            return self._balance(SIGN_MODALITIES, {"Cardinal": 0, "Fixed": 0, "Mutable": 0})
+        raise KeyError(name)
+
+    def to_dict(self):
+        """The full chart in the calculate_natal_chart response shape."""
+        out = {"birth_data": self.birth_data} if self.birth_data is not None else {}
+        for name in SECTIONS:
+            out[name] = self.section(name)
+        return out
+
+
+def compute_chart_body(jd, lat, lon, opts=DEFAULT_OPTIONS) -> ChartModel:
+    """Location- and time-dependent part of the natal chart, without the
+    birth_data echo, as stored in the chart cache. opts picks the ayanamsa,
+    the western house system and the node type."""
+    ayanamsa = ephemeris.ayanamsa(jd, opts.ayanamsa)
+
+    with metrics.stage("houses"):
+        cusps_western, ascmc = ephemeris.houses(jd, lat, lon, opts.house_system)
+        cusps_wholesign, _ = ephemeris.houses(jd, lat, lon, "whole_sign")
+
+    with metrics.stage("planets"):
+        tropical, sidereal, speed, latitude, retrograde = [], [], [], [], []
+        for xx in ephemeris.positions(jd, ephemeris.planet_ids(PLANETS, opts)):
+            tropical.append(xx[0])
+            sidereal.append((xx[0] - ayanamsa) % 360)
+            speed.append(xx[3])
+            latitude.append(xx[1])
+            retrograde.append(xx[3] < 0)
+        # Ketu is placed from Rahu's longitude as published (4 decimals).
+        ketu = (round(tropical[RAHU], 4) + 180) % 360
+        tropical.append(ketu)
+        sidereal.append((ketu - ayanamsa) % 360)
+        speed.append(0)
+        latitude.append(0)
+        retrograde.append(True)
+
+        house_western = [find_house(t, cusps_western) for t in tropical]
+        house_vedic = [find_house(s, cusps_wholesign) for s in sidereal]
+
+    with metrics.stage("aspects"):
+        return ChartModel(jd, lat, lon, ayanamsa, tropical, sidereal, speed, latitude, retrograde,
+                          cusps_western[:12], ascmc[0], ascmc[1], house_western, house_vedic)
+
+
+def calculate_chart(year, month, day, hour, minute, second, place_name, loc=None, jd=None,
+                    opts=DEFAULT_OPTIONS) -> ChartModel:
+    """Natal chart model. Batch callers may pass an already geocoded loc and
+    its julian day to skip the lookup and timezone conversion; opts is an
+    ephemeris.Options for a non-default ayanamsa, house system or node."""
+    if loc is None:
+        loc = geocode_place(place_name)
+    lat, lon, tz_str = loc["latitude"], loc["longitude"], loc["timezone"]
+    if jd is None:
+        with metrics.stage("julian_day"):
+            jd = to_julian_day(year, month, day, hour, minute, second, tz_str)
+
+    key = chart_key(jd, lat, lon, opts)
+    body = chart_cache.get(key)
+    if body is None:
+        body = compute_chart_body(jd, lat, lon, opts)
+        chart_cache.put(key, body)
+
+    birth_data = {
+        "date": f"{year}-{month:02d}-{day:02d}", "time": f"{hour:02d}:{minute:02d}:{second:02d}",
+        "place": place_name, "latitude": lat, "longitude": lon, "timezone": tz_str,
+        "julian_day": round(jd, 6), f"ayanamsa_{opts.ayanamsa}": round(body.ayanamsa, 4),
+    }
+    if opts != DEFAULT_OPTIONS:
+        birth_data["options"] = opts._asdict()
+    return body.with_birth(birth_data)
+
+
+def calculate_natal_chart(year, month, day, hour, minute, second, place_name, loc=None, jd=None,
+                          opts=DEFAULT_OPTIONS) -> dict:
+    """Full natal chart in its JSON shape."""
+    return calculate_chart(year, month, day, hour, minute, second, place_name, loc=loc, jd=jd, opts=opts).to_dict()
+
+
+def from_dict(chart) -> ChartModel:
+    """Model of a stored full chart (a calculate_natal_chart result read
+    back from JSON). Longitudes keep the 4 decimals they were stored with."""
+    planets = chart["planets"]
+    rows = [planets[name] for name in PLANET_NAMES]
+    houses = chart["houses"]
+    birth = chart.get("birth_data") or {}
+    ayanamsa = (birth.get("options") or {}).get("ayanamsa", DEFAULT_OPTIONS.ayanamsa)
+    return ChartModel(
+        birth.get("julian_day"), birth.get("latitude"), birth.get("longitude"), birth.get(f"ayanamsa_{ayanamsa}"),
+        [p["tropical"]["total_longitude"] for p in rows],
+        [p["sidereal"]["total_longitude"] for p in rows],
+        [p["speed_deg_per_day"] for p in rows],
+        [p["latitude"] for p in rows],
+        [p["retrograde"] for p in rows],
+        [houses[str(h) if str(h) in houses else h]["cusp_longitude"] for h in range(1, 13)],
+        chart["ascendant"]["total_longitude"], chart["midheaven"]["total_longitude"],
+        [p["house_western"] for p in rows], [p["house_vedic"] for p in rows],
+        birth_data=chart.get("birth_data"),
+    )
@@ -0,0 +1,156 @@
+"""
+Persistent store of computed charts, keyed by a stable chart id.
+
+A stored chart keeps the birth input, its ephemeris.Options, the geocoded
+location and julian day next to the pickled ChartModel, so fetching it by
+id never geocodes or recomputes. Only the time-dependent parts of a
+response (current dasha, active transits) are worked out again on each
+read. Rows written under an older CHART_CACHE_VERSION are recomputed from
+their stored inputs on first read and rewritten.
+
+Ids are issued by the store (new_chart_id(): 128 random bits), never
+chosen by the caller or derived from the birth, because an id is all it
+takes to read or delete a chart: the client keeps it with its user record
+like any other credential. Every route checks an id's format with
+check_chart_id() before it reaches the store. The file is shared by all
+worker processes; each opens its own connection.
+
+A Railway container's own filesystem is replaced on every deploy, which
+would drop every stored chart and turn saved ids into 404s, so the file
+belongs on a volume. With one attached to the service (Railway sets
+RAILWAY_VOLUME_MOUNT_PATH) the store defaults to charts.db on it, and
+check_persistent() stops a deployed server from starting without one.
+
+Configuration (environment):
+    CHART_STORE_DB         SQLite file, default charts.db on the mounted
+                           volume, else data/charts.db
+    CHART_STORE_EPHEMERAL  "1" to allow a deployed server without a volume
+                           (preview environments whose charts may be lost)
+"""
+
+import json
+import os
+import pickle
+import re
+import secrets
+import sqlite3
+import threading
+import time
+
+import metrics
+from chart_cache import CHART_CACHE_VERSION
+from chart_model import calculate_chart
+from ephemeris import Options
+
+VOLUME_PATH = os.environ.get("RAILWAY_VOLUME_MOUNT_PATH")
+CHART_STORE_DB = os.environ.get(
+    "CHART_STORE_DB",
+    os.path.join(VOLUME_PATH or os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"), "charts.db"),
+)
+CHART_STORE_EPHEMERAL = os.environ.get("CHART_STORE_EPHEMERAL", "0") == "1"
+CHART_ID_BYTES = 16
+# Ids per SELECT ... IN; SQLite's default limit on bound variables is 999.
+_FETCH_CHUNK = 500
+_CHART_ID = re.compile(r"[A-Za-z0-9_-]{22}")
+
+
+def new_chart_id() -> str:
+    """A fresh, unguessable chart id (22 URL-safe characters)."""
+    return secrets.token_urlsafe(CHART_ID_BYTES)
+
+
+def check_chart_id(value):
+    """value when it has the form of an id new_chart_id() issues;
+    ValueError otherwise."""
+    if not isinstance(value, str) or not _CHART_ID.fullmatch(value):
+        raise ValueError("Invalid chart_id: expected an id issued by POST /charts")
+    return value
+
+
+def check_persistent(db_path=CHART_STORE_DB):
+    """Raise RuntimeError when running on Railway (RAILWAY_ENVIRONMENT is
+    set) with db_path outside the mounted volume, unless CHART_STORE_DB
+    names the file explicitly or CHART_STORE_EPHEMERAL allows it."""
+    if not os.environ.get("RAILWAY_ENVIRONMENT") or CHART_STORE_EPHEMERAL or "CHART_STORE_DB" in os.environ:
+        return
+    volume = os.environ.get("RAILWAY_VOLUME_MOUNT_PATH")
+    if volume and os.path.abspath(db_path).startswith(os.path.join(os.path.abspath(volume), "")):
+        return
+    raise RuntimeError(f"Chart store {db_path} is not on a volume and would be wiped on every deploy: "
+                       f"attach a volume to the service, or set CHART_STORE_DB or CHART_STORE_EPHEMERAL=1")
+
+
+class ChartStore:
+    def __init__(self, db_path=CHART_STORE_DB):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_pid = None
+
+    def _conn(self):
+        # Connections must not cross a fork, so each worker process opens its own.
+        if self._db is None or self._db_pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            db = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("CREATE TABLE IF NOT EXISTS charts "
+                       "(id TEXT PRIMARY KEY, birth TEXT NOT NULL, loc TEXT NOT NULL, jd REAL NOT NULL, "
+                       "version INTEGER NOT NULL, body BLOB NOT NULL, updated REAL NOT NULL)")
+            db.commit()
+            self._db, self._db_pid = db, os.getpid()
+        return self._db
+
+    def put(self, chart_id, birth, opts, loc, jd, chart):
+        """Store chart (a ChartModel with its birth_data) under chart_id,
+        replacing any chart stored there before."""
+        row = (chart_id, json.dumps({"birth": list(birth), "options": list(opts)}), json.dumps(loc), jd,
+               CHART_CACHE_VERSION, pickle.dumps(chart, pickle.HIGHEST_PROTOCOL), time.time())
+        with self._lock:
+            db = self._conn()
+            db.execute("INSERT OR REPLACE INTO charts (id, birth, loc, jd, version, body, updated) "
+                       "VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+            db.commit()
+
+    def get(self, chart_id):
+        """The stored ChartModel, or None."""
+        return self.get_many([chart_id]).get(chart_id)
+
+    def get_many(self, ids):
+        """{id: ChartModel} for the ids that are stored."""
+        ids = list(dict.fromkeys(ids))
+        found, stale = {}, []
+        with metrics.stage("chart_store"):
+            with self._lock:
+                db = self._conn()
+                for start in range(0, len(ids), _FETCH_CHUNK):
+                    chunk = ids[start:start + _FETCH_CHUNK]
+                    rows = db.execute(f"SELECT id, birth, loc, jd, version, body FROM charts "
+                                      f"WHERE id IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+                    for key, birth, loc, jd, version, body in rows:
+                        if version == CHART_CACHE_VERSION:
+                            found[key] = pickle.loads(body)
+                        else:
+                            stale.append((key, json.loads(birth), json.loads(loc), jd))
+            for key, birth, loc, jd in stale:
+                found[key] = self._refresh(key, birth, loc, jd)
+        metrics.count("chart_store_hit", len(found))
+        metrics.count("chart_store_miss", len(ids) - len(found))
+        return found
+
+    def _refresh(self, chart_id, stored, loc, jd):
+        opts = Options(*stored["options"])
+        chart = calculate_chart(*stored["birth"], loc=loc, jd=jd, opts=opts)
+        self.put(chart_id, stored["birth"], opts, loc, jd, chart)
+        return chart
+
+    def delete(self, chart_id):
+        """True when a chart was stored under chart_id."""
+        with self._lock:
+            db = self._conn()
+            deleted = db.execute("DELETE FROM charts WHERE id = ?", (chart_id,)).rowcount
+            db.commit()
+        return deleted > 0
+
+
+chart_store = ChartStore()
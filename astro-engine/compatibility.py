@@ -0,0 +1,242 @@
+"""
+PalmCosmic Compatibility Engine
+Ashtakoot (Guna Milan) scoring from sidereal Moon positions plus Western
+synastry aspects between two charts.
+
+Every koota depends only on the two Moon nakshatras or the two Moon signs,
+so each one is precomputed as a 27x27 or 12x12 table at import. Single
+matches and one-against-many batches index the same tables, the latter
+with NumPy fancy indexing over arrays of per-chart features. person1 is
+scored as the groom side and person2 as the bride side, as in the
+traditional tables.
+"""
+
+import numpy as np
+
+from natal_chart import ASPECTS, SIGNS, NAKSHATRAS
+from aspect_engine import AspectTable, find_aspects, strengths
+
+SYNASTRY_PLANETS = ["Sun", "Moon", "Mercury", "Venus", "Mars", "Jupiter",
+                    "Saturn", "Uranus", "Neptune", "Pluto", "Rahu", "Ketu"]
+SYNASTRY_ASPECTS = AspectTable(ASPECTS)
+
+KOOTAS = ["varna", "vashya", "tara", "yoni", "graha_maitri", "gana", "bhakoot", "nadi"]
+KOOTA_MAX = {"varna": 1, "vashya": 2, "tara": 3, "yoni": 4, "graha_maitri": 5,
+             "gana": 6, "bhakoot": 7, "nadi": 8}
+MAX_SCORE = sum(KOOTA_MAX.values())
+
+# Brahmin 3, Kshatriya 2, Vaishya 1, Shudra 0, by Moon sign.
+SIGN_VARNA = [2, 1, 0, 3, 2, 1, 0, 3, 2, 1, 0, 3]
+# Chatushpada 0, Manava 1, Jalachara 2, Vanachara 3, Keeta 4, by Moon sign.
+SIGN_VASHYA = [0, 0, 1, 2, 3, 1, 1, 4, 1, 2, 1, 2]
+VASHYA_SCORES = [
+    [2, 1, 1, 0.5, 1],
+    [1, 2, 0.5, 0, 1],
+    [1, 0.5, 2, 1, 1],
+    [0.5, 0, 1, 2, 0],
+    [1, 1, 1, 0, 2],
+]
+
+SIGN_LORDS = ["Mars", "Venus", "Mercury", "Moon", "Sun", "Mercury",
+              "Venus", "Mars", "Jupiter", "Saturn", "Saturn", "Jupiter"]
+PLANET_FRIENDS = {
+    "Sun":     {"friend": ["Moon", "Mars", "Jupiter"], "enemy": ["Venus", "Saturn"]},
+    "Moon":    {"friend": ["Sun", "Mercury"], "enemy": []},
+    "Mars":    {"friend": ["Sun", "Moon", "Jupiter"], "enemy": ["Mercury"]},
+    "Mercury": {"friend": ["Sun", "Venus"], "enemy": ["Moon"]},
+    "Jupiter": {"friend": ["Sun", "Moon", "Mars"], "enemy": ["Mercury", "Venus"]},
+    "Venus":   {"friend": ["Mercury", "Saturn"], "enemy": ["Sun", "Moon"]},
+    "Saturn":  {"friend": ["Mercury", "Venus"], "enemy": ["Sun", "Moon", "Mars"]},
+}
+MAITRI_SCORES = {
+    ("friend", "friend"): 5, ("friend", "neutral"): 4, ("neutral", "neutral"): 3,
+    ("enemy", "friend"): 1, ("enemy", "neutral"): 0.5, ("enemy", "enemy"): 0,
+}
+
+YONI_ANIMALS = ["Horse", "Elephant", "Sheep", "Serpent", "Dog", "Cat", "Rat",
+                "Cow", "Buffalo", "Tiger", "Deer", "Monkey", "Mongoose", "Lion"]
+NAKSHATRA_YONI = [0, 1, 2, 3, 3, 4, 5, 2, 5, 6, 6, 7, 8, 9, 8, 9, 10, 10, 4, 11, 12, 11, 13, 0, 13, 7, 1]
+YONI_SCORES = [
+    [4, 2, 2, 3, 2, 2, 2, 1, 0, 1, 3, 3, 2, 1],
+    [2, 4, 3, 3, 2, 2, 2, 2, 3, 1, 2, 3, 2, 0],
+    [2, 3, 4, 2, 1, 2, 1, 3, 3, 1, 2, 0, 3, 1],
+    [3, 3, 2, 4, 2, 1, 1, 1, 1, 2, 2, 2, 0, 2],
+    [2, 2, 1, 2, 4, 2, 1, 2, 2, 1, 0, 2, 1, 1],
+    [2, 2, 2, 1, 2, 4, 0, 2, 2, 1, 3, 3, 2, 1],
+    [2, 2, 1, 1, 1, 0, 4, 2, 2, 2, 2, 2, 1, 2],
+    [1, 2, 3, 1, 2, 2, 2, 4, 3, 0, 3, 2, 2, 1],
+    [0, 3, 3, 1, 2, 2, 2, 3, 4, 1, 2, 2, 2, 1],
+    [1, 1, 1, 2, 1, 1, 2, 0, 1, 4, 1, 1, 2, 1],
+    [3, 2, 2, 2, 0, 3, 2, 3, 2, 1, 4, 2, 2, 1],
+    [3, 3, 0, 2, 2, 3, 2, 2, 2, 1, 2, 4, 3, 2],
+    [2, 2, 3, 0, 1, 2, 1, 2, 2, 2, 2, 3, 4, 2],
+    [1, 0, 1, 2, 1, 1, 2, 1, 1, 1, 1, 2, 2, 4],
+]
+
+# Deva 0, Manushya 1, Rakshasa 2.
+NAKSHATRA_GANA = [0, 1, 2, 1, 0, 1, 0, 0, 2, 2, 1, 1, 0, 2, 0, 2, 0, 2, 2, 1, 1, 0, 2, 2, 1, 1, 0]
+GANA_SCORES = [[6, 6, 1], [5, 6, 0], [1, 0, 6]]
+
+# Adi 0, Madhya 1, Antya 2.
+NAKSHATRA_NADI = [[0, 1, 2, 2, 1, 0][i % 6] for i in range(27)]
+
+
+def _relation(planet, other):
+    if other in PLANET_FRIENDS[planet]["friend"]:
+        return "friend"
+    if other in PLANET_FRIENDS[planet]["enemy"]:
+        return "enemy"
+    return "neutral"
+
+
+def _maitri(sign_a, sign_b):
+    lord_a, lord_b = SIGN_LORDS[sign_a], SIGN_LORDS[sign_b]
+    if lord_a == lord_b:
+        return 5
+    pair = tuple(sorted((_relation(lord_a, lord_b), _relation(lord_b, lord_a))))
+    return MAITRI_SCORES[pair]
+
+
+def _tara(nak_from, nak_to):
+    return 0 if (((nak_to - nak_from) % 27) + 1) % 9 in (3, 5, 7) else 1.5
+
+
+def _bhakoot(sign_a, sign_b):
+    return 0 if ((sign_a - sign_b) % 12) + 1 in (2, 12, 5, 9, 6, 8) else 7
+
+
+# [koota][person1 index][person2 index]
+SIGN_TABLES = {
+    "varna": np.array([[1 if SIGN_VARNA[a] >= SIGN_VARNA[b] else 0 for b in range(12)] for a in range(12)], float),
+    "vashya": np.array([[VASHYA_SCORES[SIGN_VASHYA[a]][SIGN_VASHYA[b]] for b in range(12)] for a in range(12)], float),
+    "graha_maitri": np.array([[_maitri(a, b) for b in range(12)] for a in range(12)], float),
+    "bhakoot": np.array([[_bhakoot(a, b) for b in range(12)] for a in range(12)], float),
+}
+NAKSHATRA_TABLES = {
+    "tara": np.array([[_tara(b, a) + _tara(a, b) for b in range(27)] for a in range(27)], float),
+    "yoni": np.array([[YONI_SCORES[NAKSHATRA_YONI[a]][NAKSHATRA_YONI[b]] for b in range(27)] for a in range(27)], float),
+    "gana": np.array([[GANA_SCORES[NAKSHATRA_GANA[a]][NAKSHATRA_GANA[b]] for b in range(27)] for a in range(27)], float),
+    "nadi": np.array([[0 if NAKSHATRA_NADI[a] == NAKSHATRA_NADI[b] else 8 for b in range(27)] for a in range(27)], float),
+}
+
+
+def chart_features(chart) -> dict:
+    """The per-chart inputs to compatibility scoring (from a ChartModel),
+    cheap to store and ship."""
+    return {
+        "moon_sidereal_longitude": chart.sid_lon("Moon"),
+        "longitudes": dict(zip(SYNASTRY_PLANETS, chart.lons(SYNASTRY_PLANETS))),
+    }
+
+
+def _moon_indices(moon_sid):
+    moon_sid = np.asarray(moon_sid, dtype=np.float64) % 360
+    return (moon_sid // (360 / 27)).astype(np.int64), (moon_sid // 30).astype(np.int64)
+
+
+def _longitude_matrix(features):
+    return np.array([[f["longitudes"].get(p, np.nan) for p in SYNASTRY_PLANETS] for f in features], dtype=np.float64)
+
+
+def compatibility_level(percentage):
+    if percentage >= 75:
+        return "Excellent"
+    if percentage >= 60:
+        return "Good"
+    if percentage >= 45:
+        return "Moderate"
+    return "Low"
+
+
+def ashtakoot_scores(person1_moon, person2_moons):
+    """Koota score columns for one person1 Moon against many person2 Moons."""
+    nak1, sign1 = _moon_indices(person1_moon)
+    nak2, sign2 = _moon_indices(person2_moons)
+    scores = {}
+    for koota in KOOTAS:
+        if koota in SIGN_TABLES:
+            scores[koota] = SIGN_TABLES[koota][sign1, sign2]
+        else:
+            scores[koota] = NAKSHATRA_TABLES[koota][nak1, nak2]
+    scores["total"] = sum(scores[k] for k in KOOTAS)
+    return scores
+
+
+def synastry_scores(person_lons, candidate_lons):
+    """Harmony score (0-100) per candidate from strength-weighted soft vs
+    hard aspects between the person's and each candidate's planets."""
+    n = candidate_lons.shape[0]
+    hits = find_aspects(person_lons, np.nan_to_num(candidate_lons, nan=-1e9), SYNASTRY_ASPECTS)
+    weight = strengths(hits, SYNASTRY_ASPECTS)
+    harmony = np.array([ASPECTS[name]["harmony"] for name in SYNASTRY_ASPECTS.names])[hits["aspect"]]
+    soft = np.bincount(hits["chart"], weights=weight * (harmony == "soft"), minlength=n)
+    hard = np.bincount(hits["chart"], weights=weight * (harmony == "hard"), minlength=n)
+    total = soft + hard
+    return np.where(total > 0, np.round(100 * soft / np.where(total > 0, total, 1)), 50.0), hits
+
+
+def match(person1: dict, person2: dict) -> dict:
+    """Full compatibility report between two chart_features dicts."""
+    scores = ashtakoot_scores(person1["moon_sidereal_longitude"], [person2["moon_sidereal_longitude"]])
+    total = float(scores["total"][0])
+    percentage = round(total / MAX_SCORE * 100)
+
+    lons1 = _longitude_matrix([person1])[0]
+    lons2 = _longitude_matrix([person2])
+    synastry, hits = synastry_scores(lons1, lons2)
+    aspects = []
+    for (_, i, j, k, orb), strength in zip(hits.tolist(), strengths(hits, SYNASTRY_ASPECTS).tolist()):
+        asp_name = SYNASTRY_ASPECTS.names[k]
+        aspects.append({
+            "person1_planet": SYNASTRY_PLANETS[i], "person2_planet": SYNASTRY_PLANETS[j],
+            "aspect": asp_name, "nature": ASPECTS[asp_name]["nature"],
+            "harmony": ASPECTS[asp_name]["harmony"],
+            "orb": round(orb, 2), "strength": round(strength, 3),
+        })
+    aspects.sort(key=lambda a: a["strength"], reverse=True)
+
+    nak1, sign1 = _moon_indices(person1["moon_sidereal_longitude"])
+    nak2, sign2 = _moon_indices(person2["moon_sidereal_longitude"])
+    return {
+        "ashtakoot": {
+            "total_score": total,
+            "max_score": MAX_SCORE,
+            "percentage": percentage,
+            "level": compatibility_level(percentage),
+            "breakdown": {k: {"score": float(scores[k][0]), "max": KOOTA_MAX[k]} for k in KOOTAS},
+            "person1_moon": {"sign": SIGNS[sign1], "nakshatra": NAKSHATRAS[nak1]["name"]},
+            "person2_moon": {"sign": SIGNS[sign2], "nakshatra": NAKSHATRAS[nak2]["name"]},
+        },
+        "synastry": {
+            "score": float(synastry[0]),
+            "aspects": aspects,
+        },
+    }
+
+
+def rank(person: dict, candidates: list, top: int = None) -> list:
+    """Score person (as person1) against every candidate (as person2) in one
+    vectorized pass; best matches first."""
+    if top is not None and top < 1:
+        raise ValueError("top must be at least 1")
+    if not candidates:
+        return []
+    scores = ashtakoot_scores(person["moon_sidereal_longitude"],
+                              [c["moon_sidereal_longitude"] for c in candidates])
+    synastry, _ = synastry_scores(_longitude_matrix([person])[0], _longitude_matrix(candidates))
+    order = np.lexsort((-synastry, -scores["total"]))
+    if top is not None:
+        order = order[:top]
+    ranked = []
+    for idx in order.tolist():
+        total = float(scores["total"][idx])
+        percentage = round(total / MAX_SCORE * 100)
+        ranked.append({
+            "index": idx,
+            "total_score": total,
+            "percentage": percentage,
+            "level": compatibility_level(percentage),
+            "synastry_score": float(synastry[idx]),
+            "breakdown": {k: float(scores[k][idx]) for k in KOOTAS},
+        })
+    return ranked
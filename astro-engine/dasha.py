@@ -1,5 +1,7 @@
+from bisect import bisect_right
 from datetime import datetime, timedelta
-from dateutil.relativedelta import relativedelta
+
+import numpy as np
 
 DASHA_YEARS = {
     "Ketu": 7, "Venus": 20, "Sun": 6, "Moon": 10, "Mars": 7,
@@ -9,98 +11,181 @@ DASHA_ORDER = ["Ketu", "Venus", "Sun", "Moon", "Mars", "Rahu", "Jupiter", "Satur
 TOTAL_CYCLE = 120
 NAK_RULERS = DASHA_ORDER * 3
 
+LEVELS = ["mahadasha", "antardasha", "pratyantardasha", "sookshma", "prana"]
+DAYS_PER_YEAR = 365.25
+MAX_SPAN_DAYS = 100 * DAYS_PER_YEAR
 
-def calculate_dasha(moon_sidereal_longitude: float, birth_date: datetime) -> dict:
-    nak_span = 360 / 27
-    nak_idx = int(moon_sidereal_longitude / nak_span) % 27
-    pos_in_nak = moon_sidereal_longitude % nak_span
-    fraction_remaining = 1 - (pos_in_nak / nak_span)
-    
-    starting_ruler = NAK_RULERS[nak_idx]
-    start_idx = DASHA_ORDER.index(starting_ruler)
-    
-    mahadashas = []
-    current_date = birth_date
-    
-    for cycle in range(3):
-        for i in range(9):
-            idx = (start_idx + i) % 9
-            ruler = DASHA_ORDER[idx]
-            full_years = DASHA_YEARS[ruler]
-            
-            if cycle == 0 and i == 0:
-                years = full_years * fraction_remaining
-            else:
-                years = full_years
-            
-            total_days = years * 365.25
-            end_date = current_date + timedelta(days=total_days)
-            age_start = (current_date - birth_date).days / 365.25
-            age_end = (end_date - birth_date).days / 365.25
-            
-            md = {
-                "ruler": ruler,
-                "start_date": current_date.strftime("%Y-%m-%d"),
-                "end_date": end_date.strftime("%Y-%m-%d"),
-                "duration_years": round(years, 2),
-                "age_start": round(age_start, 1),
-                "age_end": round(age_end, 1),
-                "sub_periods": [],
-            }
-            
-            sub_date = current_date
-            for j in range(9):
-                sub_idx = (idx + j) % 9
-                sub_ruler = DASHA_ORDER[sub_idx]
-                sub_years = (DASHA_YEARS[ruler] * DASHA_YEARS[sub_ruler]) / TOTAL_CYCLE
-                if cycle == 0 and i == 0:
-                    sub_years *= fraction_remaining
-                sub_days = sub_years * 365.25
-                sub_end = sub_date + timedelta(days=sub_days)
-                sub_age_start = (sub_date - birth_date).days / 365.25
-                sub_age_end = (sub_end - birth_date).days / 365.25
-                
-                md["sub_periods"].append({
-                    "ruler": sub_ruler,
-                    "start_date": sub_date.strftime("%Y-%m-%d"),
-                    "end_date": sub_end.strftime("%Y-%m-%d"),
-                    "duration_months": round(sub_years * 12, 1),
-                    "age_start": round(sub_age_start, 1),
-                    "age_end": round(sub_age_end, 1),
-                    "label": f"{ruler}/{sub_ruler}",
-                })
-                sub_date = sub_end
-            
-            mahadashas.append(md)
-            current_date = end_date
-            if (current_date - birth_date).days > 100 * 365.25:
+
+class DashaTimeline:
+    """Vimshottari periods as numeric day offsets from birth.
+
+    Only mahadasha boundaries are stored; each deeper level is the parent
+    split in proportion to DASHA_YEARS starting from the parent's ruler, and
+    is expanded only when a lookup or serialization asks for it.
+    """
+
+    def __init__(self, moon_sidereal_longitude: float, birth_date: datetime):
+        nak_span = 360 / 27
+        nak_idx = int(moon_sidereal_longitude / nak_span) % 27
+        pos_in_nak = moon_sidereal_longitude % nak_span
+        self.birth_date = birth_date
+        self.fraction_remaining = 1 - (pos_in_nak / nak_span)
+        self.starting_ruler = NAK_RULERS[nak_idx]
+
+        start_idx = DASHA_ORDER.index(self.starting_ruler)
+        self.rulers = []
+        self.bounds = [0.0]
+        for k in range(27):
+            idx = (start_idx + k) % 9
+            years = DASHA_YEARS[DASHA_ORDER[idx]] * (self.fraction_remaining if k == 0 else 1)
+            self.rulers.append(idx)
+            self.bounds.append(self.bounds[-1] + years * DAYS_PER_YEAR)
+            if int(self.bounds[-1]) > MAX_SPAN_DAYS:
                 break
-        if (current_date - birth_date).days > 100 * 365.25:
-            break
-    
-    now = datetime.now()
-    current_md = None
-    current_ad = None
-    for md in mahadashas:
-        md_start = datetime.strptime(md["start_date"], "%Y-%m-%d")
-        md_end = datetime.strptime(md["end_date"], "%Y-%m-%d")
-        if md_start <= now <= md_end:
-            current_md = md["ruler"]
-            for ad in md["sub_periods"]:
-                ad_start = datetime.strptime(ad["start_date"], "%Y-%m-%d")
-                ad_end = datetime.strptime(ad["end_date"], "%Y-%m-%d")
-                if ad_start <= now <= ad_end:
-                    current_ad = ad["ruler"]
-                    break
-            break
-    
+
+    def offset(self, when: datetime) -> float:
+        return (when - self.birth_date).total_seconds() / 86400
+
+    def date_at(self, offset: float) -> datetime:
+        return self.birth_date + timedelta(days=offset)
+
+    @staticmethod
+    def children(ruler, start, end):
+        """(ruler, start, end) of the nine sub-periods of a period."""
+        length = end - start
+        out = []
+        for j in range(9):
+            sub = (ruler + j) % 9
+            sub_end = start + length * DASHA_YEARS[DASHA_ORDER[sub]] / TOTAL_CYCLE
+            out.append((sub, start, sub_end))
+            start = sub_end
+        return out
+
+    def path_at(self, when: datetime, depth: int = 2):
+        """[(ruler, start, end)] from mahadasha down to depth levels for the
+        instant when, or [] outside the timeline."""
+        t = self.offset(when)
+        k = bisect_right(self.bounds, t) - 1
+        if k < 0 or k >= len(self.rulers):
+            return []
+        path = [(self.rulers[k], self.bounds[k], self.bounds[k + 1])]
+        while len(path) < depth:
+            subs = self.children(*path[-1])
+            ends = [end for _, _, end in subs]
+            path.append(subs[min(bisect_right(ends, t), 8)])
+        return path
+
+    def current_period(self, now: datetime = None, depth: int = 2) -> dict:
+        path = self.path_at(now or datetime.now(), depth)
+        names = [DASHA_ORDER[ruler] for ruler, _, _ in path] + [None] * (depth - len(path))
+        period = dict(zip(LEVELS, names))
+        period["label"] = " / ".join(f"{name} {level.capitalize()}" for level, name in zip(LEVELS, names))
+        if path:
+            period["next_change"] = self.date_at(min(end for _, _, end in path)).strftime("%Y-%m-%d")
+        return period
+
+    def _period_dict(self, level, chain, start, end):
+        data = {
+            "ruler": DASHA_ORDER[chain[-1]],
+            "start_date": self.date_at(start).strftime("%Y-%m-%d"),
+            "end_date": self.date_at(end).strftime("%Y-%m-%d"),
+        }
+        years = (end - start) / DAYS_PER_YEAR
+        if level == 0:
+            data["duration_years"] = round(years, 2)
+        elif level == 1:
+            data["duration_months"] = round(years * 12, 1)
+        else:
+            data["duration_days"] = round(end - start, 1)
+        data["age_start"] = round(int(start) / DAYS_PER_YEAR, 1)
+        data["age_end"] = round(int(end) / DAYS_PER_YEAR, 1)
+        if level > 0:
+            data["label"] = "/".join(DASHA_ORDER[r] for r in chain)
+        return data
+
+    def _expand(self, level, chain, start, end, depth, lo, hi):
+        data = self._period_dict(level, chain, start, end)
+        if level + 1 < depth:
+            data["sub_periods"] = [
+                self._expand(level + 1, chain + [sub], s, e, depth, lo, hi)
+                for sub, s, e in self.children(chain[-1], start, end)
+                if e >= lo and s <= hi
+            ]
+        return data
+
+    def periods(self, depth: int = 2, start: datetime = None, end: datetime = None) -> list:
+        """Serialized periods down to depth levels, limited to those
+        overlapping the [start, end] window when given."""
+        lo = self.offset(start) if start else float("-inf")
+        hi = self.offset(end) if end else float("inf")
+        return [
+            self._expand(0, [ruler], self.bounds[k], self.bounds[k + 1], depth, lo, hi)
+            for k, ruler in enumerate(self.rulers)
+            if self.bounds[k + 1] >= lo and self.bounds[k] <= hi
+        ]
+
+
+def calculate_dasha(moon_sidereal_longitude: float, birth_date: datetime, depth: int = 2,
+                    start: datetime = None, end: datetime = None, now: datetime = None) -> dict:
+    depth = max(1, min(depth, len(LEVELS)))
+    timeline = DashaTimeline(moon_sidereal_longitude, birth_date)
+    return {
+        "starting_ruler": timeline.starting_ruler,
+        "balance_at_birth": round(timeline.fraction_remaining, 4),
+        "current_period": timeline.current_period(now, max(depth, 2)),
+        "mahadashas": timeline.periods(depth, start, end),
+    }
+
+
+_YEARS = np.array([DASHA_YEARS[r] for r in DASHA_ORDER], dtype=np.float64)
+# _MD_DAYS[s, k]: length of the k-th mahadasha for a timeline starting at ruler s.
+_MD_DAYS = np.array([[_YEARS[(s + k) % 9] * DAYS_PER_YEAR for k in range(27)] for s in range(9)])
+# _AD_ENDS[r, j]: end of the j-th antardasha of ruler r as a fraction of the mahadasha.
+_AD_ENDS = np.array([np.cumsum([_YEARS[(r + j) % 9] for j in range(9)]) / TOTAL_CYCLE for r in range(9)])
+
+
+def current_periods(moon_sidereal_longitudes, birth_dates, at: datetime = None) -> dict:
+    """Current mahadasha/antardasha for many births at once.
+
+    Vectorized equivalent of DashaTimeline(...).current_period(at) over
+    parallel sequences of moon longitudes and naive birth datetimes. Returns
+    columns of equal length; births outside their 100-year timeline get None.
+    """
+    moon = np.asarray(moon_sidereal_longitudes, dtype=np.float64)
+    births = np.array(birth_dates, dtype="datetime64[us]")
+    at = np.datetime64(at or datetime.now(), "us")
+    elapsed = (at - births) / np.timedelta64(1, "D")
+
+    nak_span = 360 / 27
+    start = (moon // nak_span).astype(np.int64) % 27 % 9
+    fraction = 1 - (moon % nak_span) / nak_span
+
+    lengths = _MD_DAYS[start]
+    lengths[:, 0] *= fraction
+    ends = np.cumsum(lengths, axis=1)
+    overshoot = np.floor(ends) > MAX_SPAN_DAYS
+    n_md = np.where(overshoot.any(axis=1), overshoot.argmax(axis=1) + 1, 27)
+
+    rows = np.arange(len(moon))
+    k = (ends <= elapsed[:, None]).sum(axis=1)
+    valid = (elapsed >= 0) & (k < n_md)
+    k = np.minimum(k, 26)
+    md_end = ends[rows, k]
+    md_start = np.where(k > 0, ends[rows, k - 1], 0.0)
+    md_ruler = (start + k) % 9
+
+    ad_ends = md_start[:, None] + (md_end - md_start)[:, None] * _AD_ENDS[md_ruler]
+    j = np.minimum((ad_ends <= elapsed[:, None]).sum(axis=1), 8)
+    ad_ruler = (md_ruler + j) % 9
+    ad_end = ad_ends[rows, j]
+
+    def dates(offsets):
+        return np.datetime_as_string(births + (offsets * 86400e6).astype("timedelta64[us]"), unit="D")
+
+    names = np.array(DASHA_ORDER, dtype=object)
     return {
-        "starting_ruler": starting_ruler,
-        "balance_at_birth": round(fraction_remaining, 4),
-        "current_period": {
-            "mahadasha": current_md,
-            "antardasha": current_ad,
-            "label": f"{current_md} Mahadasha / {current_ad} Antardasha",
-        },
-        "mahadashas": mahadashas,
+        "mahadasha": np.where(valid, names[md_ruler], None).tolist(),
+        "antardasha": np.where(valid, names[ad_ruler], None).tolist(),
+        "mahadasha_end": np.where(valid, dates(md_end), None).tolist(),
+        "next_change": np.where(valid, dates(ad_end), None).tolist(),
     }
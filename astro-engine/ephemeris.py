@@ -0,0 +1,156 @@
+"""
+Swiss Ephemeris access layer.
+
+pyswisseph is a thin wrapper over a C library with global state: the
+ephemeris path, the sidereal mode and the library's own position caches.
+Current builds keep that state per thread (a new thread starts from the
+library defaults, not from what the main thread set), older or differently
+built ones per process. This module owns all of it and is correct either
+way: every stateful call (positions, houses, ayanamsa) goes through here
+under one lock, each thread is initialised on its first call, and the
+sidereal mode is set inside the same critical section that reads the
+ayanamsa, so threads computing charts with different ayanamsas never see
+each other's mode. Sidereal longitudes are always tropical minus the
+ayanamsa; house systems and the node type are plain call arguments.
+
+Per-request choices travel as an Options tuple (hashable, picklable, part
+of the chart cache key) built by options(), which raises ValueError for an
+unknown name. The defaults - Lahiri, Placidus, mean node - are what every
+chart used before options existed.
+"""
+
+import os
+import threading
+from typing import NamedTuple
+
+import swisseph as swe
+
+EPHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ephe')
+
+AYANAMSAS = {
+    "lahiri": swe.SIDM_LAHIRI,
+    "raman": swe.SIDM_RAMAN,
+    "kp": swe.SIDM_KRISHNAMURTI,
+    "fagan_bradley": swe.SIDM_FAGAN_BRADLEY,
+    "yukteshwar": swe.SIDM_YUKTESHWAR,
+}
+
+HOUSE_SYSTEMS = {
+    "placidus": b'P',
+    "koch": b'K',
+    "porphyry": b'O',
+    "regiomontanus": b'R',
+    "campanus": b'C',
+    "equal": b'E',
+    "whole_sign": b'W',
+}
+
+NODES = {"mean": swe.MEAN_NODE, "true": swe.TRUE_NODE}
+
+FLAGS = swe.FLG_SPEED | swe.FLG_SWIEPH
+
+
+class Options(NamedTuple):
+    ayanamsa: str = "lahiri"
+    house_system: str = "placidus"
+    node: str = "mean"
+
+
+DEFAULT_OPTIONS = Options()
+
+_lock = threading.RLock()
+_local = threading.local()
+
+
+def _choice(table, kind, value, default):
+    if value is None:
+        return default
+    value = value.strip().lower()
+    if value not in table:
+        raise ValueError(f"Unknown {kind} '{value}'; expected one of {', '.join(table)}")
+    return value
+
+
+def options(ayanamsa=None, house_system=None, node=None) -> Options:
+    """Validated Options; None keeps the default for that field."""
+    return Options(
+        _choice(AYANAMSAS, "ayanamsa", ayanamsa, DEFAULT_OPTIONS.ayanamsa),
+        _choice(HOUSE_SYSTEMS, "house system", house_system, DEFAULT_OPTIONS.house_system),
+        _choice(NODES, "node", node, DEFAULT_OPTIONS.node),
+    )
+
+
+def init():
+    """Set up the calling thread: the ephe/ data files when they are
+    installed (Moshier otherwise) and the default sidereal mode. Called
+    from the executor's worker initializer; the other functions call it on
+    a thread's first use."""
+    with _lock:
+        if os.path.exists(EPHE_PATH):
+            swe.set_ephe_path(EPHE_PATH)
+        swe.set_sid_mode(AYANAMSAS[DEFAULT_OPTIONS.ayanamsa])
+        _local.ready = True
+
+
+def _ready():
+    if not getattr(_local, "ready", False):
+        init()
+
+
+def ayanamsa(jd, name=DEFAULT_OPTIONS.ayanamsa):
+    # Setting the mode costs far less than the read itself, so it is set
+    # every time rather than tracked.
+    mode = AYANAMSAS[name]
+    with _lock:
+        _ready()
+        swe.set_sid_mode(mode)
+        return swe.get_ayanamsa_ut(jd)
+
+
+def calc(jd, pid, flags=FLAGS):
+    """Swiss Ephemeris position tuple (lon, lat, dist, lon speed, ...)."""
+    with _lock:
+        _ready()
+        return swe.calc_ut(jd, pid, flags)[0]
+
+
+def positions(jd, pids, flags=FLAGS):
+    """calc() for several bodies at one instant under a single lock hold."""
+    with _lock:
+        _ready()
+        return [swe.calc_ut(jd, pid, flags)[0] for pid in pids]
+
+
+def houses(jd, lat, lon, system=DEFAULT_OPTIONS.house_system):
+    """(cusps, ascmc) for a HOUSE_SYSTEMS name."""
+    with _lock:
+        _ready()
+        return swe.houses(jd, lat, lon, HOUSE_SYSTEMS[system])
+
+
+def houses_armc(armcs, lat, obliquities, system=DEFAULT_OPTIONS.house_system):
+    """houses() for many instants at one latitude, given each instant's
+    ARMC (local sidereal time in degrees) and obliquity, under a single
+    lock hold."""
+    hsys = HOUSE_SYSTEMS[system]
+    with _lock:
+        _ready()
+        return [swe.houses_armc(armc, lat, eps, hsys) for armc, eps in zip(armcs, obliquities)]
+
+
+def sidereal_time(jd):
+    """Greenwich apparent sidereal time in degrees."""
+    with _lock:
+        _ready()
+        return swe.sidtime(jd) * 15
+
+
+def obliquity(jd):
+    """True obliquity of the ecliptic in degrees."""
+    return calc(jd, swe.ECL_NUT)[0]
+
+
+def planet_ids(pids, opts=DEFAULT_OPTIONS):
+    """pids with the mean node swapped for the node type opts asks for."""
+    node = NODES[opts.node]
+    return [node if pid == swe.MEAN_NODE else pid for pid in pids]
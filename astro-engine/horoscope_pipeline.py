@@ -0,0 +1,291 @@
+"""
+Daily horoscope insight seeds for many stored charts in one pass.
+
+    python horoscope_pipeline.py --date 2026-10-17 -i charts.ndjson -o seeds.ndjson
+
+Input is NDJSON, one record per user: {"id": ..., "chart_id": <a chart
+stored with POST /charts>}, {"id": ..., "chart": <the "chart" object of a
+full /calculate response>} or {"id": ..., "birth": <a /calculate payload>}. Output is NDJSON: a first line {"date", "sky"} with
+the day's shared sky, then one compact seed per record (in completion
+order, tagged with the record's input index):
+
+    {"index", "id", "success", "moon": {"sign", "house", "from_natal_moon"},
+     "transit_houses", "transits", "tone", "dasha"}
+
+The sky (positions at 12:00 UTC plus the day's Moon ingresses) is computed
+once and shared by every chunk. Raw input lines are parsed on the workers,
+and each chunk is scored with NumPy: one find_aspects call for all transit
+hits, vectorized house placement, and current_periods for the dasha
+context.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from datetime import date, datetime, time, timezone
+
+import numpy as np
+
+from aspect_engine import find_aspects
+from dasha import current_periods
+import chart_model
+import ephemeris
+from chart_store import chart_store, check_chart_id
+from natal_chart import SIGNS, get_nakshatra
+from transits import TRANSIT_ASPECTS, get_current_planetary_positions
+from transit_events import SkyTrack, datetime_to_jd, jd_to_datetime
+
+CHUNK_SIZE = 200
+SEED_TRANSIT_LIMIT = 5
+SEED_HOUSE_PLANETS = ["Sun", "Moon", "Mercury", "Venus", "Mars"]
+
+TRANSIT_PRIORITY = {"Pluto": 10, "Neptune": 9, "Uranus": 8, "Saturn": 7,
+                    "Jupiter": 6, "Mars": 5, "Venus": 4, "Mercury": 3, "Sun": 2, "Moon": 1}
+OUTER = {"Pluto", "Neptune", "Uranus", "Saturn", "Jupiter"}
+PERSONAL = {"Sun", "Moon", "Mercury", "Venus", "Mars"}
+HARD = {"opposition", "square"}
+SOFT = {"trine", "sextile"}
+NATAL_PLANETS = chart_model.PLANET_NAMES
+
+
+def day_sky(day: date) -> dict:
+    """Positions at noon UTC of day, the Moon's sidereal placement and any
+    Moon sign ingress during the UTC day."""
+    noon = datetime.combine(day, time(12), timezone.utc)
+    positions = get_current_planetary_positions(noon)
+    jd = datetime_to_jd(noon)
+    moon_lon = positions["planets"]["Moon"]["position"]["total_longitude"]
+    moon_sid = (moon_lon - ephemeris.ayanamsa(jd)) % 360
+
+    start = datetime_to_jd(datetime.combine(day, time(0), timezone.utc))
+    ingresses = []
+    for jd_ingress, t, direction in SkyTrack("Moon", start, start + 1, step=0.25).crossings(np.arange(12) * 30.0):
+        if jd_ingress < start + 1:
+            ingresses.append({"sign": SIGNS[t if direction > 0 else (t - 1) % 12],
+                              "time": jd_to_datetime(jd_ingress).isoformat(timespec="minutes")})
+    return {
+        **positions,
+        "moon": {"sign": SIGNS[int(moon_lon // 30) % 12], "sidereal_sign": SIGNS[int(moon_sid // 30) % 12],
+                 "sidereal_longitude": round(moon_sid, 4), "nakshatra": get_nakshatra(moon_sid)["name"],
+                 "ingresses": ingresses},
+        "retrograde": [p for p, d in positions["planets"].items() if d["retrograde"] and p != "Rahu"],
+    }
+
+
+def read_record(line):
+    """(id, ChartModel) for one input line: a stored chart_id, a chart, or
+    a birth that is calculated here."""
+    record = json.loads(line)
+    if not isinstance(record, dict):
+        raise ValueError("Each line must be a JSON object")
+    chart_id = record.get("chart_id")
+    if chart_id is not None:
+        chart = chart_store.get(check_chart_id(chart_id))
+        if chart is None:
+            raise ValueError(f"Unknown chart_id '{chart_id}'")
+        return record.get("id"), chart
+    chart = record.get("chart")
+    if chart is not None:
+        return record.get("id"), chart_model.from_dict(chart)
+    birth = record.get("birth")
+    if not birth:
+        raise ValueError("Record needs a chart or a birth")
+    return record.get("id"), chart_model.calculate_chart(birth["year"], birth["month"], birth["day"], birth["hour"],
+                                                         birth["minute"], birth.get("second", 0), birth["place"])
+
+
+def birth_datetime(chart):
+    """Naive local birth datetime from a chart's birth_data, as used by the
+    dasha calculations."""
+    year, month, dom = (int(x) for x in chart.birth_data["date"].split("-"))
+    hour, minute = (int(x) for x in chart.birth_data["time"].split(":")[:2])
+    return datetime(year, month, dom, hour, minute)
+
+
+def _parse(line):
+    record_id, chart = read_record(line)
+    return {
+        "id": record_id,
+        "lons": chart.lons(NATAL_PLANETS),
+        "moon_sid": chart.sid_lon("Moon"),
+        "birth": birth_datetime(chart),
+        "cusps": chart.cusp_longitudes(),
+    }
+
+
+def houses_of(lons, cusps):
+    """Placidus house (1-12) of each longitude in lons (..., k) for cusps
+    (n, 12): the cusp with the smallest forward distance to the point."""
+    lons = np.asarray(lons, dtype=np.float64)
+    cusps = np.asarray(cusps, dtype=np.float64)
+    return np.argmin((lons[..., None] - cusps[:, None, :]) % 360, axis=-1) + 1
+
+
+def seeds(lines, day: date, sky: dict) -> list:
+    """Seeds for [(index, raw line)] against the shared sky."""
+    out, rows = [], []
+    for index, line in lines:
+        try:
+            rows.append((index, _parse(line)))
+        except (ValueError, KeyError, TypeError) as e:
+            out.append({"index": index, "success": False, "error": f"Invalid record: {e}"})
+        except Exception as e:
+            out.append({"index": index, "success": False, "error": f"Calculation error: {str(e)}"})
+    if not rows:
+        return out
+
+    t_names = list(sky["planets"])
+    t_lons = np.array([sky["planets"][t]["position"]["total_longitude"] for t in t_names])
+    natal = np.array([r["lons"] for _, r in rows])
+    cusps = np.array([r["cusps"] for _, r in rows])
+
+    hits = find_aspects(t_lons, natal, TRANSIT_ASPECTS)
+    per_chart = [[] for _ in rows]
+    for c, i, j, k, orb in hits.tolist():
+        per_chart[c].append((t_names[i], NATAL_PLANETS[j], TRANSIT_ASPECTS.names[k], orb))
+
+    house_idx = [t_names.index(p) for p in SEED_HOUSE_PLANETS]
+    houses = houses_of(t_lons[house_idx], cusps)
+    moon_sign = int(sky["moon"]["sidereal_longitude"] // 30)
+    natal_moon_signs = (np.array([r["moon_sid"] for _, r in rows]) // 30).astype(int)
+
+    noon = datetime.combine(day, time(12))
+    dashas = current_periods([r["moon_sid"] for _, r in rows], [r["birth"] for _, r in rows], noon)
+
+    for n, (index, row) in enumerate(rows):
+        chart_hits = per_chart[n]
+        chart_hits.sort(key=lambda h: (-TRANSIT_PRIORITY.get(h[0], 0), h[3]))
+        out.append({
+            "index": index,
+            "id": row["id"],
+            "success": True,
+            "moon": {"sign": sky["moon"]["sign"], "house": int(houses[n, SEED_HOUSE_PLANETS.index("Moon")]),
+                     "from_natal_moon": int((moon_sign - natal_moon_signs[n]) % 12) + 1},
+            "transit_houses": {p: int(houses[n, k]) for k, p in enumerate(SEED_HOUSE_PLANETS)},
+            "transits": [
+                {"transit_planet": t, "natal_planet": p, "aspect": a, "orb": round(orb, 2),
+                 "major": t in OUTER and p in PERSONAL and a in ("conjunction", "opposition", "square")}
+                for t, p, a, orb in chart_hits[:SEED_TRANSIT_LIMIT]
+            ],
+            "tone": {"soft": sum(a in SOFT for _, _, a, _ in chart_hits),
+                     "hard": sum(a in HARD for _, _, a, _ in chart_hits)},
+            "dasha": {"mahadasha": dashas["mahadasha"][n], "antardasha": dashas["antardasha"][n],
+                      "next_change": dashas["next_change"][n]},
+        })
+    return out
+
+
+def sky_summary(sky: dict) -> dict:
+    return {"moon": sky["moon"], "retrograde": sky["retrograde"],
+            "signs": {p: d["position"]["sign"] for p, d in sky["planets"].items()}}
+
+
+async def stream_chunks(executor, lines, fn, args, dumps, chunk_size=CHUNK_SIZE):
+    """Encoded NDJSON results of fn(chunk, *args) on the executor for an
+    async iterable of raw input lines, where chunk is [(index, line)] and fn
+    returns one record per line. At most one chunk per worker is in flight,
+    so input is read only as fast as it is processed."""
+    slots = asyncio.Semaphore(executor.workers)
+    finished = asyncio.Queue()
+    running = set()
+
+    async def run_chunk(chunk):
+        try:
+            result = await executor.run_waiting(fn, chunk, *args)
+        except Exception as e:
+            result = [{"index": index, "success": False, "error": f"Calculation error: {str(e)}"}
+                      for index, _ in chunk]
+        finally:
+            slots.release()
+        finished.put_nowait(result)
+
+    async def submit(chunk):
+        await slots.acquire()
+        task = asyncio.ensure_future(run_chunk(chunk))
+        running.add(task)
+        task.add_done_callback(running.discard)
+
+    submitted = received = 0
+    chunk = []
+    async for line in lines:
+        if not line.strip():
+            continue
+        chunk.append((submitted * chunk_size + len(chunk), line))
+        if len(chunk) == chunk_size:
+            await submit(chunk)
+            submitted += 1
+            chunk = []
+            while not finished.empty():
+                received += 1
+                for record in finished.get_nowait():
+                    yield dumps(record) + b"\n"
+    if chunk:
+        await submit(chunk)
+        submitted += 1
+    while received < submitted:
+        received += 1
+        for record in await finished.get():
+            yield dumps(record) + b"\n"
+
+
+async def stream_seeds(executor, day: date, lines, dumps, chunk_size=CHUNK_SIZE):
+    """Encoded NDJSON lines for an async iterable of raw input lines: the
+    sky header first, then seeds as chunks finish on the executor."""
+    import tasks
+
+    sky = await executor.run_waiting(tasks.horoscope_sky, day)
+    yield dumps({"date": day.isoformat(), "sky": sky_summary(sky)}) + b"\n"
+    async for out in stream_chunks(executor, lines, tasks.horoscope_seeds, (day, sky), dumps, chunk_size):
+        yield out
+
+
+async def file_lines(f):
+    for line in f:
+        yield line
+
+
+async def run_to_file(make_stream, infile, outfile):
+    """Write make_stream(executor, lines) to outfile using a private
+    executor; returns the number of lines written."""
+    from executor import CalculationExecutor
+
+    executor = CalculationExecutor()
+    executor.start()
+    count = 0
+    try:
+        async for out in make_stream(executor, file_lines(infile)):
+            outfile.write(out)
+            count += 1
+    finally:
+        executor.shutdown()
+    return count
+
+
+def main(argv=None):
+    from profiles import dumps
+
+    parser = argparse.ArgumentParser(description="Generate daily horoscope insight seeds.")
+    parser.add_argument("--date", type=date.fromisoformat, default=datetime.now(timezone.utc).date(),
+                        help="UTC day, YYYY-MM-DD (default: today)")
+    parser.add_argument("-i", "--input", help="NDJSON charts (default: stdin)")
+    parser.add_argument("-o", "--output", help="NDJSON seeds (default: stdout)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    infile = open(args.input, "rb") if args.input else sys.stdin.buffer
+    outfile = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        count = asyncio.run(run_to_file(
+            lambda executor, lines: stream_seeds(executor, args.date, lines, dumps, args.chunk_size),
+            infile, outfile)) - 1
+    finally:
+        if args.input:
+            infile.close()
+        if args.output:
+            outfile.close()
+    print(f"Wrote {count} seeds for {args.date}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Per-stage timing and counters, exposed in Prometheus text format.
+
+Calculation code marks its stages with `with metrics.stage("houses"):` and
+its cache outcomes with metrics.count("chart_cache_hit"). Both are no-ops
+unless a recorder is active on the current thread: CalculationExecutor
+runs each call through timed_call(), which activates one in the worker and
+ships the recorded stages and counts back with the result. The server
+merges them into the process-wide registry (served on /metrics) and, with
+SERVER_TIMING=1, into a Server-Timing header for the current request.
+
+Configuration (environment):
+    METRICS_ENABLED   "1" (default) or "0" to skip recording entirely
+    SERVER_TIMING     "1" to add Server-Timing headers, default "0"
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") != "0"
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") != "0"
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# counter name -> (cache, outcome) for the cache hit ratio gauges
+CACHE_EVENTS = {
+    "geocode_hit": ("geocode", "hit"),
+    "geocode_gazetteer": ("geocode", "miss"),
+    "geocode_nominatim": ("geocode", "miss"),
+    "geocode_shared": ("geocode", "hit"),
+    "chart_cache_hit": ("chart", "hit"),
+    "chart_cache_store_hit": ("chart", "hit"),
+    "chart_cache_miss": ("chart", "miss"),
+}
+
+_local = threading.local()
+_request_stages = ContextVar("request_stages", default=None)
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("stages", "name", "start")
+
+    def __init__(self, stages, name):
+        self.stages = stages
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.stages[self.name] = self.stages.get(self.name, 0.0) + time.perf_counter() - self.start
+        return False
+
+
+def stage(name):
+    stages = getattr(_local, "stages", None)
+    return _NULL_STAGE if stages is None else _Stage(stages, name)
+
+
+def count(name, n=1):
+    counters = getattr(_local, "counters", None)
+    if counters is not None:
+        counters[name] = counters.get(name, 0) + n
+
+
+@contextmanager
+def recording():
+    """Activate a recorder on this thread for the block; yields its
+    (stages, counters) dicts."""
+    outer = getattr(_local, "stages", None), getattr(_local, "counters", None)
+    stages, counters = _local.stages, _local.counters = {}, {}
+    try:
+        yield stages, counters
+    finally:
+        _local.stages, _local.counters = outer
+
+
+def timed_call(fn, *args, **kwargs):
+    """Run fn with a recorder active; returns (result, error, stages,
+    counters) so failed calls are recorded too. Executed on the worker, so it
+    must stay importable by reference."""
+    result = error = None
+    with recording() as (stages, counters):
+        start = time.perf_counter()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            error = e
+            counters["calculation_error"] = counters.get("calculation_error", 0) + 1
+        finally:
+            stages["worker"] = time.perf_counter() - start
+    return result, error, stages, counters
+
+
+class _Histogram:
+    __slots__ = ("buckets", "sum", "count")
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[i] += 1
+                break
+
+    def render(self, name, labels):
+        lines, cumulative = [], 0
+        for bound, n in zip(BUCKETS, self.buckets):
+            cumulative += n
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {self.count}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum:.6f}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+        return lines
+
+
+class Registry:
+    """Process-wide metrics of the API process. Only touched from the event
+    loop, so it needs no locking."""
+
+    def __init__(self):
+        self.stages = {}
+        self.events = {}
+        self.requests = {}
+        self.latency = {}
+        self.in_flight = 0
+
+    def record_call(self, stages, counters, wall):
+        self.record(dict(stages, executor_overhead=max(0.0, wall - stages.get("worker", wall))), counters)
+
+    def record(self, stages, counters):
+        """Merge stages and counters recorded in this process, e.g. by the
+        async geocoder, as well as those shipped back from workers."""
+        for name, seconds in stages.items():
+            self.stages.setdefault(name, _Histogram()).observe(seconds)
+        for name, n in counters.items():
+            self.events[name] = self.events.get(name, 0) + n
+        current = _request_stages.get()
+        if current is not None:
+            for name, seconds in stages.items():
+                current[name] = current.get(name, 0.0) + seconds
+
+    def record_request(self, path, status, seconds):
+        key = (path, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+        self.latency.setdefault(path, _Histogram()).observe(seconds)
+
+    def cache_ratios(self):
+        totals = {}
+        for name, n in self.events.items():
+            if name in CACHE_EVENTS:
+                cache, outcome = CACHE_EVENTS[name]
+                hits, total = totals.get(cache, (0, 0))
+                totals[cache] = (hits + (n if outcome == "hit" else 0), total + n)
+        return {cache: hits / total for cache, (hits, total) in totals.items() if total}
+
+    def render(self, gauges=None):
+        out = ["# HELP astro_stage_seconds Time spent per calculation stage.",
+               "# TYPE astro_stage_seconds histogram"]
+        for name, hist in sorted(self.stages.items()):
+            out += hist.render("astro_stage_seconds", f'stage="{name}"')
+        out += ["# HELP astro_events_total Calculation events such as cache hits and misses.",
+                "# TYPE astro_events_total counter"]
+        out += [f'astro_events_total{{event="{name}"}} {n}' for name, n in sorted(self.events.items())]
+        out += ["# HELP astro_cache_hit_ratio Hits over lookups since start.",
+                "# TYPE astro_cache_hit_ratio gauge"]
+        out += [f'astro_cache_hit_ratio{{cache="{cache}"}} {ratio:.4f}' for cache, ratio in sorted(self.cache_ratios().items())]
+        out += ["# HELP astro_requests_total HTTP requests by path and status.",
+                "# TYPE astro_requests_total counter"]
+        out += [f'astro_requests_total{{path="{path}",status="{status}"}} {n}'
+                for (path, status), n in sorted(self.requests.items())]
+        out += ["# HELP astro_request_seconds HTTP request latency by path.",
+                "# TYPE astro_request_seconds histogram"]
+        for path, hist in sorted(self.latency.items()):
+            out += hist.render("astro_request_seconds", f'path="{path}"')
+        out += ["# HELP astro_requests_in_flight HTTP requests currently being served.",
+                "# TYPE astro_requests_in_flight gauge",
+                f"astro_requests_in_flight {self.in_flight}"]
+        for name, (help_text, value) in (gauges or {}).items():
+            out += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(out) + "\n"
+
+
+registry = Registry()
+
+
+def server_timing(stages, total):
+    parts = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in stages.items()]
+    parts.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests, their latency and the in-flight
+    gauge, and adding Server-Timing when enabled. Requests are labelled with
+    the template of the route that handled them ("/charts/{chart_id}"), which
+    FastAPI's router leaves in scope["route"]; plain routes in routes (the
+    app's route list, read on first request) are labelled by their path, and
+    anything else is folded into "other" to keep label cardinality bounded."""
+
+    def __init__(self, app, routes=()):
+        self.app = app
+        self.routes = routes
+        self.paths = None
+
+    def label(self, scope):
+        # The router updates the request scope in place once it has matched.
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        return scope["path"] if scope["path"] in self.paths else "other"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+        if self.paths is None:
+            self.paths = {route.path for route in self.routes if not route.param_convertors}
+        stages = {} if SERVER_TIMING else None
+        token = _request_stages.set(stages)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if stages is not None:
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", server_timing(stages, time.perf_counter() - start).encode()))
+                    message = {**message, "headers": headers}
+            await send(message)
+
+        registry.in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            registry.in_flight -= 1
+            registry.record_request(self.label(scope), status, time.perf_counter() - start)
+            _request_stages.reset(token)
@@ -0,0 +1,134 @@
+"""
+Response profiles and field selection for /calculate.
+
+A profile names the top-level sections of the response and how verbose
+they are; fields= replaces the profile's section list with an explicit one
+while keeping its verbosity. Sections that are not selected are never
+computed (dasha, active transits) or never built from the ChartModel, and
+the result is encoded once with dumps() in the worker rather than going
+through FastAPI's jsonable_encoder on the event loop.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+SECTIONS = ["birth_data", "big_three", "planets", "houses", "ascendant", "midheaven",
+            "aspects", "stelliums", "elements", "modalities", "dasha", "active_transits"]
+
+PROFILES = {
+    "full": SECTIONS,
+    "summary": ["birth_data", "big_three", "planets", "ascendant", "midheaven",
+                "aspects", "elements", "modalities", "dasha"],
+    "big_three": ["big_three"],
+    "numeric": ["birth_data", "planets", "houses", "ascendant", "midheaven", "aspects", "dasha"],
+}
+
+CHART_SECTIONS = set(SECTIONS) - {"dasha", "active_transits"}
+
+SUMMARY_ASPECT_LIMIT = 10
+
+# Plus the ayanamsa_<name> value of the chart's ayanamsa.
+NUMERIC_BIRTH_KEYS = {"latitude", "longitude", "julian_day", "options"}
+
+
+def resolve(profile="full", fields=None):
+    """Sections to return, in SECTIONS order. Raises ValueError for an
+    unknown profile or field."""
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile '{profile}'; expected one of {', '.join(PROFILES)}")
+    if not fields:
+        return PROFILES[profile]
+    unknown = [f for f in fields if f not in SECTIONS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return [s for s in SECTIONS if s in fields]
+
+
+def parse_fields(value):
+    return [f.strip() for f in value.split(",") if f.strip()] if value else None
+
+
+def _summary_position(p, house):
+    return {"sign": p["sign"], "degree": p["formatted"], "house": house}
+
+
+def _summary_planet(data):
+    return {
+        **_summary_position(data["tropical"], data["house_western"]),
+        "sidereal_sign": data["sidereal"]["sign"],
+        "nakshatra": data["nakshatra"]["name"],
+        "retrograde": data["retrograde"],
+    }
+
+
+def _numeric_planet(data):
+    return {
+        "longitude": data["tropical"]["total_longitude"],
+        "sidereal_longitude": data["sidereal"]["total_longitude"],
+        "speed": data["speed_deg_per_day"],
+        "latitude": data["latitude"],
+        "house_western": data["house_western"],
+        "house_vedic": data["house_vedic"],
+        "retrograde": data["retrograde"],
+    }
+
+
+def _numeric_aspect(a):
+    return {"planet1": a["planet1"], "planet2": a["planet2"], "aspect": a["aspect"], "orb": a["orb"]}
+
+
+def shape_chart(chart, sections, profile="full"):
+    """The selected sections of a ChartModel, condensed for the summary and
+    numeric profiles. Sections that are not selected are never built."""
+    out = {}
+    for section in sections:
+        if section not in CHART_SECTIONS:
+            continue
+        value = chart.section(section)
+        if profile == "summary":
+            if section == "planets":
+                value = {name: _summary_planet(p) for name, p in value.items()}
+            elif section in ("ascendant", "midheaven"):
+                value = {"sign": value["sign"], "degree": value["formatted"]}
+            elif section == "aspects":
+                value = value[:SUMMARY_ASPECT_LIMIT]
+        elif profile == "numeric":
+            if section == "planets":
+                value = {name: _numeric_planet(p) for name, p in value.items()}
+            elif section == "houses":
+                value = [h["cusp_longitude"] for h in value.values()]
+            elif section in ("ascendant", "midheaven"):
+                value = value["total_longitude"]
+            elif section == "aspects":
+                value = [_numeric_aspect(a) for a in value]
+            elif section == "birth_data":
+                value = {k: v for k, v in value.items()
+                         if k in NUMERIC_BIRTH_KEYS or k.startswith("ayanamsa_")}
+        out[section] = value
+    return out
+
+
+def dasha_depth(profile="full"):
+    """Levels of mahadashas to expand; the condensed profiles skip the
+    antardasha sub-periods entirely."""
+    return 2 if profile == "full" else 1
+
+
+def shape_dasha(dasha, profile="full"):
+    if profile != "numeric":
+        return dasha
+    current = dasha["current_period"]
+    return {"mahadasha": current["mahadasha"], "antardasha": current["antardasha"],
+            "next_change": current.get("next_change")}
+
+
+def dumps(obj) -> bytes:
+    """Compact UTF-8 JSON through orjson (in requirements.txt); stdlib json
+    only keeps environments without it working."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
@@ -1,20 +1,60 @@
 import os
-from fastapi import FastAPI, HTTPException
+import asyncio
+import tempfile
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import Optional
-from natal_chart import calculate_natal_chart
-from dasha import calculate_dasha
-from transits import get_current_planetary_positions, find_active_transits
-from datetime import datetime
-import swisseph as swe
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, conint
+from typing import Dict, List, Optional
+from datetime import date, datetime, time, timezone
+from birth_time_sweep import check_range
+from chart_store import check_chart_id, check_persistent
+from executor import CalculationExecutor, ExecutorSaturated
+from geocoding import Geocoder
+import ephemeris
+from natal_chart import to_julian_day
+from transit_snapshot import TransitSnapshots
+import horoscope_pipeline
+import metrics
+import profiles
+import tasks
+import year_scan
+from warmup import Readiness
 
-# Ensure ephemeris path is set correctly for any environment
-EPHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ephe')
-if os.path.exists(EPHE_PATH):
-    swe.set_ephe_path(EPHE_PATH)
+executor = CalculationExecutor()
+geocoder = Geocoder()
+readiness = Readiness()
+snapshots = TransitSnapshots(lambda when: executor.run_waiting(tasks.current_transits, when))
 
-app = FastAPI(title="PalmCosmic Astro Engine", version="2.0")
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", 5000))
+BATCH_CHUNK_SIZE = int(os.environ.get("BATCH_CHUNK_SIZE", 25))
+EVENTS_MAX_CHARTS = int(os.environ.get("EVENTS_MAX_CHARTS", 50))
+DASHA_BATCH_MAX_ITEMS = int(os.environ.get("DASHA_BATCH_MAX_ITEMS", 200000))
+NDJSON_SPOOL_BYTES = int(os.environ.get("NDJSON_SPOOL_BYTES", 32 * 2**20))
+COMPATIBILITY_MAX_CANDIDATES = int(os.environ.get("COMPATIBILITY_MAX_CANDIDATES", 100000))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    check_persistent()
+    executor.start()
+    warming = None
+    if readiness.mode == "blocking":
+        await readiness.warm(executor)
+        readiness.started()
+    elif readiness.mode == "background":
+        warming = asyncio.create_task(readiness.warm(executor))
+        warming.add_done_callback(readiness.started)
+    else:
+        readiness.started()
+    yield
+    if warming is not None:
+        warming.cancel()
+    executor.shutdown()
+
+
+app = FastAPI(title="PalmCosmic Astro Engine", version="2.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -28,7 +68,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
+app.add_middleware(metrics.MetricsMiddleware, routes=app.routes)
 
 class BirthData(BaseModel):
     year: int
@@ -39,37 +81,451 @@ class BirthData(BaseModel):
     second: Optional[int] = 0
     place: str
 
+class BatchRequest(BaseModel):
+    items: List[BirthData]
+
+class DashaItem(BaseModel):
+    id: Optional[str] = None
+    chart_id: Optional[str] = None
+    moon_sidereal_longitude: Optional[float] = None
+    birth_datetime: Optional[datetime] = None
+
+class DashaBatchRequest(BaseModel):
+    items: List[DashaItem]
+    at: Optional[datetime] = None
+
+class EventSearchRequest(BaseModel):
+    start: date
+    end: date
+    births: List[BirthData] = []
+    planets: Optional[List[str]] = None
+    types: List[str] = ["aspect", "ingress", "station"]
+
+class CompatibilityRequest(BaseModel):
+    person1: BirthData
+    person2: BirthData
+
+class StoreChartRequest(BaseModel):
+    birth: BirthData
+    # Ids are issued by the store; kept only to reject clients that send one.
+    chart_id: Optional[str] = None
+
+class ChartIdsRequest(BaseModel):
+    ids: List[str]
+
+class YearScanRequest(BaseModel):
+    birth: BirthData
+    year: int
+
+class BirthTimeSweepRequest(BaseModel):
+    year: int
+    month: int
+    day: int
+    place: str
+    start: time = time(0, 0)
+    end: time = time(23, 59)
+    step_minutes: int = 1
+
+class ChartFeatures(BaseModel):
+    moon_sidereal_longitude: float
+    longitudes: Dict[str, float] = {}
+
+class CompatibilityBatchRequest(BaseModel):
+    person: Optional[BirthData] = None
+    person_features: Optional[ChartFeatures] = None
+    candidates: List[ChartFeatures]
+    top: Optional[conint(ge=1)] = None
+
+def _busy(e: ExecutorSaturated):
+    return HTTPException(status_code=503, detail=f"Engine busy: {e}", headers={"Retry-After": "1"})
+
+
+def _sections(profile: str, fields: Optional[str]):
+    try:
+        return profiles.resolve(profile, profiles.parse_fields(fields))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _check_chart_id(chart_id: str):
+    try:
+        check_chart_id(chart_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _options(ayanamsa: Optional[str], house_system: Optional[str], node: Optional[str]):
+    try:
+        return ephemeris.options(ayanamsa, house_system, node)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @app.post("/calculate")
-async def full_calculation(data: BirthData):
+async def full_calculation(data: BirthData, profile: str = "full", fields: Optional[str] = None,
+                           ayanamsa: Optional[str] = None, house_system: Optional[str] = None,
+                           node: Optional[str] = None):
+    """Chart, dasha and transits. profile (full, summary, big_three,
+    numeric) and fields=a,b,... limit what is computed and returned;
+    ayanamsa, house_system and node override the Lahiri / Placidus / mean
+    node defaults. The body is encoded in the worker and sent as-is."""
+    sections = _sections(profile, fields)
+    opts = _options(ayanamsa, house_system, node)
     try:
-        chart = calculate_natal_chart(
+        loc = await geocoder.resolve(data.place)
+        current = (await snapshots.get()).data if "active_transits" in sections else None
+        body = await executor.run(
+            tasks.calculate_json,
             data.year, data.month, data.day,
             data.hour, data.minute, data.second,
-            data.place
+            data.place, loc=loc, current=current, profile=profile, sections=sections, opts=opts
         )
-        moon_sid = chart["planets"]["Moon"]["sidereal"]["total_longitude"]
-        birth_dt = datetime(data.year, data.month, data.day, data.hour, data.minute)
-        dasha = calculate_dasha(moon_sid, birth_dt)
-        active_transits = find_active_transits(chart)
-        
-        return {
-            "success": True,
-            "chart": chart,
-            "dasha": dasha,
-            "active_transits": active_transits,
-        }
+        return Response(content=body, media_type="application/json")
+    except ExecutorSaturated as e:
+        raise _busy(e)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
 
+def _chunks(seq, size):
+    return [seq[i:i + size] for i in range(0, len(seq), size)]
+
+
+async def _stream_batch(items: List[BirthData], profile: str = "full", sections=profiles.SECTIONS,
+                        opts=ephemeris.DEFAULT_OPTIONS):
+    geocoded = await geocoder.resolve_many(item.place for item in items)
+    current = (await snapshots.get()).data if "active_transits" in sections else None
+
+    julian_days = {}
+    work = []
+    for index, item in enumerate(items):
+        loc = geocoded[item.place]
+        if isinstance(loc, str):
+            yield profiles.dumps({"index": index, "success": False, "status": 400, "error": loc}) + b"\n"
+            continue
+        birth = (item.year, item.month, item.day, item.hour, item.minute, item.second, item.place)
+        jd_key = (*birth[:6], loc["timezone"])
+        if jd_key not in julian_days:
+            julian_days[jd_key] = to_julian_day(*jd_key)
+        work.append((index, birth, loc, julian_days[jd_key]))
+
+    async for line in _run_chunks(tasks.calculate_batch, _chunks(work, BATCH_CHUNK_SIZE),
+                                  current, profile, sections, opts):
+        yield line
+
+
+async def _run_chunks(fn, chunks, *args):
+    """NDJSON lines of fn(chunk, *args) for chunks of (index, ...) items, in
+    completion order with at most one chunk per worker in flight."""
+    slots = asyncio.Semaphore(executor.workers)
+
+    async def run_chunk(chunk):
+        async with slots:
+            try:
+                return await executor.run_waiting(fn, chunk, *args)
+            except Exception as e:
+                return [{"index": index, "success": False, "status": 500,
+                         "error": f"Calculation error: {str(e)}"} for index, *_ in chunk]
+
+    for finished in asyncio.as_completed([run_chunk(c) for c in chunks]):
+        for result in await finished:
+            yield profiles.dumps(result) + b"\n"
+
+
+@app.post("/calculate/batch")
+async def batch_calculation(batch: BatchRequest, profile: str = "full", fields: Optional[str] = None,
+                            ayanamsa: Optional[str] = None, house_system: Optional[str] = None,
+                            node: Optional[str] = None):
+    """Stream one NDJSON line per item as chunks finish; lines carry the
+    item's index because completion order differs from request order."""
+    sections = _sections(profile, fields)
+    opts = _options(ayanamsa, house_system, node)
+    if len(batch.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch limited to {BATCH_MAX_ITEMS} items")
+    if executor.saturated:
+        raise _busy(ExecutorSaturated(f"{executor.pending} calculations already pending"))
+    return StreamingResponse(_stream_batch(batch.items, profile, sections, opts), media_type="application/x-ndjson")
+
 @app.get("/transits/now")
-async def current_transits():
-    return get_current_planetary_positions()
+async def current_transits(request: Request):
+    """Positions for the current snapshot bucket, revalidated by ETag."""
+    snapshot = await snapshots.get()
+    if request.headers.get("if-none-match") == snapshot.etag:
+        return Response(status_code=304, headers=snapshot.headers())
+    return JSONResponse(snapshot.data, headers=snapshot.headers())
+
+@app.post("/transits/events")
+async def transit_events(req: EventSearchRequest):
+    """Exact aspect, ingress and station times between start and end (UTC
+    midnights) for zero or more charts."""
+    if len(req.births) > EVENTS_MAX_CHARTS:
+        raise HTTPException(status_code=413, detail=f"Event search limited to {EVENTS_MAX_CHARTS} charts")
+    start = datetime.combine(req.start, time(0), timezone.utc)
+    end = datetime.combine(req.end, time(0), timezone.utc)
+    births = [(b.year, b.month, b.day, b.hour, b.minute, b.second, b.place) for b in req.births]
+    # Places that fail to resolve are reported per chart.
+    geocoded = await geocoder.resolve_many(b.place for b in req.births)
+    locs = [geocoded[b.place] for b in req.births]
+    try:
+        found = await executor.run(tasks.transit_events, start, end, births, req.planets, tuple(req.types), locs)
+    except ExecutorSaturated as e:
+        raise _busy(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "start": start.isoformat(), "end": end.isoformat(), **found}
+
+def _naive_utc(dt: datetime) -> datetime:
+    return dt.astimezone(timezone.utc).replace(tzinfo=None) if dt.tzinfo else dt
+
+
+@app.post("/dasha/current/batch")
+async def current_dasha_batch(req: DashaBatchRequest):
+    """Current mahadasha/antardasha and next change date for many births,
+    as parallel columns in request order."""
+    if len(req.items) > DASHA_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch limited to {DASHA_BATCH_MAX_ITEMS} items")
+    if any(item.chart_id is None and (item.moon_sidereal_longitude is None or item.birth_datetime is None)
+           for item in req.items):
+        raise HTTPException(status_code=400,
+                            detail="Each item needs a chart_id or moon_sidereal_longitude and birth_datetime")
+    at = _naive_utc(req.at or datetime.now(timezone.utc))
+    chart_ids = [item.chart_id for item in req.items if item.chart_id is not None]
+    for chart_id in chart_ids:
+        _check_chart_id(chart_id)
+    try:
+        stored = await executor.run(tasks.stored_dasha_inputs, chart_ids) if chart_ids else {}
+        missing = [chart_id for chart_id in chart_ids if chart_id not in stored]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"Unknown chart_id: {', '.join(missing[:10])}")
+        moons = [stored[item.chart_id][0] if item.chart_id is not None else item.moon_sidereal_longitude
+                 for item in req.items]
+        # Births are local wall-clock times, as stored charts and
+        # calculate_dasha take them; only the offset of an aware one is dropped.
+        births = [stored[item.chart_id][1] if item.chart_id is not None
+                  else item.birth_datetime.replace(tzinfo=None) for item in req.items]
+        columns = await executor.run(tasks.current_dashas, moons, births, at)
+    except ExecutorSaturated as e:
+        raise _busy(e)
+    return {"success": True, "at": at.isoformat(), "count": len(req.items),
+            "id": [item.id for item in req.items], **columns}
+
+def _birth_tuple(b: BirthData):
+    return (b.year, b.month, b.day, b.hour, b.minute, b.second, b.place)
+
+
+def _features(f: ChartFeatures):
+    return {"moon_sidereal_longitude": f.moon_sidereal_longitude, "longitudes": f.longitudes}
+
+
+@app.post("/compatibility")
+async def compatibility(req: CompatibilityRequest):
+    """Ashtakoot (person1 as groom side) and synastry for two births."""
+    try:
+        loc1 = await geocoder.resolve(req.person1.place)
+        loc2 = await geocoder.resolve(req.person2.place)
+        return {"success": True, **await executor.run(
+            tasks.compatibility_match, _birth_tuple(req.person1), _birth_tuple(req.person2), loc1, loc2)}
+    except ExecutorSaturated as e:
+        raise _busy(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
+
+@app.post("/compatibility/batch")
+async def compatibility_batch(req: CompatibilityBatchRequest):
+    """Rank precomputed candidate features against one person, best first."""
+    if len(req.candidates) > COMPATIBILITY_MAX_CANDIDATES:
+        raise HTTPException(status_code=413, detail=f"Batch limited to {COMPATIBILITY_MAX_CANDIDATES} candidates")
+    if (req.person is None) == (req.person_features is None):
+        raise HTTPException(status_code=400, detail="Provide exactly one of person or person_features")
+    person = _birth_tuple(req.person) if req.person else _features(req.person_features)
+    candidates = [_features(c) for c in req.candidates]
+    try:
+        loc = await geocoder.resolve(req.person.place) if req.person else None
+        ranked = await executor.run(tasks.compatibility_rank, person, candidates, req.top, loc)
+    except ExecutorSaturated as e:
+        raise _busy(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
+    return {"success": True, "count": len(req.candidates), **ranked}
+
+async def _spooled_lines(request: Request):
+    """Lines of the request body, spooled first (to disk past
+    NDJSON_SPOOL_BYTES): a StreamingResponse also listens on receive() for
+    disconnects, so it cannot read the request while streaming."""
+    spool = tempfile.SpooledTemporaryFile(max_size=NDJSON_SPOOL_BYTES)
+    async for chunk in request.stream():
+        spool.write(chunk)
+
+    async def lines():
+        try:
+            spool.seek(0)
+            for line in spool:
+                yield line
+        finally:
+            spool.close()
+
+    return lines()
+
+
+@app.post("/horoscopes/seeds")
+async def horoscope_seeds(request: Request, day: Optional[date] = Query(None, alias="date")):
+    """Daily insight seeds for an NDJSON stream of stored charts (see
+    horoscope_pipeline.py), streamed back as NDJSON."""
+    if executor.saturated:
+        raise _busy(ExecutorSaturated(f"{executor.pending} calculations already pending"))
+    day = day or datetime.now(timezone.utc).date()
+    lines = await _spooled_lines(request)
+    return StreamingResponse(horoscope_pipeline.stream_seeds(executor, day, lines, profiles.dumps),
+                             media_type="application/x-ndjson")
+
+@app.post("/year-scan")
+async def year_scan_chart(req: YearScanRequest):
+    """Monthly themes, exact hits, dasha changes and retrogrades of one
+    birth over a calendar year."""
+    try:
+        year_scan.check_year(req.year)
+        loc = await geocoder.resolve(req.birth.place)
+        result = await executor.run(tasks.year_scan_birth, _birth_tuple(req.birth), req.year, loc)
+    except ExecutorSaturated as e:
+        raise _busy(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
+    return {"success": True, **result}
+
+@app.post("/year-scan/batch")
+async def year_scan_batch(request: Request, year: int):
+    """Year scans for an NDJSON stream of stored charts (see year_scan.py),
+    streamed back as NDJSON and sharded across the workers."""
+    try:
+        year_scan.check_year(year)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if executor.saturated:
+        raise _busy(ExecutorSaturated(f"{executor.pending} calculations already pending"))
+    lines = await _spooled_lines(request)
+    return StreamingResponse(year_scan.stream_scans(executor, year, lines, profiles.dumps),
+                             media_type="application/x-ndjson")
+
+@app.post("/birth-time/sweep")
+async def sweep_birth_time(req: BirthTimeSweepRequest, ayanamsa: Optional[str] = None,
+                           house_system: Optional[str] = None, node: Optional[str] = None):
+    """Birth times from start to end every step_minutes, merged into the
+    intervals over which the rising sign, Moon nakshatra and house
+    placements stay the same. Takes the /calculate chart options."""
+    opts = _options(ayanamsa, house_system, node)
+    try:
+        check_range(req.start, req.end, req.step_minutes)
+        loc = await geocoder.resolve(req.place)
+        result = await executor.run(tasks.sweep_birth_time, (req.year, req.month, req.day), req.start, req.end,
+                                    req.step_minutes, req.place, loc, opts)
+    except ExecutorSaturated as e:
+        raise _busy(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
+    return {"success": True, **result}
+
+@app.post("/charts")
+async def store_chart(req: StoreChartRequest, profile: str = "full", fields: Optional[str] = None,
+                      ayanamsa: Optional[str] = None, house_system: Optional[str] = None,
+                      node: Optional[str] = None):
+    """Calculate and store a chart under a new, server-issued chart_id;
+    responds like /calculate, plus the chart_id."""
+    sections = _sections(profile, fields)
+    opts = _options(ayanamsa, house_system, node)
+    if req.chart_id is not None:
+        raise HTTPException(status_code=400, detail="chart_id is issued by the server and cannot be chosen")
+    try:
+        loc = await geocoder.resolve(req.birth.place)
+        current = (await snapshots.get()).data if "active_transits" in sections else None
+        body = await executor.run(tasks.store_chart, _birth_tuple(req.birth), opts,
+                                  current, profile, sections, loc)
+        return Response(content=body, media_type="application/json")
+    except ExecutorSaturated as e:
+        raise _busy(e)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
+
+@app.get("/charts/{chart_id}")
+async def stored_chart(chart_id: str, profile: str = "full", fields: Optional[str] = None):
+    """A stored chart in the /calculate shape. Only dasha and transits are
+    recomputed, so fields=dasha,active_transits refreshes just those."""
+    sections = _sections(profile, fields)
+    _check_chart_id(chart_id)
+    try:
+        current = (await snapshots.get()).data if "active_transits" in sections else None
+        body = await executor.run(tasks.stored_chart, chart_id, current, profile, sections)
+    except ExecutorSaturated as e:
+        raise _busy(e)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Calculation error: {str(e)}")
+    if body is None:
+        raise HTTPException(status_code=404, detail=f"Unknown chart_id '{chart_id}'")
+    return Response(content=body, media_type="application/json")
+
+async def _stream_stored(ids: List[str], profile: str, sections):
+    current = (await snapshots.get()).data if "active_transits" in sections else None
+    async for line in _run_chunks(tasks.stored_charts, _chunks(list(enumerate(ids)), BATCH_CHUNK_SIZE),
+                                  current, profile, sections):
+        yield line
+
+
+@app.post("/charts/batch")
+async def stored_charts_batch(req: ChartIdsRequest, profile: str = "full", fields: Optional[str] = None):
+    """Many stored charts by id, streamed back as NDJSON lines tagged with
+    index and chart_id; unknown ids get success false and status 404."""
+    sections = _sections(profile, fields)
+    if len(req.ids) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch limited to {BATCH_MAX_ITEMS} items")
+    if executor.saturated:
+        raise _busy(ExecutorSaturated(f"{executor.pending} calculations already pending"))
+    return StreamingResponse(_stream_stored(req.ids, profile, sections), media_type="application/x-ndjson")
+
+@app.delete("/charts/{chart_id}")
+async def delete_chart(chart_id: str):
+    _check_chart_id(chart_id)
+    try:
+        deleted = await executor.run(tasks.delete_chart, chart_id)
+    except ExecutorSaturated as e:
+        raise _busy(e)
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"Unknown chart_id '{chart_id}'")
+    return {"success": True, "chart_id": chart_id}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Stage timings, cache hit ratios and request counters in Prometheus
+    text format."""
+    gauges = {
+        "astro_executor_pending": ("Calculations queued or running.", executor.pending),
+        "astro_executor_max_pending": ("Pending calculations before 503s.", executor.max_pending),
+        "astro_transit_snapshot_computations": ("Transit snapshots computed since start.", snapshots.computations),
+    }
+    return Response(metrics.registry.render(gauges), media_type="text/plain; version=0.0.4")
 
 @app.get("/health")
 async def health_check():
-    return {"status": "running", "engine": "Swiss Ephemeris"}
+    """Liveness: the process is up and serving, warm or not."""
+    return {"status": "running", "engine": "Swiss Ephemeris", "ready": readiness.ready, "warm": readiness.warmed,
+            "executor": {"mode": executor.mode, "workers": executor.workers,
+                         "pending": executor.pending, "max_pending": executor.max_pending}}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: 503 until warmup has finished (at once with
+    STARTUP_WARMUP=off), then 200; reports the warmup's progress."""
+    status = {**readiness.status(), "workers": executor.workers}
+    return JSONResponse(status, status_code=200 if readiness.ready else 503)
 
 if __name__ == "__main__":
     import uvicorn
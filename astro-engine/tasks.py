@@ -0,0 +1,213 @@
+"""
+Top-level calculation entry points executed on CalculationExecutor workers.
+They must stay importable and picklable by reference.
+"""
+
+from datetime import datetime
+
+from chart_model import calculate_chart
+from chart_store import chart_store, check_chart_id, new_chart_id
+from ephemeris import DEFAULT_OPTIONS
+from geocoding import geocode_place
+from natal_chart import to_julian_day
+from dasha import calculate_dasha, current_periods
+from transits import get_current_planetary_positions, find_active_transits
+from transit_events import EVENT_TYPES, datetime_to_jd, find_events
+import birth_time_sweep
+import compatibility
+import horoscope_pipeline
+import metrics
+import profiles
+import year_scan
+
+
+def full_calculation(year, month, day, hour, minute, second, place, loc=None, jd=None, current=None,
+                     profile="full", sections=None, opts=DEFAULT_OPTIONS):
+    """Chart, dasha and active transits, limited to the profile's sections
+    (or an explicit sections list from profiles.resolve), for the
+    ephemeris.Options opts."""
+    chart = calculate_chart(year, month, day, hour, minute, second, place, loc=loc, jd=jd, opts=opts)
+    return chart_result(chart, datetime(year, month, day, hour, minute), current, profile, sections)
+
+
+def chart_result(chart, birth_dt, current=None, profile="full", sections=None):
+    """The full_calculation response for a ChartModel born at the naive
+    local birth_dt. Dasha and transits are worked out for now."""
+    sections = sections or profiles.PROFILES[profile]
+    result = {"success": True, "chart": chart.to_dict() if profile == "full" and sections == profiles.SECTIONS
+              else profiles.shape_chart(chart, sections, profile)}
+    if "dasha" in sections:
+        moon_sid = chart.sid_lon("Moon")
+        with metrics.stage("dasha"):
+            dasha = calculate_dasha(moon_sid, birth_dt, depth=profiles.dasha_depth(profile))
+            result["dasha"] = profiles.shape_dasha(dasha, profile)
+    if "active_transits" in sections:
+        with metrics.stage("transits"):
+            result["active_transits"] = find_active_transits(chart, current)
+    return result
+
+
+def calculate_json(*args, **kwargs):
+    """full_calculation encoded to JSON bytes in the worker."""
+    result = full_calculation(*args, **kwargs)
+    with metrics.stage("encode"):
+        return profiles.dumps(result)
+
+
+def current_transits(now=None):
+    return get_current_planetary_positions(now)
+
+
+def calculate_batch(items, current, profile="full", sections=None, opts=DEFAULT_OPTIONS):
+    """Run full_calculation for (index, birth, loc, jd) items sharing one
+    transit snapshot. Each item yields its own success or error record."""
+    results = []
+    for index, birth, loc, jd in items:
+        try:
+            result = full_calculation(*birth, loc=loc, jd=jd, current=current, profile=profile, sections=sections,
+                                      opts=opts)
+            results.append({"index": index, **result})
+        except ValueError as e:
+            results.append({"index": index, "success": False, "status": 400, "error": str(e)})
+        except Exception as e:
+            results.append({"index": index, "success": False, "status": 500,
+                            "error": f"Calculation error: {str(e)}"})
+    return results
+
+
+def transit_events(start, end, births, planets=None, types=EVENT_TYPES, locs=None):
+    """Exact events between two UTC datetimes for each birth tuple, sharing
+    one sampled sky. locs are the births' already geocoded locations (or
+    the error message for a place that failed); births that fail get an
+    error entry."""
+    charts, errors = [], {}
+    for index, birth in enumerate(births):
+        loc = locs[index] if locs is not None else None
+        if isinstance(loc, str):
+            errors[index] = loc
+            continue
+        try:
+            charts.append(calculate_chart(*birth, loc=loc))
+        except ValueError as e:
+            errors[index] = str(e)
+        except Exception as e:
+            errors[index] = f"Calculation error: {str(e)}"
+    found = find_events(datetime_to_jd(start), datetime_to_jd(end), charts, planets, types)
+    per_chart = iter(found["charts"])
+    results = []
+    for index in range(len(births)):
+        if index in errors:
+            results.append({"index": index, "success": False, "error": errors[index]})
+        else:
+            results.append({"index": index, "success": True, "events": next(per_chart)})
+    return {"sky_events": found["sky"], "charts": results}
+
+
+def current_dashas(moon_sidereal_longitudes, birth_dates, at):
+    return current_periods(moon_sidereal_longitudes, birth_dates, at)
+
+
+def store_chart(birth, opts, current=None, profile="full", sections=None, loc=None):
+    """Calculate birth, store it under a new chart id and return the
+    calculate_json body with that chart_id."""
+    chart_id = new_chart_id()
+    year, month, day, hour, minute, second, place = birth
+    loc = loc or geocode_place(place)
+    jd = to_julian_day(year, month, day, hour, minute, second, loc["timezone"])
+    chart = calculate_chart(*birth, loc=loc, jd=jd, opts=opts)
+    chart_store.put(chart_id, birth, opts, loc, jd, chart)
+    result = chart_result(chart, datetime(year, month, day, hour, minute), current, profile, sections)
+    with metrics.stage("encode"):
+        return profiles.dumps({"chart_id": chart_id, **result})
+
+
+def stored_chart(chart_id, current=None, profile="full", sections=None):
+    """calculate_json body for a stored chart, or None when chart_id is
+    not stored."""
+    chart = chart_store.get(chart_id)
+    if chart is None:
+        return None
+    result = chart_result(chart, horoscope_pipeline.birth_datetime(chart), current, profile, sections)
+    with metrics.stage("encode"):
+        return profiles.dumps({"chart_id": chart_id, **result})
+
+
+def stored_charts(items, current=None, profile="full", sections=None):
+    """Records like calculate_batch's for (index, chart_id) items."""
+    invalid = {}
+    for index, chart_id in items:
+        try:
+            check_chart_id(chart_id)
+        except ValueError as e:
+            invalid[index] = str(e)
+    charts = chart_store.get_many([chart_id for index, chart_id in items if index not in invalid])
+    results = []
+    for index, chart_id in items:
+        if index in invalid:
+            results.append({"index": index, "chart_id": chart_id, "success": False, "status": 400,
+                            "error": invalid[index]})
+            continue
+        chart = charts.get(chart_id)
+        if chart is None:
+            results.append({"index": index, "chart_id": chart_id, "success": False, "status": 404,
+                            "error": f"Unknown chart_id '{chart_id}'"})
+            continue
+        try:
+            result = chart_result(chart, horoscope_pipeline.birth_datetime(chart), current, profile, sections)
+            results.append({"index": index, "chart_id": chart_id, **result})
+        except Exception as e:
+            results.append({"index": index, "chart_id": chart_id, "success": False, "status": 500,
+                            "error": f"Calculation error: {str(e)}"})
+    return results
+
+
+def stored_dasha_inputs(chart_ids):
+    """{chart_id: (moon sidereal longitude, naive local birth datetime)}
+    for the stored ones among chart_ids."""
+    return {chart_id: (chart.sid_lon("Moon"), horoscope_pipeline.birth_datetime(chart))
+            for chart_id, chart in chart_store.get_many(chart_ids).items()}
+
+
+def delete_chart(chart_id):
+    return chart_store.delete(chart_id)
+
+
+def compatibility_match(birth1, birth2, loc1=None, loc2=None):
+    """Ashtakoot and synastry between two birth tuples, with each chart's
+    features so callers can store them for later batch ranking."""
+    features = [compatibility.chart_features(calculate_chart(*birth, loc=loc))
+                for birth, loc in ((birth1, loc1), (birth2, loc2))]
+    return {**compatibility.match(*features), "person1_features": features[0], "person2_features": features[1]}
+
+
+def compatibility_rank(person, candidates, top=None, loc=None):
+    """Rank candidate features against person, given as a birth tuple (with
+    its geocoded loc) or as features."""
+    if isinstance(person, tuple):
+        person = compatibility.chart_features(calculate_chart(*person, loc=loc))
+    return {"person_features": person, "matches": compatibility.rank(person, candidates, top)}
+
+
+def horoscope_sky(day):
+    return horoscope_pipeline.day_sky(day)
+
+
+def horoscope_seeds(lines, day, sky):
+    return horoscope_pipeline.seeds(lines, day, sky)
+
+
+def sweep_birth_time(date, start, end, step_minutes, place, loc=None, opts=DEFAULT_OPTIONS):
+    """birth_time_sweep.sweep for a (year, month, day) date."""
+    return birth_time_sweep.sweep(*date, start, end, step_minutes, place, loc=loc, opts=opts)
+
+
+def year_scan_birth(birth, year, loc=None):
+    return year_scan.scan(calculate_chart(*birth, loc=loc), year)
+
+
+def year_scans(lines, year):
+    return year_scan.scans(lines, year)
+
+
+def year_sky_summary(year):
+    return year_scan.get_year_sky(year).summary()
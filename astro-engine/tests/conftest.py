@@ -0,0 +1,32 @@
+import json
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+# Tests never reach Nominatim, and every chart is computed rather than served
+# from the chart cache.
+os.environ.setdefault("NOMINATIM_FALLBACK", "0")
+os.environ.setdefault("CHART_CACHE_SIZE", "0")
+
+import ephemeris  # noqa: E402
+
+ephemeris.init()
+
+
+@pytest.fixture(scope="session")
+def baseline():
+    """Outputs of the original engine (see make_fixtures.py): {"now": the
+    fixed clock, "cases": [{"birth", "loc", "chart", "dasha", "transits"}]},
+    loc being the place as the original resolved it."""
+    with open(os.path.join(HERE, "fixtures", "baseline.json")) as f:
+        data = json.load(f)
+    data["now"] = datetime.fromisoformat(data["now"])
+    for case in data["cases"]:
+        birth = case["chart"]["birth_data"]
+        case["loc"] = {key: birth[key] for key in ("latitude", "longitude", "timezone")}
+    return data
@@ -0,0 +1,89 @@
+"""
+Regenerate tests/fixtures/baseline.json from the engine as it was before
+the chart model, aspect engine and dasha timeline replaced its loops.
+
+    python tests/make_fixtures.py [--rev 6e6f760]
+
+natal_chart.py, dasha.py and transits.py are read from that git revision
+into a temporary directory and run there, so the fixture records exactly
+what the original calculate_natal_chart, calculate_dasha and
+find_active_transits returned. Every birth is at one of the original
+COMMON_PLACES, so nothing is geocoded.
+"""
+
+import argparse
+import importlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURE = os.path.join(HERE, "fixtures", "baseline.json")
+
+# A fixed "now" (UTC) for the current dasha period and the transits, which
+# the original read from the clock.
+NOW = datetime(2026, 10, 16, 12, 0)
+
+BIRTHS = [
+    (1990, 5, 14, 6, 30, 0, "Mumbai, India"),
+    (1985, 11, 2, 23, 45, 0, "New Delhi, India"),
+    (2001, 2, 28, 12, 0, 0, "Bangalore, India"),
+    (1962, 7, 4, 3, 15, 0, "Chennai, India"),
+    (1977, 1, 19, 18, 5, 0, "Kolkata, India"),
+    (1999, 8, 11, 11, 11, 0, "Hyderabad, India"),
+    (1948, 3, 21, 0, 0, 0, "New York, USA"),
+    (2012, 12, 21, 16, 40, 0, "Los Angeles, USA"),
+    (1969, 7, 20, 20, 17, 0, "London, UK"),
+    (2021, 3, 28, 2, 30, 0, "London, UK"),
+]
+
+
+def _baseline(rev):
+    """Import natal_chart, dasha and transits as they were at rev."""
+    root = subprocess.run(["git", "rev-parse", "--show-toplevel"], cwd=HERE,
+                          capture_output=True, text=True, check=True).stdout.strip()
+    directory = tempfile.mkdtemp()
+    for name in ("natal_chart.py", "dasha.py", "transits.py"):
+        source = subprocess.run(["git", "show", f"{rev}:astro-engine/{name}"], cwd=root,
+                                capture_output=True, text=True, check=True).stdout
+        with open(os.path.join(directory, name), "w") as f:
+            f.write(source)
+    sys.path.insert(0, directory)
+    return [importlib.import_module(name) for name in ("natal_chart", "dasha", "transits")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rev", default="6e6f760", help="Revision holding the original engine")
+    args = parser.parse_args(argv)
+
+    natal_chart, dasha, transits = _baseline(args.rev)
+
+    class Clock(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return NOW.replace(tzinfo=tz)
+
+    dasha.datetime = transits.datetime = Clock
+    cases = []
+    for birth in BIRTHS:
+        chart = natal_chart.calculate_natal_chart(*birth)
+        moon_sid = chart["planets"]["Moon"]["sidereal"]["total_longitude"]
+        cases.append({
+            "birth": birth,
+            "chart": chart,
+            "dasha": dasha.calculate_dasha(moon_sid, datetime(*birth[:5])),
+            "transits": transits.find_active_transits(chart),
+        })
+
+    with open(FIXTURE, "w") as f:
+        json.dump({"rev": args.rev, "now": NOW.isoformat(), "cases": cases}, f, separators=(",", ":"))
+        f.write("\n")
+    print(f"{len(cases)} cases -> {FIXTURE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from aspect_engine import AspectTable, find_aspects, strengths
+from chart_model import calculate_chart, calculate_natal_chart
+from natal_chart import ASPECTS
+from transits import TRANSIT_ORBS, find_active_transits, get_current_planetary_positions
+
+TABLE = AspectTable(ASPECTS)
+
+
+def scalar_aspects(a, b, table, unique_pairs=False):
+    """The nested loops find_aspects replaced: (chart, a, b, aspect, orb)."""
+    hits = []
+    for c in range(max(len(a), len(b))):
+        row_a, row_b = a[c % len(a)], b[c % len(b)]
+        for i, lon1 in enumerate(row_a):
+            for j, lon2 in enumerate(row_b):
+                if unique_pairs and j <= i:
+                    continue
+                diff = abs(lon1 - lon2)
+                if diff > 180:
+                    diff = 360 - diff
+                for k, (angle, orb) in enumerate(zip(table.angles, table.orbs)):
+                    if abs(diff - angle) <= orb:
+                        hits.append((c, i, j, k, abs(diff - angle)))
+    return hits
+
+
+@pytest.mark.parametrize("unique_pairs", [False, True])
+@pytest.mark.parametrize("shared", [False, True])
+def test_find_aspects_matches_scalar_loops(unique_pairs, shared):
+    rng = np.random.default_rng(6)
+    a = rng.uniform(0, 360, (37, 13))
+    # Exact aspect angles and the 0/360 seam.
+    a[0, :4] = [0.0, 359.5, 120.0, 180.0]
+    b = a if unique_pairs else rng.uniform(0, 360, (1 if shared else 37, 11))
+    hits = find_aspects(a, b, TABLE, unique_pairs=unique_pairs, chunk=8)
+    expected = scalar_aspects(a, b, TABLE, unique_pairs=unique_pairs)
+    assert [h[:4] for h in hits.tolist()] == [h[:4] for h in expected]
+    np.testing.assert_allclose(hits["orb"], [h[4] for h in expected], atol=1e-9)
+    np.testing.assert_allclose(strengths(hits, TABLE), [1 - h[4] / TABLE.orbs[h[3]] for h in expected])
+
+
+def test_natal_aspects_match_baseline(baseline):
+    for case in baseline["cases"]:
+        chart = calculate_natal_chart(*case["birth"], loc=case["loc"])
+        assert chart["aspects"] == case["chart"]["aspects"], case["birth"]
+
+
+def test_active_transits_match_baseline(baseline):
+    current = get_current_planetary_positions(baseline["now"])
+    for case in baseline["cases"]:
+        chart = calculate_chart(*case["birth"], loc=case["loc"])
+        assert find_active_transits(chart, current) == case["transits"], case["birth"]
+
+
+def test_transit_orbs_override_table():
+    table = AspectTable(ASPECTS, TRANSIT_ORBS)
+    assert table.names == list(TRANSIT_ORBS)
+    assert table.orbs.tolist() == list(TRANSIT_ORBS.values())
+    assert table.angles.tolist() == [ASPECTS[name]["angle"] for name in TRANSIT_ORBS]
@@ -0,0 +1,78 @@
+from datetime import time
+
+import pytest
+
+import ephemeris
+from birth_time_sweep import sweep
+from chart_model import PLANET_NAMES, calculate_chart
+from natal_chart import NAKSHATRAS, SIGNS
+
+MUMBAI = {"latitude": 19.076, "longitude": 72.8777, "timezone": "Asia/Kolkata"}
+LONDON = {"latitude": 51.5074, "longitude": -0.1278, "timezone": "Europe/London"}
+OSLO = {"latitude": 59.9139, "longitude": 10.7522, "timezone": "Europe/Oslo"}
+
+CASES = [
+    ((1990, 5, 14), MUMBAI, ephemeris.DEFAULT_OPTIONS),
+    # Clocks go forward at 01:00 local time.
+    ((2021, 3, 28), LONDON, ephemeris.options("kp", "whole_sign", "true")),
+    ((1975, 10, 26), LONDON, ephemeris.options(house_system="koch")),
+    ((2003, 12, 1), OSLO, ephemeris.options(house_system="regiomontanus")),
+]
+
+
+def chart_fields(chart):
+    return {
+        "rising_sign": SIGNS[int(chart.asc // 30) % 12],
+        "moon_nakshatra": NAKSHATRAS[chart.nakshatras[PLANET_NAMES.index("Moon")]]["name"],
+        "houses": dict(zip(PLANET_NAMES, chart.house_western)),
+        "houses_vedic": dict(zip(PLANET_NAMES, chart.house_vedic)),
+    }
+
+
+def minutes(clock):
+    hour, minute = map(int, clock.split(":"))
+    return hour * 60 + minute
+
+
+@pytest.mark.parametrize("date, loc, opts", CASES)
+def test_sweep_matches_chart_every_minute(date, loc, opts):
+    result = sweep(*date, time(0, 0), time(23, 59), 1, None, loc=loc, opts=opts)
+    assert minutes(result["intervals"][0]["start"]) == 0
+    assert minutes(result["intervals"][-1]["end"]) == 23 * 60 + 59
+    for interval, following in zip(result["intervals"], result["intervals"][1:]):
+        assert minutes(following["start"]) == minutes(interval["end"]) + 1
+    for interval in result["intervals"]:
+        fields = {key: interval[key] for key in ("rising_sign", "moon_nakshatra", "houses", "houses_vedic")}
+        for minute in range(minutes(interval["start"]), minutes(interval["end"]) + 1):
+            chart = calculate_chart(*date, *divmod(minute, 60), 0, None, loc=loc, opts=opts)
+            assert chart_fields(chart) == fields, (date, minute)
+
+
+def test_sweep_steps_sample_the_same_grid():
+    date, loc, _ = CASES[0]
+    every_minute = sweep(*date, time(6, 0), time(9, 0), 1, None, loc=loc)
+    stepped = sweep(*date, time(6, 0), time(9, 0), 7, None, loc=loc)
+    assert stepped["birth_data"]["points"] == len(range(6 * 60, 9 * 60 + 1, 7))
+    by_minute = {}
+    for interval in every_minute["intervals"]:
+        for minute in range(minutes(interval["start"]), minutes(interval["end"]) + 1):
+            by_minute[minute] = interval["rising_sign"], interval["houses"]
+    for interval in stepped["intervals"]:
+        for minute in range(minutes(interval["start"]), minutes(interval["end"]) + 1, 7):
+            assert by_minute[minute] == (interval["rising_sign"], interval["houses"])
+
+
+def test_spans_summarize_the_intervals():
+    date, loc, opts = CASES[1]
+    result = sweep(*date, time(0, 0), time(23, 59), 5, None, loc=loc, opts=opts)
+    signs = [interval["rising_sign"] for interval in result["intervals"]]
+    assert [span["sign"] for span in result["rising_signs"]] == \
+           [sign for n, sign in enumerate(signs) if n == 0 or sign != signs[n - 1]]
+    assert result["birth_data"]["options"] == opts._asdict()
+
+
+@pytest.mark.parametrize("start, end, step", [(time(10, 0), time(9, 59), 1), (time(0, 0), time(1, 0), 0),
+                                              (time(0, 0), time(1, 0), 24 * 60 + 1)])
+def test_sweep_rejects_bad_ranges(start, end, step):
+    with pytest.raises(ValueError):
+        sweep(2000, 1, 1, start, end, step, None, loc=MUMBAI)
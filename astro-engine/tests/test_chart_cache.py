@@ -0,0 +1,77 @@
+import json
+import sqlite3
+
+import chart_cache
+import chart_model
+import ephemeris
+from chart_cache import ChartCache, chart_key
+from chart_model import calculate_chart
+
+JD, LAT, LON = 2447930.770833, 19.076, 72.8777
+
+
+def test_key_covers_every_input(monkeypatch):
+    base = chart_key(JD, LAT, LON, ephemeris.DEFAULT_OPTIONS)
+    assert chart_key(JD, LAT, LON, ephemeris.options()) == base
+    # Below the key's precision, not a different chart.
+    assert chart_key(JD + 1e-8, LAT, LON, ephemeris.DEFAULT_OPTIONS) == base
+    variants = [
+        chart_key(JD + 1e-5, LAT, LON, ephemeris.DEFAULT_OPTIONS),
+        chart_key(JD, LAT + 1e-5, LON, ephemeris.DEFAULT_OPTIONS),
+        chart_key(JD, LAT, LON - 1e-5, ephemeris.DEFAULT_OPTIONS),
+        chart_key(JD, LAT, LON, ephemeris.options(ayanamsa="raman")),
+        chart_key(JD, LAT, LON, ephemeris.options(house_system="koch")),
+        chart_key(JD, LAT, LON, ephemeris.options(node="true")),
+        chart_key(JD, LON, LAT, ephemeris.DEFAULT_OPTIONS),
+    ]
+    monkeypatch.setattr(chart_cache, "CHART_CACHE_VERSION", chart_cache.CHART_CACHE_VERSION + 1)
+    variants.append(chart_key(JD, LAT, LON, ephemeris.DEFAULT_OPTIONS))
+    assert len({base, *variants}) == len(variants) + 1
+
+
+def test_options_never_share_a_cached_body(baseline, monkeypatch):
+    cache = ChartCache(size=16, db_path="")
+    monkeypatch.setattr(chart_model, "chart_cache", cache)
+    case = baseline["cases"][0]
+    all_options = [ephemeris.DEFAULT_OPTIONS, ephemeris.options("kp"), ephemeris.options(house_system="koch"),
+                   ephemeris.options(node="true")]
+    first = [calculate_chart(*case["birth"], loc=case["loc"], opts=opts).to_dict() for opts in all_options]
+    assert (cache.hits, cache.misses) == (0, len(all_options))
+    again = [calculate_chart(*case["birth"], loc=case["loc"], opts=opts).to_dict() for opts in all_options]
+    assert (cache.hits, cache.misses) == (len(all_options), len(all_options))
+    assert again == first
+    assert len({repr(chart["houses"]) + repr(chart["planets"]) for chart in first}) == len(all_options)
+
+
+def test_lru_is_bounded():
+    cache = ChartCache(size=2, db_path="")
+    for key in "abc":
+        cache.put(key, key.upper())
+    assert cache.get("a") is None
+    assert cache.get("b") == "B"
+    cache.put("d", "D")
+    assert cache.get("c") is None and cache.get("b") == "B"
+    assert cache.stats()["entries"] == 2
+
+
+def test_store_is_shared_and_dropped_on_version_bump(monkeypatch, tmp_path):
+    path = str(tmp_path / "charts.db")
+    ChartCache(size=0, db_path=path).put("k", {"body": 1})
+    other = ChartCache(size=0, db_path=path)
+    assert other.get("k") == {"body": 1}
+    assert other.store_hits == 1
+
+    monkeypatch.setattr(chart_cache, "CHART_CACHE_VERSION", chart_cache.CHART_CACHE_VERSION + 1)
+    assert ChartCache(size=0, db_path=path).get("k") is None
+    with sqlite3.connect(path) as db:
+        assert db.execute("SELECT COUNT(*) FROM charts").fetchone()[0] == 0
+
+
+def test_cache_hits_match_the_baseline(baseline, monkeypatch):
+    cache = ChartCache(size=16, db_path="")
+    monkeypatch.setattr(chart_model, "chart_cache", cache)
+    for _ in range(2):
+        for case in baseline["cases"]:
+            chart = calculate_chart(*case["birth"], loc=case["loc"]).to_dict()
+            assert json.loads(json.dumps(chart)) == case["chart"], case["birth"]
+    assert cache.hits == cache.misses == len(baseline["cases"])
@@ -0,0 +1,104 @@
+import json
+import sqlite3
+
+import pytest
+
+import chart_store
+import ephemeris
+import tasks
+from chart_model import calculate_chart
+from chart_store import ChartStore, check_chart_id, check_persistent, new_chart_id
+from natal_chart import to_julian_day
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ChartStore(str(tmp_path / "charts.db"))
+
+
+def stored(case, store, opts=ephemeris.DEFAULT_OPTIONS):
+    birth, loc = tuple(case["birth"]), case["loc"]
+    jd = to_julian_day(*birth[:6], loc["timezone"])
+    chart = calculate_chart(*birth, loc=loc, jd=jd, opts=opts)
+    chart_id = new_chart_id()
+    store.put(chart_id, birth, opts, loc, jd, chart)
+    return chart_id, chart
+
+
+def test_put_get_and_get_many(baseline, store):
+    ids = {}
+    for case in baseline["cases"][:3]:
+        chart_id, chart = stored(case, store)
+        ids[chart_id] = chart
+    for chart_id, chart in ids.items():
+        assert store.get(chart_id).to_dict() == chart.to_dict()
+    missing = new_chart_id()
+    found = store.get_many([*ids, missing, *ids])
+    assert set(found) == set(ids)
+    assert store.get(missing) is None
+
+
+def test_delete(baseline, store):
+    chart_id, _ = stored(baseline["cases"][0], store)
+    assert store.delete(chart_id)
+    assert store.get(chart_id) is None
+    assert not store.delete(chart_id)
+
+
+def test_stale_rows_are_recomputed_and_rewritten(baseline, store, monkeypatch):
+    opts = ephemeris.options("kp", "koch")
+    chart_id, chart = stored(baseline["cases"][1], store, opts)
+    monkeypatch.setattr(chart_store, "CHART_CACHE_VERSION", chart_store.CHART_CACHE_VERSION + 1)
+    calls = []
+    monkeypatch.setattr(chart_store, "calculate_chart",
+                        lambda *args, **kwargs: calls.append(kwargs) or calculate_chart(*args, **kwargs))
+
+    assert store.get(chart_id).to_dict() == chart.to_dict()
+    assert calls[0]["opts"] == opts and calls[0]["loc"] == baseline["cases"][1]["loc"]
+    with sqlite3.connect(store.db_path) as db:
+        assert db.execute("SELECT version FROM charts WHERE id = ?", (chart_id,)).fetchone()[0] == \
+               chart_store.CHART_CACHE_VERSION
+    # Rewritten at the new version: not recomputed again.
+    store.get(chart_id)
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("value", [None, 42, "", "short", "a" * 21, "a" * 23, "a" * 21 + "/",
+                                   "../../../etc/passwd000", "a" * 21 + "="])
+def test_check_chart_id_rejects_malformed_ids(value):
+    with pytest.raises(ValueError):
+        check_chart_id(value)
+
+
+def test_issued_ids_pass_and_differ():
+    ids = {new_chart_id() for _ in range(1000)}
+    assert len(ids) == 1000
+    assert all(check_chart_id(chart_id) == chart_id for chart_id in ids)
+
+
+def test_stored_charts_reports_invalid_and_unknown_ids(baseline, store, monkeypatch):
+    monkeypatch.setattr(tasks, "chart_store", store)
+    body = json.loads(tasks.store_chart(tuple(baseline["cases"][0]["birth"]), ephemeris.DEFAULT_OPTIONS,
+                                        loc=baseline["cases"][0]["loc"]))
+    unknown = new_chart_id()
+    records = tasks.stored_charts([(0, body["chart_id"]), (1, "nope"), (2, unknown)])
+    assert records[0]["chart_id"] == body["chart_id"]
+    assert json.loads(json.dumps(records[0]["chart"])) == body["chart"]
+    assert (records[1]["status"], records[2]["status"]) == (400, 404)
+
+
+def test_deployed_store_must_be_on_a_volume(monkeypatch, tmp_path):
+    for name in ("RAILWAY_ENVIRONMENT", "RAILWAY_VOLUME_MOUNT_PATH", "CHART_STORE_DB"):
+        monkeypatch.delenv(name, raising=False)
+    local = str(tmp_path / "data" / "charts.db")
+    check_persistent(local)
+
+    monkeypatch.setenv("RAILWAY_ENVIRONMENT", "production")
+    with pytest.raises(RuntimeError):
+        check_persistent(local)
+    monkeypatch.setenv("RAILWAY_VOLUME_MOUNT_PATH", str(tmp_path / "volume"))
+    with pytest.raises(RuntimeError):
+        check_persistent(local)
+    check_persistent(str(tmp_path / "volume" / "charts.db"))
+    monkeypatch.setenv("CHART_STORE_DB", local)
+    check_persistent(local)
@@ -0,0 +1,155 @@
+import numpy as np
+import pytest
+
+from chart_model import calculate_chart
+from compatibility import (
+    KOOTAS, MAX_SCORE, SYNASTRY_PLANETS, ashtakoot_scores, chart_features, match, rank,
+)
+from natal_chart import ASPECTS, NAKSHATRAS, SIGNS
+
+# Reference Ashtakoot tables written out by name, as they appear in the
+# classical texts, independently of the index tables in compatibility.py.
+VARNA = {"Brahmin": ["Cancer", "Scorpio", "Pisces"], "Kshatriya": ["Aries", "Leo", "Sagittarius"],
+         "Vaishya": ["Taurus", "Virgo", "Capricorn"], "Shudra": ["Gemini", "Libra", "Aquarius"]}
+VARNA_RANK = ["Shudra", "Vaishya", "Kshatriya", "Brahmin"]
+# Whole signs; the half-sign splits of Sagittarius and Capricorn are not used.
+VASHYA = {"Chatushpada": ["Aries", "Taurus"], "Manava": ["Gemini", "Virgo", "Libra", "Sagittarius", "Aquarius"],
+          "Jalachara": ["Cancer", "Capricorn", "Pisces"], "Vanachara": ["Leo"], "Keeta": ["Scorpio"]}
+VASHYA_POINTS = {
+    "Chatushpada": {"Chatushpada": 2, "Manava": 1, "Jalachara": 1, "Vanachara": 0.5, "Keeta": 1},
+    "Manava": {"Chatushpada": 1, "Manava": 2, "Jalachara": 0.5, "Vanachara": 0, "Keeta": 1},
+    "Jalachara": {"Chatushpada": 1, "Manava": 0.5, "Jalachara": 2, "Vanachara": 1, "Keeta": 1},
+    "Vanachara": {"Chatushpada": 0.5, "Manava": 0, "Jalachara": 1, "Vanachara": 2, "Keeta": 0},
+    "Keeta": {"Chatushpada": 1, "Manava": 1, "Jalachara": 1, "Vanachara": 0, "Keeta": 2},
+}
+LORDS = {"Aries": "Mars", "Taurus": "Venus", "Gemini": "Mercury", "Cancer": "Moon", "Leo": "Sun",
+         "Virgo": "Mercury", "Libra": "Venus", "Scorpio": "Mars", "Sagittarius": "Jupiter",
+         "Capricorn": "Saturn", "Aquarius": "Saturn", "Pisces": "Jupiter"}
+FRIENDS = {"Sun": {"Moon", "Mars", "Jupiter"}, "Moon": {"Sun", "Mercury"}, "Mars": {"Sun", "Moon", "Jupiter"},
+           "Mercury": {"Sun", "Venus"}, "Jupiter": {"Sun", "Moon", "Mars"}, "Venus": {"Mercury", "Saturn"},
+           "Saturn": {"Mercury", "Venus"}}
+ENEMIES = {"Sun": {"Venus", "Saturn"}, "Moon": set(), "Mars": {"Mercury"}, "Mercury": {"Moon"},
+           "Jupiter": {"Mercury", "Venus"}, "Venus": {"Sun", "Moon"}, "Saturn": {"Sun", "Moon", "Mars"}}
+YONI = {"Ashwini": "Horse", "Shatabhisha": "Horse", "Bharani": "Elephant", "Revati": "Elephant",
+        "Krittika": "Sheep", "Pushya": "Sheep", "Rohini": "Serpent", "Mrigashira": "Serpent",
+        "Ardra": "Dog", "Mula": "Dog", "Punarvasu": "Cat", "Ashlesha": "Cat",
+        "Magha": "Rat", "Purva Phalguni": "Rat", "Uttara Phalguni": "Cow", "Uttara Bhadrapada": "Cow",
+        "Hasta": "Buffalo", "Swati": "Buffalo", "Chitra": "Tiger", "Vishakha": "Tiger",
+        "Anuradha": "Deer", "Jyeshtha": "Deer", "Purva Ashadha": "Monkey", "Shravana": "Monkey",
+        "Uttara Ashadha": "Mongoose", "Dhanishtha": "Lion", "Purva Bhadrapada": "Lion"}
+YONI_ENEMIES = [{"Horse", "Buffalo"}, {"Elephant", "Lion"}, {"Sheep", "Monkey"}, {"Serpent", "Mongoose"},
+                {"Dog", "Deer"}, {"Cat", "Rat"}, {"Cow", "Tiger"}]
+GANA = {"Deva": ["Ashwini", "Mrigashira", "Punarvasu", "Pushya", "Hasta", "Swati", "Anuradha", "Shravana",
+                 "Revati"],
+        "Manushya": ["Bharani", "Rohini", "Ardra", "Purva Phalguni", "Uttara Phalguni", "Purva Ashadha",
+                     "Uttara Ashadha", "Purva Bhadrapada", "Uttara Bhadrapada"],
+        "Rakshasa": ["Krittika", "Ashlesha", "Magha", "Chitra", "Vishakha", "Jyeshtha", "Mula", "Dhanishtha",
+                     "Shatabhisha"]}
+GANA_POINTS = {("Deva", "Deva"): 6, ("Deva", "Manushya"): 6, ("Deva", "Rakshasa"): 1,
+               ("Manushya", "Deva"): 5, ("Manushya", "Manushya"): 6, ("Manushya", "Rakshasa"): 0,
+               ("Rakshasa", "Deva"): 1, ("Rakshasa", "Manushya"): 0, ("Rakshasa", "Rakshasa"): 6}
+NADI = {"Adi": ["Ashwini", "Ardra", "Punarvasu", "Uttara Phalguni", "Hasta", "Jyeshtha", "Mula", "Shatabhisha",
+                "Purva Bhadrapada"],
+        "Madhya": ["Bharani", "Mrigashira", "Pushya", "Purva Phalguni", "Chitra", "Anuradha", "Purva Ashadha",
+                   "Dhanishtha", "Uttara Bhadrapada"],
+        "Antya": ["Krittika", "Rohini", "Ashlesha", "Magha", "Swati", "Vishakha", "Uttara Ashadha", "Shravana",
+                  "Revati"]}
+
+
+def group(table, name):
+    return next(key for key, names in table.items() if name in names)
+
+
+def relation(planet, other):
+    return "friend" if other in FRIENDS[planet] else "enemy" if other in ENEMIES[planet] else "neutral"
+
+
+def reference_ashtakoot(moon1, moon2):
+    """{koota: points} for person1 (groom) and person2 (bride) Moons."""
+    sign1, sign2 = SIGNS[int(moon1 // 30)], SIGNS[int(moon2 // 30)]
+    nak1, nak2 = (NAKSHATRAS[int(moon // (360 / 27))]["name"] for moon in (moon1, moon2))
+    lord1, lord2 = LORDS[sign1], LORDS[sign2]
+    relations = sorted([relation(lord1, lord2), relation(lord2, lord1)])
+    yoni1, yoni2 = YONI[nak1], YONI[nak2]
+    names = [nak["name"] for nak in NAKSHATRAS]
+    taras = [((names.index(b) - names.index(a)) % 27 + 1) % 9 for a, b in ((nak1, nak2), (nak2, nak1))]
+    return {
+        "varna": 1 if VARNA_RANK.index(group(VARNA, sign1)) >= VARNA_RANK.index(group(VARNA, sign2)) else 0,
+        "vashya": VASHYA_POINTS[group(VASHYA, sign1)][group(VASHYA, sign2)],
+        "tara": sum(0 if t in (3, 5, 7) else 1.5 for t in taras),
+        "yoni": 4 if yoni1 == yoni2 else 0 if {yoni1, yoni2} in YONI_ENEMIES else None,
+        "graha_maitri": 5 if lord1 == lord2 else {
+            ("friend", "friend"): 5, ("friend", "neutral"): 4, ("neutral", "neutral"): 3,
+            ("enemy", "friend"): 1, ("enemy", "neutral"): 0.5, ("enemy", "enemy"): 0}[tuple(relations)],
+        "gana": GANA_POINTS[group(GANA, nak1), group(GANA, nak2)],
+        "bhakoot": 0 if (SIGNS.index(sign1) - SIGNS.index(sign2)) % 12 + 1 in (2, 12, 5, 9, 6, 8) else 7,
+        "nadi": 0 if group(NADI, nak1) == group(NADI, nak2) else 8,
+    }
+
+
+# The middle of every pada: each nakshatra and sign pair the Moon can form.
+PADAS = (np.arange(108) + 0.5) * 360 / 108
+
+
+def test_ashtakoot_matches_reference_tables():
+    for moon1 in PADAS:
+        scores = ashtakoot_scores(moon1, PADAS)
+        for n, moon2 in enumerate(PADAS):
+            expected = reference_ashtakoot(moon1, moon2)
+            for koota in KOOTAS:
+                # Yoni points between neither equal nor enemy animals are
+                # graded, and only the extremes are fixed by the texts.
+                if expected[koota] is not None:
+                    assert scores[koota][n] == expected[koota], (koota, moon1, moon2)
+            assert 0 < scores["yoni"][n] < 4 or expected["yoni"] is not None
+
+
+def test_same_nakshatra_scores_28():
+    # Same Moon: every koota at its maximum except nadi (nadi dosha).
+    for moon in PADAS:
+        assert ashtakoot_scores(moon, [moon])["total"][0] == MAX_SCORE - 8
+
+
+@pytest.fixture(scope="module")
+def people(baseline):
+    return [chart_features(calculate_chart(*case["birth"], loc=case["loc"])) for case in baseline["cases"]]
+
+
+def test_synastry_aspects_match_scalar_loops(people):
+    for person1 in people:
+        for person2 in people:
+            expected = []
+            for p1 in SYNASTRY_PLANETS:
+                for p2 in SYNASTRY_PLANETS:
+                    diff = abs(person1["longitudes"][p1] - person2["longitudes"][p2])
+                    if diff > 180:
+                        diff = 360 - diff
+                    for name, aspect in ASPECTS.items():
+                        orb = abs(diff - aspect["angle"])
+                        if orb <= aspect["orb"]:
+                            expected.append((p1, p2, name, round(orb, 2), round(1 - orb / aspect["orb"], 3)))
+            expected.sort(key=lambda a: a[4], reverse=True)
+            got = [(a["person1_planet"], a["person2_planet"], a["aspect"], a["orb"], a["strength"])
+                   for a in match(person1, person2)["synastry"]["aspects"]]
+            assert got == expected
+
+
+def test_rank_agrees_with_match(people):
+    person, candidates = people[0], people[1:]
+    reports = [match(person, candidate) for candidate in candidates]
+    ranked = rank(person, candidates)
+    assert sorted(r["index"] for r in ranked) == list(range(len(candidates)))
+    for entry in ranked:
+        report = reports[entry["index"]]
+        assert entry["total_score"] == report["ashtakoot"]["total_score"]
+        assert entry["percentage"] == report["ashtakoot"]["percentage"]
+        assert entry["synastry_score"] == report["synastry"]["score"]
+        assert entry["breakdown"] == {k: v["score"] for k, v in report["ashtakoot"]["breakdown"].items()}
+    keys = [(-r["total_score"], -r["synastry_score"]) for r in ranked]
+    assert keys == sorted(keys)
+    assert rank(person, candidates, top=3) == ranked[:3]
+
+
+def test_rank_rejects_non_positive_top(people):
+    with pytest.raises(ValueError):
+        rank(people[0], people[1:], top=0)
@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from dasha import DAYS_PER_YEAR, DashaTimeline, calculate_dasha, current_periods
+
+
+def test_dasha_matches_baseline(baseline):
+    for case in baseline["cases"]:
+        moon = case["chart"]["planets"]["Moon"]["sidereal"]["total_longitude"]
+        dasha = calculate_dasha(moon, datetime(*case["birth"][:5]), now=baseline["now"])
+        # next_change is new; the rest is the original shape.
+        assert dasha["current_period"].pop("next_change")
+        assert dasha == case["dasha"], case["birth"]
+
+
+def test_deeper_levels_split_their_parent():
+    timeline = DashaTimeline(123.456, datetime(1990, 5, 14, 6, 30))
+    for k, ruler in enumerate(timeline.rulers):
+        start, end = timeline.bounds[k], timeline.bounds[k + 1]
+        subs = timeline.children(ruler, start, end)
+        assert subs[0][:2] == (ruler, start)
+        assert np.isclose(subs[-1][2], end)
+        for sub, sub_start, sub_end in subs:
+            grand = timeline.children(sub, sub_start, sub_end)
+            assert grand[0][:2] == (sub, sub_start)
+            assert np.isclose(grand[-1][2], sub_end)
+
+
+def _assert_slice(part, whole):
+    """Every period in part is in whole, with the same fields, down to the
+    deepest level."""
+    by_start = {period["start_date"]: period for period in whole}
+    for period in part:
+        match = by_start[period["start_date"]]
+        assert {k: v for k, v in period.items() if k != "sub_periods"} == \
+               {k: v for k, v in match.items() if k != "sub_periods"}
+        _assert_slice(period.get("sub_periods", []), match.get("sub_periods", []))
+
+
+def test_windowed_periods_are_a_slice_of_the_full_timeline():
+    birth = datetime(1985, 11, 2, 23, 45)
+    full = calculate_dasha(200.0, birth, depth=4)["mahadashas"]
+    window = calculate_dasha(200.0, birth, depth=4, start=datetime(2020, 1, 1), end=datetime(2021, 1, 1))["mahadashas"]
+    assert 0 < len(window) < len(full)
+    _assert_slice(window, full)
+
+
+def test_current_periods_matches_timeline():
+    rng = np.random.default_rng(9)
+    moons = rng.uniform(0, 360, 500)
+    births = [datetime(1920, 1, 1) + timedelta(days=float(d)) for d in rng.uniform(0, 105 * DAYS_PER_YEAR, 500)]
+    at = datetime(2026, 10, 16, 12)
+    columns = current_periods(moons, births, at)
+    for n, (moon, birth) in enumerate(zip(moons, births)):
+        period = DashaTimeline(moon, birth).current_period(at)
+        assert columns["mahadasha"][n] == period["mahadasha"]
+        assert columns["antardasha"][n] == period["antardasha"]
+        assert columns["next_change"][n] == period.get("next_change")
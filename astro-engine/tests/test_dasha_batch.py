@@ -0,0 +1,41 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+import server
+import warmup
+from bench.load import asgi_request
+from dasha import DAYS_PER_YEAR, calculate_dasha
+from executor import CalculationExecutor
+
+
+def test_batch_matches_calculate_dasha_for_aware_births(monkeypatch):
+    monkeypatch.setattr(server, "executor", CalculationExecutor("inline"))
+    monkeypatch.setattr(server, "readiness", warmup.Readiness("off"))
+    rng = np.random.default_rng(10)
+    zones = [timezone(timedelta(hours=5, minutes=30)), timezone(timedelta(hours=-10)), timezone(timedelta(hours=14))]
+    items = []
+    for n in range(300):
+        birth = datetime(1930, 1, 1) + timedelta(days=float(rng.uniform(0, 95 * DAYS_PER_YEAR)))
+        items.append({"id": str(n), "moon_sidereal_longitude": float(rng.uniform(0, 360)),
+                      "birth_datetime": birth.replace(tzinfo=zones[n % 3]).isoformat()})
+    at = "2026-10-16T23:00:00+05:30"
+
+    async def scenario():
+        async with server.lifespan(server.app):
+            return await asgi_request(server.app, "POST", "/dasha/current/batch", {"items": items, "at": at})
+
+    status, _, body = asyncio.run(scenario())
+    assert status == 200
+    body = json.loads(body)
+    assert body["at"] == "2026-10-16T17:30:00"
+    for n, item in enumerate(items):
+        # The birth as the chart endpoints take it: local wall clock.
+        birth = datetime.fromisoformat(item["birth_datetime"]).replace(tzinfo=None)
+        period = calculate_dasha(item["moon_sidereal_longitude"], birth,
+                                 now=datetime(2026, 10, 16, 17, 30))["current_period"]
+        assert body["mahadasha"][n] == period["mahadasha"], item
+        assert body["antardasha"][n] == period["antardasha"], item
+        assert body["next_change"][n] == period["next_change"], item
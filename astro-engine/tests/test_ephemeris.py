@@ -0,0 +1,69 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+import swisseph as swe
+
+import ephemeris
+from chart_model import calculate_natal_chart
+
+ALL_OPTIONS = [ephemeris.options(ayanamsa, house_system, node)
+               for ayanamsa, house_system, node in [("lahiri", "placidus", "mean"), ("raman", "koch", "true"),
+                                                    ("kp", "whole_sign", "mean"), ("fagan_bradley", "equal", "true"),
+                                                    ("yukteshwar", "regiomontanus", "mean")]]
+
+
+def test_default_options_match_baseline(baseline):
+    for case in baseline["cases"]:
+        chart = calculate_natal_chart(*case["birth"], loc=case["loc"])
+        # Compared as served: the fixture's house numbers are JSON keys.
+        assert json.loads(json.dumps(chart)) == case["chart"], case["birth"]
+
+
+def test_options_validate_names():
+    assert ephemeris.options() == ephemeris.DEFAULT_OPTIONS
+    assert ephemeris.options(" KP ", "Whole_Sign", "TRUE") == ("kp", "whole_sign", "true")
+    for kwargs in ({"ayanamsa": "tropical"}, {"house_system": "x"}, {"node": "osculating"}):
+        with pytest.raises(ValueError):
+            ephemeris.options(**kwargs)
+
+
+def test_options_reach_the_calculation(baseline):
+    case = baseline["cases"][0]
+    jd = case["chart"]["birth_data"]["julian_day"]
+    for opts in ALL_OPTIONS:
+        chart = calculate_natal_chart(*case["birth"], loc=case["loc"], opts=opts)
+        with ephemeris._lock:
+            swe.set_sid_mode(ephemeris.AYANAMSAS[opts.ayanamsa])
+            ayanamsa = swe.get_ayanamsa_ut(jd)
+            swe.set_sid_mode(ephemeris.AYANAMSAS[ephemeris.DEFAULT_OPTIONS.ayanamsa])
+        assert chart["birth_data"][f"ayanamsa_{opts.ayanamsa}"] == pytest.approx(ayanamsa, abs=1e-4)
+        cusps, _ = swe.houses(jd, case["loc"]["latitude"], case["loc"]["longitude"],
+                              ephemeris.HOUSE_SYSTEMS[opts.house_system])
+        assert [chart["houses"][h]["cusp_longitude"] for h in range(1, 13)] == \
+               pytest.approx(list(cusps[:12]), abs=1e-3)
+        node = swe.calc_ut(jd, ephemeris.NODES[opts.node], ephemeris.FLAGS)[0][0]
+        assert chart["planets"]["Rahu"]["tropical"]["total_longitude"] == pytest.approx(node, abs=1e-3)
+
+
+def test_threads_with_different_options_do_not_interfere(baseline):
+    jobs = [(case, opts) for case in baseline["cases"] for opts in ALL_OPTIONS]
+
+    def run(job):
+        case, opts = job
+        return calculate_natal_chart(*case["birth"], loc=case["loc"], opts=opts)
+
+    expected = [run(job) for job in jobs]
+    start = threading.Barrier(8)
+
+    def worker(n):
+        start.wait()
+        # Every thread walks the jobs in a different order, so different
+        # ayanamsas are in flight at once.
+        order = jobs[n:] + jobs[:n]
+        return [run(job) for job in order], n
+
+    with ThreadPoolExecutor(8) as pool:
+        for results, n in pool.map(worker, range(8)):
+            assert results == expected[n:] + expected[:n]
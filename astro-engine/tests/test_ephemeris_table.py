@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+import swisseph as swe
+
+import ephemeris
+import ephemeris_table
+from ephemeris_table import EphemerisTable, build, hermite, wrap180
+from natal_chart import PLANETS
+from transit_events import find_events
+
+
+@pytest.fixture(scope="module")
+def table(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("table") / "ephemeris.bin")
+    build(path, 2019, 2021, 1.0)
+    return EphemerisTable(path)
+
+
+def reference(jds, pid):
+    return np.array([ephemeris.calc(jd, pid) for jd in jds])
+
+
+def test_positions_match_swiss_ephemeris(table):
+    jds = np.random.default_rng(8).uniform(table.jd_start, table.jd_end, 500)
+    lon, lat, speed = table.positions(jds)
+    for col, (pid, name) in enumerate(PLANETS.items()):
+        ref = reference(jds, pid)
+        # The accuracy promised in the module docstring for a one-day step.
+        assert np.abs(wrap180(lon[:, col] - ref[:, 0])).max() < 0.005, name
+        assert np.abs(lat[:, col] - ref[:, 1]).max() < 0.05, name
+        assert np.abs(speed[:, col] - ref[:, 3]).max() < 0.05, name
+    ayanamsa = table.ayanamsa(jds)
+    assert np.abs(ayanamsa - [ephemeris.ayanamsa(jd) for jd in jds]).max() < 1e-6
+
+
+def test_longitudes_wrap_at_zero_aries(table):
+    # The Sun crosses 0 Aries at the 2020 March equinox, between two rows.
+    equinox = swe.julday(2020, 3, 20, 3.83)
+    jds = equinox + np.linspace(-1.5, 1.5, 73)
+    lon, _, _ = table.positions(jds, ["Sun"])
+    ref = reference(jds, swe.SUN)[:, 0]
+    assert ((lon >= 0) & (lon < 360)).all()
+    assert lon[0, 0] > 358 and lon[-1, 0] < 2
+    assert np.abs(wrap180(lon[:, 0] - ref)).max() < 1e-4
+    # Hermite across the seam, forwards and retrograde.
+    assert hermite(359.5, 1.0, 0.5, 1.0, 0.5) in (pytest.approx(0.0, abs=1e-9), pytest.approx(360.0))
+    assert hermite(0.5, -1.0, 359.5, -1.0, 0.5) in (pytest.approx(0.0, abs=1e-9), pytest.approx(360.0))
+    assert hermite(359.5, 1.0, 0.5, 1.0, 0.25) == pytest.approx(359.75)
+
+
+def test_covers_and_range_checks(table):
+    assert table.covers(table.jd_start) and table.covers(table.jd_end)
+    assert table.covers(table.jd_start, table.jd_end)
+    assert not table.covers(table.jd_start - 0.01)
+    assert not table.covers(table.jd_start, table.jd_end + 0.01)
+    # The last row is usable: interpolation stays in the final interval.
+    lon, _, _ = table.positions([table.jd_end], ["Moon"])
+    assert abs(wrap180(lon[0, 0] - ephemeris.calc(table.jd_end, swe.MOON)[0])) < 1e-9
+    with pytest.raises(ValueError):
+        table.positions([table.jd_end + 1])
+
+
+def test_event_search_uses_the_table(table, monkeypatch):
+    start, end = swe.julday(2020, 1, 1, 0.0), swe.julday(2020, 7, 1, 0.0)
+    live = find_events(start, end)
+    monkeypatch.setattr(ephemeris_table, "_table", table)
+    assert ephemeris_table.get_table() is table
+    calls = []
+    monkeypatch.setattr(table, "positions", lambda *a, **k: calls.append(1) or EphemerisTable.positions(table, *a, **k))
+    assert find_events(start, end) == live
+    assert calls
@@ -0,0 +1,102 @@
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+import server
+import warmup
+from bench.load import asgi_request
+from executor import CalculationExecutor, ExecutorSaturated
+
+
+def where():
+    return os.getpid(), threading.current_thread().name
+
+
+@pytest.mark.parametrize("mode", ["inline", "thread", "process"])
+def test_modes_run_where_they_say(mode):
+    executor = CalculationExecutor(mode, workers=1)
+    executor.start()
+    try:
+        pid, thread = asyncio.run(executor.run(where))
+    finally:
+        executor.shutdown()
+    assert (pid == os.getpid()) == (mode != "process")
+    assert thread.startswith("calc") == (mode == "thread")
+    assert executor.pending == 0
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        CalculationExecutor("fork")
+
+
+def test_full_executor_rejects_and_waiters_queue():
+    executor = CalculationExecutor("thread", workers=2, max_pending=2)
+    release = threading.Event()
+    order = []
+
+    async def scenario():
+        busy = [asyncio.ensure_future(executor.run(release.wait, 10)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(ExecutorSaturated):
+            await executor.run(where)
+
+        async def background(n):
+            await executor.run_waiting(order.append, n)
+
+        waiting = [asyncio.ensure_future(background(n)) for n in range(4)]
+        cancelled = asyncio.ensure_future(background("cancelled"))
+        await asyncio.sleep(0.05)
+        assert not order and executor.pending == 2
+        cancelled.cancel()
+        release.set()
+        await asyncio.gather(*busy, *waiting)
+        assert executor.pending == 0 and not executor._waiters
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    assert order == [0, 1, 2, 3]
+
+
+def test_saturation_is_a_503_with_retry_after(monkeypatch):
+    executor = CalculationExecutor("inline", max_pending=1)
+    monkeypatch.setattr(server, "executor", executor)
+    monkeypatch.setattr(server, "readiness", warmup.Readiness("off"))
+    item = {"moon_sidereal_longitude": 100.0, "birth_datetime": "1990-05-14T06:30:00"}
+
+    async def scenario():
+        async with server.lifespan(server.app):
+            executor.pending = 1
+            try:
+                return await asgi_request(server.app, "POST", "/dasha/current/batch", {"items": [item]})
+            finally:
+                executor.pending = 0
+
+    status, headers, body = asyncio.run(scenario())
+    assert status == 503
+    assert dict(headers)[b"retry-after"] == b"1"
+    assert json.loads(body)["detail"].startswith("Engine busy")
+
+
+def test_process_pool_is_rebuilt_after_a_worker_dies():
+    executor = CalculationExecutor("process", workers=1)
+    executor.start()
+
+    async def scenario():
+        first, _ = await executor.run(where)
+        with pytest.raises(BrokenProcessPool):
+            await executor.run(os._exit, 1)
+        second, _ = await executor.run(where)
+        return first, second
+
+    try:
+        first, second = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    assert first != second != os.getpid()
@@ -0,0 +1,111 @@
+import pytest
+
+import gazetteer
+from build_gazetteer import build, read_admin1, read_cities, read_countries
+from gazetteer import Gazetteer
+
+# GeoNames dump rows: id, name, ascii name, alternate names, lat, lon, feature
+# class and code, country, cc2, admin1-4, population, elevation, dem, timezone, date.
+CITIES = [
+    ("4409896", "Springfield", "Springfield", "Springfield MO", "37.21533", "-93.29824", "P", "PPLA2", "US", "",
+     "MO", "077", "", "", "169176", "396", "398", "America/Chicago", "2017-05-23"),
+    ("4250542", "Springfield", "Springfield", "", "39.80172", "-89.64371", "P", "PPLA", "US", "",
+     "IL", "167", "", "", "116250", "182", "183", "America/Chicago", "2017-05-23"),
+    ("4951788", "Springfield", "Springfield", "", "42.10148", "-72.58981", "P", "PPLA2", "US", "",
+     "MA", "013", "", "", "155929", "21", "22", "America/New_York", "2017-05-23"),
+    ("4132093", "Springdale", "Springdale", "", "36.18674", "-94.12881", "P", "PPL", "US", "",
+     "AR", "143", "", "", "81125", "395", "393", "America/Chicago", "2017-05-23"),
+    ("2867714", "Munich", "Munich", "Monaco di Baviera,München,Munchen", "48.13743", "11.57549", "P", "PPLA",
+     "DE", "", "02", "091", "09162", "", "1260391", "524", "521", "Europe/Berlin", "2023-10-12"),
+    ("1275339", "Mumbai", "Mumbai", "Bombay,Mumbaī", "19.07283", "72.88261", "P", "PPLA", "IN", "",
+     "16", "", "", "", "12691836", "", "8", "Asia/Kolkata", "2019-06-05"),
+    # No timezone: skipped.
+    ("1", "Nowhere", "Nowhere", "", "0", "0", "P", "PPL", "XX", "", "", "", "", "", "10", "", "0", "", ""),
+]
+COUNTRIES = [("#ISO", "ISO3", "ISO-Numeric", "fips", "Country"),
+             ("US", "USA", "840", "US", "United States"),
+             ("DE", "DEU", "276", "GM", "Germany"),
+             ("IN", "IND", "356", "IN", "India")]
+ADMIN1 = [("US.MO", "Missouri", "Missouri", "4398678"), ("US.IL", "Illinois", "Illinois", "4896861"),
+          ("US.MA", "Massachusetts", "Massachusetts", "6254926"), ("US.AR", "Arkansas", "Arkansas", "4099753"),
+          ("DE.02", "Bavaria", "Bavaria", "2951839"), ("IN.16", "Maharashtra", "Maharashtra", "1264418")]
+
+
+def write_tsv(path, rows):
+    path.write_text("".join("\t".join(row) + "\n" for row in rows), encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def gz(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("gazetteer")
+    places = read_cities(write_tsv(directory / "cities.txt", CITIES),
+                         read_countries(write_tsv(directory / "countryInfo.txt", COUNTRIES)),
+                         read_admin1(write_tsv(directory / "admin1.txt", ADMIN1)), 0, True)
+    output = str(directory / "gazetteer.bin")
+    assert build(places, output)[0] == 6
+    index = Gazetteer(output)
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def installed(gz, monkeypatch):
+    monkeypatch.setattr(gazetteer, "_gazetteer", gz)
+    return gz
+
+
+def test_exact_names_pick_the_most_populous(gz):
+    place = gz.search("Springfield")
+    assert (place["admin1"], place["match"]) == ("Missouri", "exact")
+    assert gz.search("  SPRINGFIELD ")["admin1"] == "Missouri"
+    assert gz.search("Bombay")["name"] == "Mumbai"
+    assert gz.search("München")["name"] == gz.search("munchen")["name"] == "Munich"
+
+
+@pytest.mark.parametrize("query, admin1", [
+    ("Springfield, IL", "Illinois"),
+    ("Springfield, Massachusetts", "Massachusetts"),
+    ("Springfield, MA, USA", "Massachusetts"),
+    ("Springfield, Illinois, United States", "Illinois"),
+    ("Munich, Germany", "Bavaria"),
+    ("Munich, DE", "Bavaria"),
+])
+def test_qualifiers_narrow_the_match(gz, query, admin1):
+    assert gz.search(query)["admin1"] == admin1
+
+
+def test_qualifiers_must_all_match(gz):
+    assert gz.search("Springfield, UK") is None
+    assert gz.search("Springfield, IL, Germany") is None
+    assert gz.search("Nowhere") is None
+    assert gz.search(" , ") is None
+
+
+def test_approximate_names_only_on_request(gz):
+    assert gz.search("Springfi") is None
+    assert gz.search("Sprngfield") is None
+    prefix = gz.search("Springfi", approximate=True)
+    assert (prefix["admin1"], prefix["match"]) == ("Missouri", "prefix")
+    assert gz.search("Springfi, IL", approximate=True)["admin1"] == "Illinois"
+    fuzzy = gz.search("Sprngfield, MA", approximate=True)
+    assert (fuzzy["admin1"], fuzzy["match"]) == ("Massachusetts", "fuzzy")
+    assert gz.search("Qwertyuiop", approximate=True) is None
+
+
+def test_lookup_is_exact_only(installed):
+    assert gazetteer.lookup("Springfield, IL") == {
+        "latitude": 39.80172, "longitude": -89.64371, "timezone": "America/Chicago",
+        "address": "Springfield, Illinois, United States",
+    }
+    assert gazetteer.lookup("Mumbai")["timezone"] == "Asia/Kolkata"
+    assert gazetteer.lookup("Springfi") is None
+    assert gazetteer.lookup("Sprngfield") is None
+
+
+def test_suggest_orders_by_population(gz):
+    assert [(p["name"], p["admin1"]) for p in gz.suggest("spr")] == [
+        ("Springfield", "Missouri"), ("Springfield", "Massachusetts"),
+        ("Springfield", "Illinois"), ("Springdale", "Arkansas")]
+    assert [p["name"] for p in gz.suggest("Spr", limit=1)] == ["Springfield"]
+    assert gz.suggest("zz") == []
@@ -0,0 +1,157 @@
+import asyncio
+import sqlite3
+import threading
+
+import pytest
+
+import gazetteer
+import geocoding
+from geocoding import GeocodeCache, Geocoder, RateLimiter
+
+PARIS = {"latitude": 48.8566, "longitude": 2.3522, "timezone": "Europe/Paris", "address": "Paris, France"}
+
+
+class Clock:
+    """Stands in for the time module: sleeping moves the clock."""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def upstream(monkeypatch, tmp_path):
+    """A fresh cache over a temporary file, no gazetteer hits, and a fake
+    Nominatim that records every call."""
+    calls = []
+    answers = {"paris": PARIS}
+    gate = threading.Event()
+    gate.set()
+
+    def lookup(place_name):
+        calls.append(place_name)
+        gate.wait(10)
+        key = geocoding.normalize_place(place_name)
+        if key == "broken":
+            raise OSError("upstream timed out")
+        if key not in answers:
+            raise ValueError(f"Cannot find location: {place_name}")
+        return answers[key]
+
+    monkeypatch.setattr(geocoding, "_nominatim_lookup", lookup)
+    monkeypatch.setattr(geocoding, "NOMINATIM_FALLBACK", True)
+    monkeypatch.setattr(geocoding, "geocode_cache", GeocodeCache(db_path=str(tmp_path / "geocode.db")))
+    monkeypatch.setattr(gazetteer, "lookup", lambda place_name: None)
+    lookup.calls, lookup.gate = calls, gate
+    return lookup
+
+
+def test_concurrent_requests_share_one_lookup(upstream):
+    upstream.gate.clear()
+
+    async def scenario():
+        geocoder = Geocoder()
+        waiters = [asyncio.ensure_future(geocoder.resolve(name)) for name in ("Paris", " paris", "PARIS ") * 4]
+        await asyncio.sleep(0.1)
+        upstream.gate.set()
+        return await asyncio.gather(*waiters)
+
+    assert asyncio.run(scenario()) == [PARIS] * 12
+    assert len(upstream.calls) == 1
+    # Later requests are answered from the cache.
+    assert geocoding.geocode_place("Paris") == PARIS
+    assert len(upstream.calls) == 1
+
+
+def test_misses_are_cached_and_upstream_failures_are_not(upstream, tmp_path):
+    for _ in range(3):
+        with pytest.raises(ValueError, match="Cannot find location"):
+            geocoding.geocode_place("Atlantis")
+    assert upstream.calls == ["Atlantis"]
+    # Another process sees the stored miss.
+    other = GeocodeCache(db_path=str(tmp_path / "geocode.db"))
+    assert other.load("atlantis") == "Cannot find location: Atlantis"
+
+    for _ in range(2):
+        with pytest.raises(OSError):
+            geocoding.geocode_place("Broken")
+    assert upstream.calls.count("Broken") == 2
+    assert other.load("broken") is None
+
+
+def test_entries_expire(monkeypatch, tmp_path):
+    clock = Clock()
+    monkeypatch.setattr(geocoding, "time", clock)
+    cache = GeocodeCache(db_path=str(tmp_path / "geocode.db"), ttl=100, negative_ttl=10)
+    cache.put("paris", PARIS)
+    cache.put("atlantis", "Cannot find location: Atlantis")
+
+    clock.now += 11
+    assert cache.get("paris") == PARIS
+    assert cache.get("atlantis") is None and cache.load("atlantis") is None
+    clock.now += 90
+    assert cache.get("paris") is None
+    cache.clear()
+    assert cache.load("paris") is None
+
+
+def test_persistent_rows_are_capped(monkeypatch, tmp_path):
+    clock = Clock()
+    monkeypatch.setattr(geocoding, "time", clock)
+    cache = GeocodeCache(db_path=str(tmp_path / "geocode.db"), ttl=100, negative_ttl=10, rows=3)
+    for n in range(3):
+        cache.put(f"place {n}", dict(PARIS, address=str(n)))
+        clock.now += 1
+    cache.put("atlantis", "Cannot find location: Atlantis")
+    cache.put("place 3", PARIS)
+
+    with sqlite3.connect(cache.db_path) as db:
+        kept = {key for key, in db.execute("SELECT key FROM places")}
+    # The miss expires first, then the oldest answer.
+    assert kept == {"place 1", "place 2", "place 3"}
+
+
+def test_resolve_many_maps_errors(upstream):
+    async def scenario():
+        return await Geocoder().resolve_many(["Paris", "Atlantis", "Paris", "Broken", " paris"])
+
+    assert asyncio.run(scenario()) == {
+        "Paris": PARIS,
+        " paris": PARIS,
+        "Atlantis": "Cannot find location: Atlantis",
+        "Broken": "Geocoding error: upstream timed out",
+    }
+    assert sorted(upstream.calls) == ["Atlantis", "Broken", "Paris"]
+
+
+def test_rate_is_shared_through_the_cache_file(monkeypatch, tmp_path):
+    clock = Clock()
+    monkeypatch.setattr(geocoding, "time", clock)
+    # Two limiters on one file stand for the API process and a worker.
+    path = str(tmp_path / "geocode.db")
+    api, worker = RateLimiter(2, path), RateLimiter(2, path)
+    starts = []
+    for limiter in (api, worker, worker, api, worker):
+        limiter.wait()
+        starts.append(clock.now)
+    assert starts == [clock.now - 2.0 + 0.5 * n for n in range(5)]
+
+    # Idle time is not banked.
+    clock.now += 60
+    worker.wait()
+    api.wait()
+    assert clock.sleeps[-1] == 0.5
+
+    # Without a file each process keeps its own schedule.
+    first, second = RateLimiter(2), RateLimiter(2)
+    sleeps = len(clock.sleeps)
+    first.wait()
+    second.wait()
+    assert len(clock.sleeps) == sleeps
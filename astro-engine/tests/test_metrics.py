@@ -0,0 +1,36 @@
+import asyncio
+
+import metrics
+import server
+import tasks
+import warmup
+from bench.load import asgi_request
+from chart_store import ChartStore, new_chart_id
+from executor import CalculationExecutor
+
+
+def test_requests_are_labelled_by_route_template(monkeypatch, tmp_path):
+    monkeypatch.setattr(server, "executor", CalculationExecutor("inline"))
+    monkeypatch.setattr(server, "readiness", warmup.Readiness("off"))
+    monkeypatch.setattr(tasks, "chart_store", ChartStore(str(tmp_path / "charts.db")))
+    monkeypatch.setattr(metrics, "registry", metrics.Registry())
+
+    async def scenario():
+        async with server.lifespan(server.app):
+            for _ in range(3):
+                await asgi_request(server.app, "GET", f"/charts/{new_chart_id()}")
+            await asgi_request(server.app, "DELETE", f"/charts/{new_chart_id()}")
+            await asgi_request(server.app, "GET", "/health")
+            await asgi_request(server.app, "GET", "/openapi.json")
+            await asgi_request(server.app, "GET", "/no/such/path")
+            await asgi_request(server.app, "GET", "/charts/{chart_id}/x")
+
+    asyncio.run(scenario())
+    assert metrics.registry.requests == {
+        ("/charts/{chart_id}", 404): 4,
+        ("/health", 200): 1,
+        ("/openapi.json", 200): 1,
+        ("other", 404): 2,
+    }
+    assert metrics.registry.latency["/charts/{chart_id}"].count == 4
+    assert 'astro_requests_total{path="/charts/{chart_id}",status="404"} 4' in metrics.registry.render()
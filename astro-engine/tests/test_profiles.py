@@ -0,0 +1,94 @@
+import json
+from datetime import datetime
+
+import pytest
+
+import profiles
+import tasks
+from chart_model import calculate_chart
+from profiles import PROFILES, SECTIONS, shape_chart
+
+
+@pytest.fixture
+def case(baseline):
+    return baseline["cases"][0]
+
+
+@pytest.fixture
+def chart(case):
+    return calculate_chart(*case["birth"], loc=case["loc"])
+
+
+def built(chart):
+    """Sections the model has built so far (birth_data is always there)."""
+    return set(chart._sections)
+
+
+def test_resolve_and_parse_fields():
+    assert profiles.resolve() == SECTIONS
+    assert profiles.resolve("summary") == PROFILES["summary"]
+    # Explicit fields come back in SECTIONS order, whatever the profile.
+    assert profiles.resolve("numeric", ["dasha", "planets", "big_three"]) == ["big_three", "planets", "dasha"]
+    assert profiles.parse_fields(" planets, ,houses ") == ["planets", "houses"]
+    assert profiles.parse_fields("") is None
+    with pytest.raises(ValueError, match="Unknown profile"):
+        profiles.resolve("tiny")
+    with pytest.raises(ValueError, match="Unknown fields: moon"):
+        profiles.resolve("full", ["planets", "moon"])
+
+
+def test_full_profile_is_the_baseline_chart(case, chart):
+    shaped = shape_chart(chart, SECTIONS)
+    assert json.loads(json.dumps(shaped)) == case["chart"]
+
+
+def test_fields_build_only_what_is_selected(case, chart):
+    shaped = shape_chart(chart, profiles.resolve("full", ["big_three", "ascendant", "dasha"]))
+    assert list(shaped) == ["big_three", "ascendant"]
+    assert shaped["ascendant"] == case["chart"]["ascendant"]
+    assert built(chart) == {"big_three", "ascendant"}
+
+
+def test_summary_profile(case, chart):
+    shaped = shape_chart(chart, PROFILES["summary"], "summary")
+    assert list(shaped) == [s for s in PROFILES["summary"] if s in profiles.CHART_SECTIONS]
+    moon = case["chart"]["planets"]["Moon"]
+    assert shaped["planets"]["Moon"] == {
+        "sign": moon["tropical"]["sign"], "degree": moon["tropical"]["formatted"], "house": moon["house_western"],
+        "sidereal_sign": moon["sidereal"]["sign"], "nakshatra": moon["nakshatra"]["name"],
+        "retrograde": moon["retrograde"],
+    }
+    assert shaped["ascendant"] == {"sign": case["chart"]["ascendant"]["sign"],
+                                   "degree": case["chart"]["ascendant"]["formatted"]}
+    assert shaped["aspects"] == case["chart"]["aspects"][:profiles.SUMMARY_ASPECT_LIMIT]
+    assert "houses" not in built(chart) and "stelliums" not in built(chart)
+
+
+def test_numeric_profile(case, chart):
+    shaped = shape_chart(chart, PROFILES["numeric"], "numeric")
+    expected = case["chart"]
+    assert shaped["houses"] == [expected["houses"][str(h)]["cusp_longitude"] for h in range(1, 13)]
+    assert shaped["ascendant"] == expected["ascendant"]["total_longitude"]
+    assert shaped["planets"]["Sun"]["sidereal_longitude"] == expected["planets"]["Sun"]["sidereal"]["total_longitude"]
+    assert shaped["aspects"][0] == {k: expected["aspects"][0][k] for k in ("planet1", "planet2", "aspect", "orb")}
+    assert set(shaped["birth_data"]) == {"latitude", "longitude", "julian_day", "ayanamsa_lahiri"}
+
+
+@pytest.mark.parametrize("profile", list(PROFILES))
+def test_chart_result_sections(baseline, case, chart, profile):
+    birth = datetime(*case["birth"][:5])
+    current = tasks.current_transits(baseline["now"])
+    result = tasks.chart_result(chart, birth, current=current, profile=profile)
+    sections = PROFILES[profile]
+    assert set(result) == {"success", "chart"} | ({"dasha", "active_transits"} & set(sections))
+    if "dasha" in sections:
+        if profile == "numeric":
+            assert set(result["dasha"]) == {"mahadasha", "antardasha", "next_change"}
+        else:
+            depth = profiles.dasha_depth(profile)
+            assert ("sub_periods" in result["dasha"]["mahadashas"][0]) == (depth > 1)
+
+
+def test_dumps_matches_json(case, chart):
+    value = {"chart": chart.to_dict(), "ids": [1, 2.5, None, "é"]}
+    assert json.loads(profiles.dumps(value)) == json.loads(json.dumps(value))
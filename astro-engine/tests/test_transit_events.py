@@ -0,0 +1,91 @@
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+import ephemeris
+from chart_model import calculate_chart
+from natal_chart import ASPECTS, SIGNS
+from transit_events import (
+    DEFAULT_PLANETS, EVENT_ASPECTS, PLANET_IDS, REFINE_TOLERANCE, datetime_to_jd, find_events, natal_points, wrap180,
+)
+
+STEP = 1 / 24  # brute-force sampling step, days
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+END = datetime(2024, 7, 1, tzinfo=timezone.utc)
+
+
+def brute_force(jd_start, jd_end, points):
+    """Every ingress, station and exact natal aspect found by sampling each
+    planet every STEP days: {(type, planet, detail): [jd, ...]}, each jd
+    the end of the step the event falls in."""
+    jds = np.arange(jd_start, jd_end + STEP, STEP)
+    events = {}
+    for planet in DEFAULT_PLANETS:
+        samples = np.array([ephemeris.calc(jd, PLANET_IDS[planet])[:4] for jd in jds])
+        lon, speed = samples[:, 0], samples[:, 3]
+        sign = (lon // 30).astype(int)
+        for i in np.flatnonzero(sign[1:] != sign[:-1]) + 1:
+            entered = sign[i] if speed[i] > 0 else sign[i - 1]
+            events.setdefault(("ingress", planet, SIGNS[entered]), []).append(jds[i])
+        if planet != "Rahu":
+            for i in np.flatnonzero(np.signbit(speed[1:]) != np.signbit(speed[:-1])) + 1:
+                kind = "retrograde" if speed[i - 1] > 0 else "direct"
+                events.setdefault(("station", planet, kind), []).append(jds[i])
+        for n_name, n_lon in points.items():
+            for asp in EVENT_ASPECTS:
+                angle = ASPECTS[asp]["angle"]
+                for target in {(n_lon + angle) % 360, (n_lon - angle) % 360}:
+                    f = wrap180(lon - target)
+                    flips = (np.signbit(f[1:]) != np.signbit(f[:-1])) & (np.abs(f[1:] - f[:-1]) < 180)
+                    for i in np.flatnonzero(flips) + 1:
+                        events.setdefault(("aspect", planet, (n_name, asp)), []).append(jds[i])
+    return events
+
+
+def key(event):
+    if event["type"] == "ingress":
+        return ("ingress", event["planet"], event["sign"])
+    if event["type"] == "station":
+        return ("station", event["planet"], event["station"])
+    return ("aspect", event["planet"], (event["natal_planet"], event["aspect"]))
+
+
+@pytest.fixture(scope="module")
+def search(baseline):
+    case = baseline["cases"][0]
+    chart = calculate_chart(*case["birth"], loc=case["loc"])
+    jd_start, jd_end = datetime_to_jd(START), datetime_to_jd(END)
+    found = find_events(jd_start, jd_end, [chart])
+    points = natal_points(chart)
+    return found["sky"] + found["charts"][0], brute_force(jd_start, jd_end, points), jd_end, points
+
+
+def test_events_match_brute_force_sampling(search):
+    events, expected, jd_end, _ = search
+    got = {}
+    for event in events:
+        got.setdefault(key(event), []).append(event["julian_day"])
+    # The brute-force grid may place an event in the step that ends past
+    # the range; it is still inside it.
+    expected = {k: [jd for jd in v if jd - STEP <= jd_end] for k, v in expected.items()}
+    expected = {k: v for k, v in expected.items() if v}
+    assert got.keys() == expected.keys()
+    for k, jds in got.items():
+        assert len(jds) == len(expected[k]), k
+        for jd, step_end in zip(sorted(jds), sorted(expected[k])):
+            assert step_end - STEP - REFINE_TOLERANCE <= jd <= step_end + REFINE_TOLERANCE, k
+
+
+def test_event_times_are_exact(search):
+    events, _, _, points = search
+    for event in events:
+        jd = event["julian_day"]
+        lon, speed = (ephemeris.calc(jd, PLANET_IDS[event["planet"]])[i] for i in (0, 3))
+        if event["type"] == "ingress":
+            assert abs(wrap180(lon - SIGNS.index(event["sign"]) * 30 - (0 if speed > 0 else 30))) < 0.05
+        elif event["type"] == "station":
+            assert abs(speed) < 0.01
+        else:
+            separation = abs(wrap180(lon - points[event["natal_planet"]]))
+            assert abs(separation - ASPECTS[event["aspect"]]["angle"]) < 0.05
@@ -0,0 +1,114 @@
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+import server
+import warmup
+from bench.load import asgi_request
+from executor import CalculationExecutor
+from transit_snapshot import TransitSnapshots
+
+# A bucket boundary for 60 s buckets, far enough ahead that no prefetch is due.
+T0 = 4_000_000_020
+
+
+def recording(delay=0.0, fail=()):
+    calls = []
+
+    async def compute(when):
+        calls.append(when)
+        await asyncio.sleep(delay)
+        if when in fail:
+            raise RuntimeError("ephemeris unavailable")
+        return {"at": when.isoformat()}
+
+    compute.calls = calls
+    return compute
+
+
+def test_one_computation_per_bucket_at_its_start():
+    compute = recording(delay=0.05)
+    snapshots = TransitSnapshots(compute, bucket_seconds=60, prefetch_seconds=0)
+
+    async def scenario():
+        first = await asyncio.gather(*[snapshots.get(T0 + s) for s in (0, 1, 30, 59.9)])
+        later = await snapshots.get(T0 + 60)
+        return first, later
+
+    first, later = asyncio.run(scenario())
+    assert all(s is first[0] for s in first)
+    start = datetime.fromtimestamp(T0, timezone.utc)
+    assert compute.calls[:2] == [start, datetime.fromtimestamp(T0 + 60, timezone.utc)]
+    assert first[0].data == {"at": start.isoformat()}
+    assert first[0].etag == f'"tr-60-{T0 // 60}"' and later.etag != first[0].etag
+    assert first[0].max_age(T0 + 15) == 45
+    assert first[0].max_age(T0 + 600) == 0
+
+
+def test_next_bucket_is_prefetched_and_old_ones_dropped():
+    compute = recording()
+    snapshots = TransitSnapshots(compute, bucket_seconds=60, prefetch_seconds=5)
+
+    async def scenario():
+        for n in range(4):
+            await snapshots.get(T0 + 60 * n)
+            await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert snapshots.computations == 4
+    assert sorted(snapshots._snapshots) == [T0 // 60 + 2, T0 // 60 + 3]
+
+    now = time.time()
+    compute = recording()
+    snapshots = TransitSnapshots(compute, bucket_seconds=1, prefetch_seconds=1)
+
+    async def due():
+        await snapshots.get(now)
+        for _ in range(3):
+            await asyncio.sleep(0)
+
+    asyncio.run(due())
+    assert snapshots.bucket_of(now) + 1 in snapshots._snapshots
+
+
+def test_failed_computation_is_not_kept():
+    start = datetime.fromtimestamp(T0, timezone.utc)
+    compute = recording(fail={start})
+    snapshots = TransitSnapshots(compute, bucket_seconds=60, prefetch_seconds=0)
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await snapshots.get(T0)
+
+    asyncio.run(scenario())
+    assert compute.calls == [start, start]
+    assert not snapshots._snapshots and not snapshots._inflight
+
+
+def test_etag_revalidation(monkeypatch):
+    monkeypatch.setattr(server, "executor", CalculationExecutor("inline"))
+    monkeypatch.setattr(server, "readiness", warmup.Readiness("off"))
+    monkeypatch.setattr(server, "snapshots", TransitSnapshots(recording(), bucket_seconds=3600,
+                                                                    prefetch_seconds=0))
+
+    async def scenario():
+        async with server.lifespan(server.app):
+            fresh = await asgi_request(server.app, "GET", "/transits/now")
+            etag = dict(fresh[1])[b"etag"].decode()
+            cached = await asgi_request(server.app, "GET", "/transits/now", headers=[("If-None-Match", etag)])
+            stale = await asgi_request(server.app, "GET", "/transits/now", headers=[("If-None-Match", '"tr-1-1"')])
+            return fresh, cached, stale
+
+    fresh, cached, stale = asyncio.run(scenario())
+    assert fresh[0] == 200 and stale[0] == 200
+    assert json.loads(fresh[2]) == json.loads(stale[2])
+    assert cached[0] == 304 and cached[2] == b""
+    headers = dict(cached[1])
+    assert headers[b"etag"] == dict(fresh[1])[b"etag"]
+    max_age = int(headers[b"cache-control"].decode().rsplit("=", 1)[1])
+    assert headers[b"cache-control"].startswith(b"public, max-age=") and 0 <= max_age <= 3600
+    assert server.snapshots.computations == 1
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import threading
+
+import server
+import warmup
+from bench.load import asgi_request
+from executor import CalculationExecutor
+
+
+def test_ready_only_after_background_warmup(monkeypatch):
+    release = threading.Event()
+    warmed = []
+
+    def slow_warm_process():
+        release.wait(10)
+        warmed.append(threading.get_ident())
+        return 1, {"chart": 0.0}
+
+    monkeypatch.setattr(warmup, "warm_process", slow_warm_process)
+    monkeypatch.setattr(server, "executor", CalculationExecutor("thread", workers=2))
+    monkeypatch.setattr(server, "readiness", warmup.Readiness("background"))
+
+    async def scenario():
+        async with server.lifespan(server.app):
+            status, _, body = await asgi_request(server.app, "GET", "/health/ready")
+            assert status == 503
+            assert json.loads(body)["warm"] is False
+            status, _, _ = await asgi_request(server.app, "GET", "/health")
+            assert status == 200
+
+            release.set()
+            for _ in range(500):
+                if server.readiness.ready:
+                    break
+                await asyncio.sleep(0.01)
+            status, _, body = await asgi_request(server.app, "GET", "/health/ready")
+            assert status == 200
+            body = json.loads(body)
+            assert body["warm"] is True and body["error"] is None
+            assert body["api_warmup"] is not None
+
+    asyncio.run(scenario())
+    assert warmed
+
+
+def test_failed_warmup_is_reported_and_ready(monkeypatch):
+    def broken_warm_process():
+        raise RuntimeError("no ephemeris")
+
+    monkeypatch.setattr(warmup, "warm_process", broken_warm_process)
+    monkeypatch.setattr(server, "executor", CalculationExecutor("thread", workers=1))
+    monkeypatch.setattr(server, "readiness", warmup.Readiness("blocking"))
+
+    async def scenario():
+        async with server.lifespan(server.app):
+            status, _, body = await asgi_request(server.app, "GET", "/health/ready")
+            assert status == 200
+            assert json.loads(body)["error"] == "RuntimeError: no ephemeris"
+
+    asyncio.run(scenario())
+
+
+def test_off_is_ready_without_warming(monkeypatch):
+    monkeypatch.setattr(server, "executor", CalculationExecutor("inline"))
+    monkeypatch.setattr(server, "readiness", warmup.Readiness("off"))
+
+    async def scenario():
+        async with server.lifespan(server.app):
+            status, _, body = await asgi_request(server.app, "GET", "/health/ready")
+            assert status == 200
+            assert json.loads(body)["warm_workers"] == 0
+
+    asyncio.run(scenario())
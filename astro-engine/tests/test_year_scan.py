@@ -0,0 +1,104 @@
+from collections import Counter
+from datetime import datetime, timezone
+
+import pytest
+
+import ephemeris
+from chart_model import calculate_chart
+from dasha import calculate_dasha
+from horoscope_pipeline import HARD, NATAL_PLANETS, SOFT
+from natal_chart import find_house
+from transit_events import PLANET_IDS, datetime_to_jd, find_events, jd_to_datetime
+from transits import TRANSIT_ASPECTS
+from year_scan import FOCUS_PLANETS, HIT_PLANETS, THEME_PLANETS, YearSky, scan
+
+YEAR = 2026
+
+
+@pytest.fixture(scope="module")
+def sky():
+    return YearSky(YEAR)
+
+
+@pytest.fixture(scope="module")
+def charts(baseline):
+    return [calculate_chart(*case["birth"], loc=case["loc"]) for case in baseline["cases"][:3]]
+
+
+def year_events(charts):
+    jd_start = datetime_to_jd(datetime(YEAR, 1, 1, tzinfo=timezone.utc))
+    jd_end = datetime_to_jd(datetime(YEAR + 1, 1, 1, tzinfo=timezone.utc))
+    return find_events(jd_start, jd_end, charts)
+
+
+def test_sky_matches_event_search(sky):
+    events = year_events([])["sky"]
+    ingresses = [(e["planet"], e["sign"], e["retrograde"]) for e in events if e["type"] == "ingress"]
+    assert [(e["planet"], e["sign"], e["retrograde"]) for e in sky.ingresses] == ingresses
+    stations = {(e["planet"], e["julian_day"]) for e in events if e["type"] == "station"}
+    for planet, start, end, _, _ in sky.retrogrades:
+        # Windows may open or close outside the year; the stations inside
+        # it are the event search's.
+        for jd in (start, end):
+            if sky.jd_start <= jd < sky.jd_end:
+                assert any(p == planet and abs(jd - s) < 1e-6 for p, s in stations)
+
+
+def test_exact_hits_match_event_search(charts):
+    for chart, events in zip(charts, year_events(charts)["charts"]):
+        expected = [e for e in events if e["planet"] in HIT_PLANETS]
+        hits = scan(chart, YEAR)["exact_hits"]
+        assert Counter((h["planet"], h["natal_planet"], h["aspect"], h["retrograde"]) for h in hits) == \
+               Counter((e["planet"], e["natal_planet"], e["aspect"], e["retrograde"]) for e in expected)
+        for hit in hits:
+            # Linear interpolation on noon samples: within a day of the
+            # exact time.
+            assert any(abs((datetime.fromisoformat(hit["date"]) -
+                            datetime.fromisoformat(e["date"]).replace(tzinfo=None)).days) <= 1
+                       for e in expected
+                       if (e["planet"], e["natal_planet"], e["aspect"]) == (hit["planet"], hit["natal_planet"],
+                                                                           hit["aspect"]))
+
+
+def test_month_contacts_match_daily_transits(sky, charts):
+    chart = charts[0]
+    natal = chart.lons(NATAL_PLANETS)
+    days = {}
+    for jd in sky.days[1:-1]:
+        month = jd_to_datetime(jd).month
+        for planet in THEME_PLANETS:
+            lon = ephemeris.calc(jd, PLANET_IDS[planet])[0]
+            for n_name, n_lon in zip(NATAL_PLANETS, natal):
+                diff = abs(lon - n_lon)
+                diff = 360 - diff if diff > 180 else diff
+                for name, angle, orb in zip(TRANSIT_ASPECTS.names, TRANSIT_ASPECTS.angles, TRANSIT_ASPECTS.orbs):
+                    if abs(diff - angle) <= orb:
+                        key = (month, planet, n_name, name)
+                        days[key] = days.get(key, 0) + 1
+    for month in scan(chart, YEAR, sky)["months"]:
+        for contact in month["contacts"]:
+            key = (month["month"], contact["transit_planet"], contact["natal_planet"], contact["aspect"])
+            assert contact["days"] == days[key]
+        aspects = [k[3] for k in days if k[0] == month["month"]]
+        assert month["tone"] == {"soft": sum(a in SOFT for a in aspects), "hard": sum(a in HARD for a in aspects)}
+
+
+def test_focus_houses_match_chart_houses(sky, charts):
+    chart = charts[1]
+    cusps = chart.cusp_longitudes()
+    for month in scan(chart, YEAR, sky)["months"]:
+        jd = datetime_to_jd(datetime(YEAR, month["month"], 15, 12, tzinfo=timezone.utc))
+        for planet in FOCUS_PLANETS:
+            assert month["focus_houses"][planet] == find_house(ephemeris.calc(jd, PLANET_IDS[planet])[0], cusps)
+
+
+def test_dasha_changes_match_calculate_dasha(charts):
+    for chart in charts:
+        birth = datetime.strptime(f"{chart.birth_data['date']} {chart.birth_data['time']}", "%Y-%m-%d %H:%M:%S")
+        dasha = calculate_dasha(chart.sid_lon("Moon"), birth, now=datetime(YEAR, 1, 1))
+        starts = [(ad["start_date"], md["ruler"], ad["ruler"])
+                  for md in dasha["mahadashas"] for ad in md["sub_periods"]
+                  if ad["start_date"].startswith(str(YEAR)) and ad["start_date"] != f"{YEAR}-01-01"]
+        result = scan(chart, YEAR)["dasha"]
+        assert [(c["date"], c["mahadasha"], c["antardasha"]) for c in result["changes"]] == starts
+        assert result["at_start"] == dasha["current_period"]
@@ -0,0 +1,190 @@
+"""
+Exact transit event search over a date range.
+
+Finds the instants when a transiting planet perfects an aspect to a natal
+point, changes sign, or stations retrograde/direct. The sky is sampled once
+per planet at a planet-specific step (SAMPLE_STEP_DAYS); every bracketed
+crossing is then refined by bisection on ephemeris.calc to REFINE_TOLERANCE
+days. Samples come from the precomputed ephemeris table when one covers
+the range. Sampling is shared by every chart searched over the same range, so
+the cost per planet-year is fixed and the per-chart cost is only the
+refinement of that chart's own hits.
+"""
+
+import math
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+import ephemeris
+from natal_chart import PLANETS, ASPECTS, SIGNS
+from chart_model import PLANET_NAMES
+from ephemeris_table import get_table
+
+PLANET_IDS = {name: pid for pid, name in PLANETS.items()}
+
+SAMPLE_STEP_DAYS = {
+    "Moon": 0.25, "Sun": 1, "Mercury": 1, "Venus": 1, "Mars": 2,
+    "Jupiter": 4, "Saturn": 4, "Uranus": 8, "Neptune": 8, "Pluto": 8, "Rahu": 4,
+}
+DEFAULT_PLANETS = [p for p in PLANETS.values() if p != "Moon"]
+EVENT_ASPECTS = ["conjunction", "opposition", "trine", "square", "sextile"]
+EVENT_TYPES = ("aspect", "ingress", "station")
+
+REFINE_TOLERANCE = 1 / 1440
+MAX_RANGE_DAYS = 3 * 366
+
+_UNIX_EPOCH_JD = 2440587.5
+
+
+def jd_to_datetime(jd):
+    return datetime(1970, 1, 1, tzinfo=timezone.utc) + timedelta(days=jd - _UNIX_EPOCH_JD)
+
+
+def datetime_to_jd(dt):
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return _UNIX_EPOCH_JD + (dt - datetime(1970, 1, 1, tzinfo=timezone.utc)).total_seconds() / 86400
+
+
+def wrap180(x):
+    return (x + 180) % 360 - 180
+
+
+def _position(jd, pid):
+    xx = ephemeris.calc(jd, pid)
+    return xx[0], xx[3]
+
+
+class SkyTrack:
+    """Sampled longitude and speed of one planet over [jd_start, jd_end]."""
+
+    def __init__(self, planet, jd_start, jd_end, step=None):
+        self.planet = planet
+        self.pid = PLANET_IDS[planet]
+        self.step = step or SAMPLE_STEP_DAYS.get(planet, 1)
+        n = int(math.ceil((jd_end - jd_start) / self.step)) + 1
+        self.jd = jd_start + np.arange(n) * self.step
+        table = get_table()
+        if table is not None and planet in table.planets and table.covers(self.jd[0], self.jd[-1]):
+            # Interpolated samples are only used to bracket events; refinement
+            # below always goes back to ephemeris.calc.
+            lon, _, speed = table.positions(self.jd, [planet])
+            self.lon, self.speed = lon[:, 0], speed[:, 0]
+        else:
+            samples = np.array([_position(jd, self.pid) for jd in self.jd])
+            self.lon = samples[:, 0]
+            self.speed = samples[:, 1]
+
+    def _refine(self, fn, lo, hi):
+        f_lo = fn(lo)
+        while hi - lo > REFINE_TOLERANCE:
+            mid = (lo + hi) / 2
+            f_mid = fn(mid)
+            if (f_mid < 0) == (f_lo < 0):
+                lo, f_lo = mid, f_mid
+            else:
+                hi = mid
+        return float(lo + hi) / 2
+
+    def crossings(self, targets):
+        """(jd, target index, direction) for each time the longitude passes a
+        target; direction is +1 moving forward and -1 when retrograde."""
+        targets = np.asarray(targets, dtype=np.float64)
+        if not len(targets) or len(self.jd) < 2:
+            return []
+        f = wrap180(self.lon[:, None] - targets[None, :])
+        f0, f1 = f[:-1], f[1:]
+        # A sign flip far from zero is the +-180 wrap, not a crossing.
+        bracket = (np.signbit(f0) != np.signbit(f1)) & (np.abs(f0 - f1) < 180)
+        found = []
+        for i, t in zip(*np.nonzero(bracket)):
+            target = targets[t]
+            jd = self._refine(lambda x: wrap180(_position(x, self.pid)[0] - target), self.jd[i], self.jd[i + 1])
+            found.append((jd, int(t), 1 if f1[i, t] > f0[i, t] else -1))
+        return found
+
+    def stations(self):
+        """(jd, kind) for each retrograde / direct station."""
+        s0, s1 = self.speed[:-1], self.speed[1:]
+        found = []
+        for i in np.nonzero(np.signbit(s0) != np.signbit(s1))[0]:
+            jd = self._refine(lambda x: _position(x, self.pid)[1], self.jd[i], self.jd[i + 1])
+            found.append((jd, "retrograde" if s0[i] > 0 else "direct"))
+        return found
+
+
+def sample_sky(jd_start, jd_end, planets=None):
+    return {p: SkyTrack(p, jd_start, jd_end) for p in (planets or DEFAULT_PLANETS)}
+
+
+def _event(kind, planet, jd, **fields):
+    return {"type": kind, "planet": planet, "date": jd_to_datetime(jd).isoformat(timespec="seconds"),
+            "julian_day": round(jd, 6), **fields}
+
+
+def sky_events(sky, types=EVENT_TYPES):
+    """Chart-independent events: sign ingresses and stations."""
+    events = []
+    for planet, track in sky.items():
+        if "ingress" in types:
+            for jd, t, direction in track.crossings(np.arange(12) * 30.0):
+                sign_idx = t if direction > 0 else (t - 1) % 12
+                events.append(_event("ingress", planet, jd, sign=SIGNS[sign_idx],
+                                     retrograde=direction < 0))
+        # The mean node never stations.
+        if "station" in types and planet != "Rahu":
+            for jd, kind in track.stations():
+                lon, _ = _position(jd, track.pid)
+                events.append(_event("station", planet, jd, station=kind,
+                                     sign=SIGNS[int(lon // 30) % 12], longitude=round(lon, 4)))
+    return events
+
+
+def natal_events(sky, natal_points, aspects=EVENT_ASPECTS):
+    """Exact transit-to-natal aspects. natal_points maps names to tropical
+    longitudes."""
+    targets, meta = [], []
+    for n_name, n_lon in natal_points.items():
+        for asp in aspects:
+            angle = ASPECTS[asp]["angle"]
+            for sign in ((1,) if angle in (0, 180) else (1, -1)):
+                targets.append((n_lon + sign * angle) % 360)
+                meta.append((n_name, asp))
+    events = []
+    for planet, track in sky.items():
+        for jd, t, direction in track.crossings(targets):
+            n_name, asp = meta[t]
+            events.append(_event("aspect", planet, jd, natal_planet=n_name, aspect=asp,
+                                 retrograde=direction < 0))
+    return events
+
+
+def natal_points(chart):
+    return dict(zip(PLANET_NAMES, chart.lons()))
+
+
+def find_events(jd_start, jd_end, charts=(), planets=None, types=EVENT_TYPES, aspects=EVENT_ASPECTS):
+    """Events for each chart (aspect hits) plus the shared sky events.
+
+    Returns {"sky": [...], "charts": [[...] per chart]}, each list sorted by
+    time.
+    """
+    if jd_end <= jd_start:
+        raise ValueError("Event search range end must be after its start")
+    if jd_end - jd_start > MAX_RANGE_DAYS:
+        raise ValueError(f"Event search range is limited to {MAX_RANGE_DAYS} days")
+    unknown = [p for p in (planets or []) if p not in PLANET_IDS]
+    if unknown:
+        raise ValueError(f"Unknown planets: {', '.join(unknown)}")
+
+    def in_range(events):
+        # The last sample may overshoot jd_end by up to one step.
+        return sorted((e for e in events if e["julian_day"] <= jd_end), key=lambda e: e["julian_day"])
+
+    sky = sample_sky(jd_start, jd_end, planets)
+    shared = in_range(sky_events(sky, types))
+    per_chart = []
+    for chart in charts:
+        per_chart.append(in_range(natal_events(sky, natal_points(chart), aspects)) if "aspect" in types else [])
+    return {"sky": shared, "charts": per_chart}
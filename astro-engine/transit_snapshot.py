@@ -0,0 +1,93 @@
+"""
+Time-bucketed transit snapshots shared by every request.
+
+The sky is computed once per TRANSIT_BUCKET_SECONDS bucket, at the bucket's
+start time. Concurrent callers for the same bucket await one in-flight
+computation, and once a bucket has been served the next one is computed
+TRANSIT_PREFETCH_SECONDS before it starts so traffic never waits on a
+bucket rollover. Each snapshot carries an ETag and the seconds it remains
+current, for Cache-Control.
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+
+TRANSIT_BUCKET_SECONDS = int(os.environ.get("TRANSIT_BUCKET_SECONDS", 60))
+TRANSIT_PREFETCH_SECONDS = int(os.environ.get("TRANSIT_PREFETCH_SECONDS", 5))
+
+
+class Snapshot:
+    __slots__ = ("bucket", "data", "etag", "expires_at")
+
+    def __init__(self, bucket, data, etag, expires_at):
+        self.bucket = bucket
+        self.data = data
+        self.etag = etag
+        self.expires_at = expires_at
+
+    def max_age(self, now=None):
+        return max(0, int(self.expires_at - (now if now is not None else time.time())))
+
+    def headers(self):
+        return {"ETag": self.etag, "Cache-Control": f"public, max-age={self.max_age()}"}
+
+
+class TransitSnapshots:
+    def __init__(self, compute, bucket_seconds=TRANSIT_BUCKET_SECONDS, prefetch_seconds=TRANSIT_PREFETCH_SECONDS):
+        """compute is an async callable taking the bucket start (UTC datetime)
+        and returning the planetary positions for that instant."""
+        self.compute = compute
+        self.bucket_seconds = max(1, bucket_seconds)
+        self.prefetch_seconds = min(prefetch_seconds, self.bucket_seconds)
+        self.computations = 0
+        self._snapshots = {}
+        self._inflight = {}
+        self._prefetching = set()
+
+    def bucket_of(self, ts):
+        return int(ts // self.bucket_seconds)
+
+    async def get(self, now=None):
+        bucket = self.bucket_of(now if now is not None else time.time())
+        snapshot = self._snapshots.get(bucket)
+        if snapshot is None:
+            snapshot = await asyncio.shield(self._ensure(bucket))
+        self._schedule_prefetch(bucket + 1)
+        return snapshot
+
+    def _ensure(self, bucket):
+        task = self._inflight.get(bucket)
+        if task is None:
+            task = asyncio.ensure_future(self._compute(bucket))
+            self._inflight[bucket] = task
+        return task
+
+    async def _compute(self, bucket):
+        try:
+            start = bucket * self.bucket_seconds
+            data = await self.compute(datetime.fromtimestamp(start, timezone.utc))
+            self.computations += 1
+            snapshot = Snapshot(bucket, data, f'"tr-{self.bucket_seconds}-{bucket}"', start + self.bucket_seconds)
+            self._snapshots[bucket] = snapshot
+            for old in [b for b in self._snapshots if b < bucket - 1]:
+                del self._snapshots[old]
+            return snapshot
+        finally:
+            self._inflight.pop(bucket, None)
+
+    def _schedule_prefetch(self, bucket):
+        if bucket in self._snapshots or bucket in self._inflight or bucket in self._prefetching:
+            return
+        self._prefetching.add(bucket)
+        delay = max(0.0, bucket * self.bucket_seconds - self.prefetch_seconds - time.time())
+        asyncio.get_running_loop().call_later(delay, self._prefetch, bucket)
+
+    def _prefetch(self, bucket):
+        self._prefetching.discard(bucket)
+        if bucket not in self._snapshots:
+            task = self._ensure(bucket)
+            # Retrieve the exception so a failed prefetch isn't logged as
+            # "never retrieved"; the next get() simply recomputes.
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
@@ -0,0 +1,124 @@
+"""
+Startup warmup and readiness.
+
+A fresh worker pays for its first Swiss Ephemeris file reads, the memory
+maps of the gazetteer and ephemeris table, tz database parsing and (when
+Nominatim is enabled) the TimezoneFinder polygons on whichever request
+comes first. warm_process() does that work up front on every worker, and
+warm_api_process() does the geocoding part of it in the API process, which
+resolves places itself (geocoding.Geocoder).
+
+Readiness (/health/ready, Railway's healthcheckPath) waits for warmup, so
+traffic only moves to a new deploy once its first requests are as fast as
+the rest; warmup must finish within railway.json's healthcheckTimeout. A
+warmup that fails is reported ("error") but still ends in ready: a cold
+worker is slow, not broken.
+
+Configuration (environment):
+    STARTUP_WARMUP   "background" (default): serve at once (/health answers)
+                     and report ready when warmup finishes; "blocking":
+                     finish warming before serving; "off": skip warmup and
+                     report ready as soon as the pool is up
+"""
+
+import asyncio
+import os
+import time
+
+STARTUP_WARMUP = os.environ.get("STARTUP_WARMUP", "background")
+
+# A fixed instant and place; any chart touches every planet's ephemeris.
+WARMUP_JD = 2451545.0
+WARMUP_LOCATION = (28.6139, 77.2090)
+WARMUP_ATTEMPTS = 4
+
+
+def warm_process():
+    """Load everything a calculation touches in this process. Returns
+    (pid, {step: seconds}); cheap to call again once warm."""
+    from dateutil import tz
+
+    import chart_model
+    import ephemeris
+    import ephemeris_table
+    import gazetteer
+    import geocoding
+    import transits
+
+    steps = {}
+
+    def step(name, fn):
+        start = time.perf_counter()
+        fn()
+        steps[name] = round(time.perf_counter() - start, 4)
+
+    step("ephemeris", ephemeris.init)
+    step("chart", lambda: chart_model.compute_chart_body(WARMUP_JD, *WARMUP_LOCATION).to_dict())
+    step("transits", transits.get_current_planetary_positions)
+    step("gazetteer", gazetteer.get_gazetteer)
+    step("ephemeris_table", ephemeris_table.get_table)
+    step("tzdata", lambda: [tz.gettz(p["timezone"]) for p in geocoding.COMMON_PLACES.values()])
+    if geocoding.NOMINATIM_FALLBACK:
+        step("timezone_finder", lambda: geocoding.timezone_at(*WARMUP_LOCATION))
+    return os.getpid(), steps
+
+
+def warm_api_process():
+    """The geocoding part of warm_process, for the API process. Returns
+    {step: seconds}."""
+    import gazetteer
+    import geocoding
+
+    steps = {}
+    start = time.perf_counter()
+    gazetteer.get_gazetteer()
+    steps["gazetteer"] = round(time.perf_counter() - start, 4)
+    if geocoding.NOMINATIM_FALLBACK:
+        start = time.perf_counter()
+        geocoding.get_timezone_finder()
+        steps["timezone_finder"] = round(time.perf_counter() - start, 4)
+    return steps
+
+
+class Readiness:
+    """Whether the server is warm and ready, and the warmup's progress."""
+
+    def __init__(self, mode=STARTUP_WARMUP):
+        if mode not in ("background", "blocking", "off"):
+            raise ValueError(f"Unknown STARTUP_WARMUP mode: {mode}")
+        self.mode = mode
+        self.ready = False
+        self.warmed = mode == "off"
+        self.error = None
+        self.api = None
+        self.workers = {}
+        self.started_at = None
+        self.seconds = None
+
+    async def warm(self, executor):
+        """Warm the API process, then run warm_process until every worker
+        has reported, or give up after WARMUP_ATTEMPTS rounds (a cold worker
+        is slow, not broken)."""
+        self.started_at = time.monotonic()
+        try:
+            self.api = await asyncio.to_thread(warm_api_process)
+            for _ in range(WARMUP_ATTEMPTS):
+                for pid, steps in await asyncio.gather(*[
+                    executor.run_waiting(warm_process) for _ in range(executor.workers)
+                ]):
+                    self.workers.setdefault(pid, steps)
+                if executor.mode != "process" or len(self.workers) >= executor.workers:
+                    break
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+        self.seconds = round(time.monotonic() - self.started_at, 3)
+        self.warmed = True
+
+    def started(self, _task=None):
+        """Warmup is over (or off) and the executor takes calculations.
+        Also a done callback for the background warmup task."""
+        self.ready = True
+
+    def status(self):
+        return {"ready": self.ready, "warm": self.warmed, "mode": self.mode, "api_warmup": self.api,
+                "warm_workers": len(self.workers), "warmup_seconds": self.seconds, "error": self.error}
@@ -0,0 +1,304 @@
+"""
+Personal year scans: a chart's transits, dasha changes and retrogrades
+over one calendar year.
+
+    python year_scan.py --year 2026 -i charts.ndjson -o scans.ndjson
+
+Input records are the same as horoscope_pipeline's ({"id", "chart_id"},
+{"id", "chart"} or {"id", "birth"}). Output is NDJSON: a first line {"year", "sky"} with the
+year's shared ingresses and retrograde windows, then one scan per record
+(in completion order, tagged with the record's input index):
+
+    {"index", "id", "success", "year", "dasha": {"at_start", "changes"},
+     "months": [{"month", "name", "focus_houses", "themes", "contacts",
+                 "tone"}], "exact_hits", "retrogrades"}
+
+The year's sky is walked once per worker process and kept (YearSky, see
+get_year_sky): daily noon positions of the transiting planets, read from
+the ephemeris table when it covers the year, plus the ingress and station
+events. A chart scan then needs no ephemeris calls: one find_aspects call
+over the daily positions for the monthly themes, exact slow-planet hits
+bracketed on the same samples (dates, not times), and its dasha timeline.
+"""
+
+import argparse
+import asyncio
+import calendar
+import sys
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+import ephemeris
+from aspect_engine import find_aspects
+from dasha import DASHA_ORDER, DashaTimeline
+from ephemeris_table import get_table
+from chart_model import PLANET_INDEX
+from horoscope_pipeline import (HARD, NATAL_PLANETS, SOFT, TRANSIT_PRIORITY, birth_datetime, houses_of,
+                                read_record, stream_chunks)
+from natal_chart import ASPECTS, SIGNS
+from transit_events import (DEFAULT_PLANETS, EVENT_ASPECTS, PLANET_IDS, datetime_to_jd, jd_to_datetime, sample_sky,
+                            sky_events, wrap180)
+from transits import TRANSIT_ASPECTS
+import metrics
+
+YEAR_MIN, YEAR_MAX = 1900, 2100
+CHUNK_SIZE = 50
+YEAR_SKY_CACHE = 4
+
+THEME_PLANETS = ["Sun", "Mercury", "Venus", "Mars", "Jupiter", "Saturn", "Uranus", "Neptune", "Pluto", "Rahu"]
+HIT_PLANETS = ["Mars", "Jupiter", "Saturn", "Uranus", "Neptune", "Pluto", "Rahu"]
+RETROGRADE_PLANETS = ["Mercury", "Venus", "Mars", "Jupiter", "Saturn", "Uranus", "Neptune", "Pluto"]
+FOCUS_PLANETS = ["Sun", "Jupiter", "Saturn"]
+MONTH_CONTACTS = 3
+MONTH_THEMES = 3
+# Longer than any retrograde, so windows overlapping the year are complete.
+RETROGRADE_PAD_DAYS = 170
+
+# (aspect, offset from the natal point) of every exact hit target.
+HIT_TARGETS = [(asp, sign * ASPECTS[asp]["angle"]) for asp in EVENT_ASPECTS
+               for sign in ((1,) if ASPECTS[asp]["angle"] in (0, 180) else (1, -1))]
+
+HOUSE_THEMES = {
+    1: "self and vitality", 2: "money and values", 3: "communication and siblings",
+    4: "home and family", 5: "romance and creativity", 6: "health and daily work",
+    7: "partnerships", 8: "shared resources and transformation", 9: "travel and learning",
+    10: "career and reputation", 11: "friends and goals", 12: "rest and inner life",
+}
+
+
+def check_year(year):
+    if not YEAR_MIN <= year <= YEAR_MAX:
+        raise ValueError(f"Year scans are limited to {YEAR_MIN}-{YEAR_MAX}")
+
+
+def _daily_positions(jds, planets):
+    table = get_table()
+    if table is not None and all(p in table.planets for p in planets) and table.covers(jds[0], jds[-1]):
+        return table.positions(jds, planets)[0]
+    return np.array([[ephemeris.calc(jd, PLANET_IDS[p])[0] for p in planets] for jd in jds])
+
+
+def _when(jd):
+    return jd_to_datetime(jd).isoformat(timespec="minutes")
+
+
+class YearSky:
+    """Everything about one UTC calendar year that does not depend on the
+    chart."""
+
+    def __init__(self, year):
+        check_year(year)
+        self.year = year
+        self.jd_start = datetime_to_jd(datetime(year, 1, 1, tzinfo=timezone.utc))
+        self.jd_end = datetime_to_jd(datetime(year + 1, 1, 1, tzinfo=timezone.utc))
+
+        # Noon samples from the last day of the previous year to the first
+        # of the next, so hits in the year's first and last half days are
+        # bracketed too; months only use the days inside the year.
+        self.days = np.arange(self.jd_start - 0.5, self.jd_end + 1, 1.0)
+        self.lons = _daily_positions(self.days, THEME_PLANETS)
+        self.day_month = np.array([jd_to_datetime(jd).month - 1 for jd in self.days[1:-1]])
+
+        padded = sample_sky(self.jd_start - RETROGRADE_PAD_DAYS, self.jd_end + RETROGRADE_PAD_DAYS, DEFAULT_PLANETS)
+        self.ingresses = sorted((e for e in sky_events(padded, ("ingress",))
+                                 if self.jd_start <= e["julian_day"] < self.jd_end),
+                                key=lambda e: e["julian_day"])
+        self.retrogrades = []
+        for planet in RETROGRADE_PLANETS:
+            start = None
+            for jd, kind in padded[planet].stations():
+                if kind == "retrograde":
+                    start = jd
+                elif start is not None:
+                    if jd >= self.jd_start and start < self.jd_end:
+                        self.retrogrades.append((planet, start, jd, ephemeris.calc(start, PLANET_IDS[planet])[0],
+                                                 ephemeris.calc(jd, PLANET_IDS[planet])[0]))
+                    start = None
+        self.retrogrades.sort(key=lambda w: w[1])
+
+    def retrograde_windows(self):
+        return [{"planet": planet, "start": _when(start), "end": _when(end),
+                 "sign": SIGNS[int(lon_start // 30) % 12], "direct_sign": SIGNS[int(lon_end // 30) % 12]}
+                for planet, start, end, lon_start, lon_end in self.retrogrades]
+
+    def summary(self):
+        return {"ingresses": [{"planet": e["planet"], "sign": e["sign"], "date": e["date"],
+                               "retrograde": e["retrograde"]} for e in self.ingresses],
+                "retrogrades": self.retrograde_windows()}
+
+
+_skies = {}
+_skies_lock = threading.Lock()
+
+
+def get_year_sky(year) -> YearSky:
+    """Process-wide YearSky for year, built on first use."""
+    sky = _skies.get(year)
+    if sky is None:
+        with _skies_lock:
+            sky = _skies.get(year)
+            if sky is None:
+                with metrics.stage("year_sky"):
+                    sky = YearSky(year)
+                if len(_skies) >= YEAR_SKY_CACHE:
+                    _skies.pop(next(iter(_skies)))
+                _skies[year] = sky
+    return sky
+
+
+def _months(chart, sky, natal, cusps):
+    hits = find_aspects(sky.lons[1:-1], natal, TRANSIT_ASPECTS)
+    contacts = {}
+    for day, i, j, k, orb in hits.tolist():
+        key = (int(sky.day_month[day]), i, j, k)
+        days, best_orb, best_day = contacts.get(key, (0, 180.0, day))
+        contacts[key] = (days + 1, orb, day) if orb < best_orb else (days + 1, best_orb, best_day)
+
+    by_month = [[] for _ in range(12)]
+    for (month, i, j, k), (days, orb, day) in contacts.items():
+        by_month[month].append((THEME_PLANETS[i], NATAL_PLANETS[j], TRANSIT_ASPECTS.names[k], days, orb, day))
+
+    focus = [THEME_PLANETS.index(p) for p in FOCUS_PLANETS]
+    mid_month = [int(np.nonzero(sky.day_month == m)[0][14]) for m in range(12)]
+    focus_houses = houses_of(sky.lons[1:-1][mid_month][:, focus], [cusps])
+
+    months = []
+    for m, month_contacts in enumerate(by_month):
+        month_contacts.sort(key=lambda c: (-TRANSIT_PRIORITY.get(c[0], 0) * c[3], c[4]))
+        top = month_contacts[:MONTH_CONTACTS]
+        houses = [int(focus_houses[m, 0])] + [chart.house_western[PLANET_INDEX[c[1]]] for c in top]
+        months.append({
+            "month": m + 1,
+            "name": calendar.month_name[m + 1],
+            "focus_houses": {p: int(focus_houses[m, n]) for n, p in enumerate(FOCUS_PLANETS)},
+            "themes": [HOUSE_THEMES[h] for h in dict.fromkeys(houses)][:MONTH_THEMES],
+            "contacts": [{"transit_planet": t, "natal_planet": p, "aspect": a, "days": days,
+                          "peak": jd_to_datetime(sky.days[day + 1]).strftime("%Y-%m-%d"), "orb": round(orb, 2)}
+                         for t, p, a, days, orb, day in top],
+            "tone": {"soft": sum(c[2] in SOFT for c in month_contacts),
+                     "hard": sum(c[2] in HARD for c in month_contacts)},
+        })
+    return months
+
+
+def _exact_hits(sky, natal):
+    """Exact slow-planet hits on natal points, bracketed on the daily
+    samples and placed by linear interpolation between them (minutes off,
+    away from stations), sorted by time."""
+    cols = [THEME_PLANETS.index(p) for p in HIT_PLANETS]
+    offsets = np.array([offset for _, offset in HIT_TARGETS])
+    targets = (natal[:, None] + offsets[None, :]).ravel() % 360
+    f = wrap180(sky.lons[:, cols, None] - targets[None, None, :])
+    f0, f1 = f[:-1], f[1:]
+    bracket = (np.signbit(f0) != np.signbit(f1)) & (np.abs(f0 - f1) < 180)
+    d, h, t = np.nonzero(bracket)
+    jd = sky.days[d] + f0[d, h, t] / (f0[d, h, t] - f1[d, h, t])
+    keep = (jd >= sky.jd_start) & (jd < sky.jd_end)
+    hits = []
+    for jd_hit, h_idx, t_idx, back in zip(jd[keep].tolist(), h[keep].tolist(), t[keep].tolist(),
+                                          (f1[d, h, t] < f0[d, h, t])[keep].tolist()):
+        n_idx, k = divmod(t_idx, len(HIT_TARGETS))
+        hits.append((jd_hit, {"planet": HIT_PLANETS[h_idx], "natal_planet": NATAL_PLANETS[n_idx],
+                              "aspect": HIT_TARGETS[k][0], "date": jd_to_datetime(jd_hit).strftime("%Y-%m-%d"),
+                              "retrograde": back}))
+    hits.sort(key=lambda hit: hit[0])
+    return [hit for _, hit in hits]
+
+
+def _dasha(chart, year):
+    timeline = DashaTimeline(chart.sid_lon("Moon"), birth_datetime(chart))
+    start, end = datetime(year, 1, 1), datetime(year + 1, 1, 1)
+    lo, hi = timeline.offset(start), timeline.offset(end)
+    changes = []
+    for k, ruler in enumerate(timeline.rulers):
+        if timeline.bounds[k + 1] <= lo or timeline.bounds[k] >= hi:
+            continue
+        for j, (sub, sub_start, _) in enumerate(timeline.children(ruler, timeline.bounds[k], timeline.bounds[k + 1])):
+            if lo < sub_start < hi:
+                changes.append({"date": timeline.date_at(sub_start).strftime("%Y-%m-%d"),
+                                "level": "mahadasha" if j == 0 else "antardasha",
+                                "mahadasha": DASHA_ORDER[ruler], "antardasha": DASHA_ORDER[sub]})
+    return {"at_start": timeline.current_period(start), "changes": changes}
+
+
+def scan(chart, year, sky=None) -> dict:
+    """Year scan of one ChartModel."""
+    sky = sky or get_year_sky(year)
+    natal = np.array(chart.lons(NATAL_PLANETS))
+    cusps = chart.cusp_longitudes()
+
+    with metrics.stage("year_months"):
+        months = _months(chart, sky, natal, cusps)
+    with metrics.stage("year_hits"):
+        exact_hits = _exact_hits(sky, natal)
+    with metrics.stage("dasha"):
+        dasha = _dasha(chart, year)
+
+    retro_houses = houses_of([w[3] for w in sky.retrogrades], [cusps])[0] if sky.retrogrades else []
+    retrogrades = [{**window, "natal_house": int(h), "theme": HOUSE_THEMES[int(h)]}
+                   for window, h in zip(sky.retrograde_windows(), retro_houses)]
+    return {
+        "year": year,
+        "dasha": dasha,
+        "months": months,
+        "exact_hits": exact_hits,
+        "retrogrades": retrogrades,
+    }
+
+
+def scans(lines, year) -> list:
+    """Scans for [(index, raw line)], sharing the worker's YearSky."""
+    sky = get_year_sky(year)
+    out = []
+    for index, line in lines:
+        try:
+            record_id, chart = read_record(line)
+            out.append({"index": index, "id": record_id, "success": True, **scan(chart, year, sky)})
+        except (ValueError, KeyError, TypeError) as e:
+            out.append({"index": index, "success": False, "error": f"Invalid record: {e}"})
+        except Exception as e:
+            out.append({"index": index, "success": False, "error": f"Calculation error: {str(e)}"})
+    return out
+
+
+async def stream_scans(executor, year, lines, dumps, chunk_size=CHUNK_SIZE):
+    """Encoded NDJSON lines: the year's sky header, then scans as chunks
+    finish on the executor."""
+    import tasks
+
+    summary = await executor.run_waiting(tasks.year_sky_summary, year)
+    yield dumps({"year": year, "sky": summary}) + b"\n"
+    async for out in stream_chunks(executor, lines, tasks.year_scans, (year,), dumps, chunk_size):
+        yield out
+
+
+def main(argv=None):
+    from horoscope_pipeline import run_to_file
+    from profiles import dumps
+
+    parser = argparse.ArgumentParser(description="Scan a year of transits and dasha periods for many charts.")
+    parser.add_argument("--year", type=int, default=datetime.now(timezone.utc).year)
+    parser.add_argument("-i", "--input", help="NDJSON charts (default: stdin)")
+    parser.add_argument("-o", "--output", help="NDJSON scans (default: stdout)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args(argv)
+    check_year(args.year)
+
+    infile = open(args.input, "rb") if args.input else sys.stdin.buffer
+    outfile = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        count = asyncio.run(run_to_file(
+            lambda executor, lines: stream_scans(executor, args.year, lines, dumps, args.chunk_size),
+            infile, outfile)) - 1
+    finally:
+        if args.input:
+            infile.close()
+        if args.output:
+            outfile.close()
+    print(f"Wrote {count} year scans for {args.year}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()